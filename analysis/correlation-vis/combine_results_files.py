@@ -1,6 +1,8 @@
 import sys
 import pandas as pd
 
+from fairness import results
+
 ATTRS_TO_SAVE = [
   "algorithm",
   "params",
@@ -33,7 +35,8 @@ def combine_files(files, outfile):
     combined = pd.DataFrame()
     for filename in files:
         print("Processing:" + filename)
-        dataframe = pd.read_csv(filename)
+        # read through the results backend so that rows not yet compacted into the CSV are included
+        dataframe = results.read_results(filename)
         numrows, nummetrics = dataframe.shape
         print("    " + str(numrows) + " items")
         dataname, sensitive = get_sensitive_from_filename(filename)
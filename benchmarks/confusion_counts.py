@@ -0,0 +1,170 @@
+"""
+Times the counting helpers of fairness.metrics.utils, which share the calc_confusion_counts
+bincount kernel, against the per-row str() comparison loops (and the sklearn confusion matrix
+of TNR) they replaced, on the same random inputs.  Both versions must return the same values.
+
+    python benchmarks/confusion_counts.py --rows 1000000
+"""
+
+import fire
+import numpy
+import time
+from sklearn.metrics import confusion_matrix
+
+from fairness.metrics import utils
+from fairness.metrics.TNR import TNR
+
+SENSITIVE_VALUES = ['a', 'b', 'c', 'd']
+UNPROTECTED_VALS = ['a']
+
+def old_calc_pos_protected_percents(predicted, sensitive, unprotected_vals, positive_pred):
+    """
+    The previous calc_pos_protected_percents.
+    """
+    unprotected_positive = 0.0
+    unprotected_negative = 0.0
+    protected_positive = 0.0
+    protected_negative = 0.0
+    for i in range(0, len(predicted)):
+        protected_val = sensitive[i]
+        predicted_val = predicted[i]
+        if protected_val in unprotected_vals:
+            if str(predicted_val) == str(positive_pred):
+                unprotected_positive += 1
+            else:
+                unprotected_negative += 1
+        else:
+            if str(predicted_val) == str(positive_pred):
+                protected_positive += 1
+            else:
+                protected_negative += 1
+
+    protected_pos_percent = 0.0
+    if protected_positive + protected_negative > 0:
+        protected_pos_percent = protected_positive / (protected_positive + protected_negative)
+    unprotected_pos_percent = 0.0
+    if unprotected_positive + unprotected_negative > 0:
+        unprotected_pos_percent = unprotected_positive /  \
+                                  (unprotected_positive + unprotected_negative)
+
+    return unprotected_pos_percent, protected_pos_percent
+
+def old_calc_fp_fn(actual, predicted, sensitive, unprotected_vals, positive_pred):
+    """
+    The previous calc_fp_fn.
+    """
+    fp_protected = 0.0
+    fp_unprotected = 0.0
+    fn_protected = 0.0
+    fn_unprotected = 0.0
+    for i in range(0, len(predicted)):
+        protected_val = sensitive[i]
+        predicted_val = predicted[i]
+        actual_val = actual[i]
+        if protected_val in unprotected_vals:
+            if (str(predicted_val)==str(positive_pred))&(str(actual_val)!=str(predicted_val)):
+                fp_unprotected+=1
+            elif(str(predicted_val)!=str(positive_pred))&(str(actual_val)==str(predicted_val)):
+                fn_unprotected+=1
+        else:
+            if (str(predicted_val)==str(positive_pred))&(str(actual_val)!=str(predicted_val)):
+                fp_protected+=1
+            elif(str(predicted_val)!=str(positive_pred))&(str(actual_val)==str(predicted_val)):
+                fn_protected+=1
+    return fp_unprotected, fp_protected, fn_protected, fn_unprotected
+
+def old_calc_tp_tn(actual, predicted, sensitive, unprotected_vals, positive_pred):
+    """
+    The previous calc_tp_tn.
+    """
+    tp_protected = 0.0
+    tp_unprotected = 0.0
+    tn_protected = 0.0
+    tn_unprotected = 0.0
+    for i in range(0, len(predicted)):
+        protected_val = sensitive[i]
+        predicted_val = predicted[i]
+        actual_val = actual[i]
+        if protected_val in unprotected_vals:
+            if (str(predicted_val)==str(positive_pred))&(str(actual_val)==str(predicted_val)):
+                tp_unprotected+=1
+            elif(str(predicted_val)!=str(positive_pred))&(str(actual_val)==str(predicted_val)):
+                tn_unprotected+=1
+        else:
+            if (str(predicted_val)==str(positive_pred))&(str(actual_val)==str(predicted_val)):
+                tp_protected+=1
+            elif(str(predicted_val)!=str(positive_pred))&(str(actual_val)==str(predicted_val)):
+                tn_protected+=1
+    return tp_unprotected, tp_protected, tn_protected, tn_unprotected
+
+def old_tnr(actual, predicted, positive_pred):
+    """
+    The previous TNR.calc, on sklearn's confusion matrix.
+    """
+    classes = list(set(actual))
+    matrix = confusion_matrix(actual, predicted, labels=classes)
+    TN = 0.0
+    allN = 0.0
+    for i in range(0, len(classes)):
+        trueval = classes[i]
+        if trueval == positive_pred:
+            continue
+        for j in range(0, len(classes)):
+            allN += matrix[i][j]
+            if trueval == classes[j]:
+                TN += matrix[i][j]
+
+    if allN == 0.0:
+        return 1.0
+
+    return TN / allN
+
+def make_inputs(rows, seed):
+    """
+    Returns the actual values as a list, the predictions as an int array and a string
+    sensitive attribute, as the benchmark hands them to the metrics.
+    """
+    random = numpy.random.RandomState(seed)
+    actual = random.randint(0, 2, rows).tolist()
+    predicted = random.randint(0, 2, rows)
+    sensitive = [SENSITIVE_VALUES[i] for i in random.randint(0, len(SENSITIVE_VALUES), rows)]
+    return actual, predicted, sensitive
+
+def time_call(f, *args):
+    start = time.perf_counter()
+    value = f(*args)
+    return value, time.perf_counter() - start
+
+def run(rows = 1000000, seed = 0):
+    """
+    Prints the time each helper takes with the previous and the current implementation.
+    """
+    actual, predicted, sensitive = make_inputs(rows, seed)
+    sensitive_dict = { 'attr' : sensitive }
+
+    kernel, kernel_time = time_call(utils.calc_confusion_counts, actual, predicted, sensitive, 1)
+    print("%-30s %8s    %7.3fs" % ("calc_confusion_counts", "", kernel_time))
+
+    comparisons = [
+        ("calc_pos_protected_percents",
+         lambda: old_calc_pos_protected_percents(predicted, sensitive, UNPROTECTED_VALS, 1),
+         lambda: utils.calc_pos_protected_percents(predicted, sensitive, UNPROTECTED_VALS, 1)),
+        ("calc_fp_fn",
+         lambda: old_calc_fp_fn(actual, predicted, sensitive, UNPROTECTED_VALS, 1),
+         lambda: utils.calc_fp_fn(actual, predicted, sensitive, UNPROTECTED_VALS, 1)),
+        ("calc_tp_tn",
+         lambda: old_calc_tp_tn(actual, predicted, sensitive, UNPROTECTED_VALS, 1),
+         lambda: utils.calc_tp_tn(actual, predicted, sensitive, UNPROTECTED_VALS, 1)),
+        ("TNR",
+         lambda: old_tnr(actual, predicted, 1),
+         lambda: TNR().calc(actual, predicted, sensitive_dict, 'attr', UNPROTECTED_VALS, 1, {})),
+    ]
+    for name, old, new in comparisons:
+        old_value, old_time = time_call(old)
+        new_value, new_time = time_call(new)
+        if numpy.any(numpy.asarray(old_value) != numpy.asarray(new_value)):
+            raise Exception("%s differs: %s (old) != %s (new)" % (name, old_value, new_value))
+        print("%-30s %7.3fs -> %7.3fs" % (name, old_time, new_time))
+
+if __name__ == '__main__':
+    fire.Fire(run)
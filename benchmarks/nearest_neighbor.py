@@ -0,0 +1,79 @@
+"""
+Times the classifiers of Ben's nearestLearner, which computes the distances of a block of query
+points to all of the 100 drawn examples at once, against the per-point min(..., key=dist) scan
+over the examples it replaced, on points of the German data.  Both must predict the same labels.
+
+    python benchmarks/nearest_neighbor.py --queries 5000
+"""
+
+import fire
+import random
+import time
+
+from fairness.algorithms.Ben.weaklearners import nearestneighbor
+from fairness.data.objects.German import German
+from fairness.data.objects.ProcessedData import ProcessedData
+
+TAG = 'numerical-binsensitive'
+
+def old_nearestLearner(draw):
+    """
+    The previous nearestLearner.
+    """
+    data = [draw() for _ in range(100)]
+
+    def classify(x):
+        return min(data, key=lambda y: nearestneighbor.dist(x, y[0]))[1]
+
+    return classify
+
+def load_examples():
+    """
+    Returns the German data as Ben's (point, label) examples, with labels in {0, 1}.
+    """
+    data = German()
+    df = ProcessedData(data).get_dataframe(TAG)
+    class_attr = data.get_class_attribute()
+    positive_val = data.get_positive_class_val(TAG)
+    points = df.drop(columns = [class_attr]).values.tolist()
+    labels = (df[class_attr] == positive_val).astype(int).tolist()
+    return list(zip(points, labels))
+
+def time_call(f, *args):
+    start = time.perf_counter()
+    value = f(*args)
+    return value, time.perf_counter() - start
+
+def run(queries = 5000, seed = 0):
+    """
+    Prints the time each classifier takes to label the given number of query points, drawn from
+    the German data, after learning from the same 100 drawn examples.
+    """
+    examples = load_examples()
+    random.seed(seed)
+    points = [random.choice(examples)[0] for _ in range(queries)]
+
+    classifiers = []
+    for learner in [old_nearestLearner, nearestneighbor.nearestLearner]:
+        random.seed(seed + 1)
+        classifiers.append(learner(lambda: random.choice(examples)))
+    old, new = classifiers
+
+    print("german, %d queries, 100 examples" % queries)
+    comparisons = [
+        ("min(..., key=dist) per point (old)", lambda: [old(x) for x in points]),
+        ("nearestLearner per point", lambda: [new(x) for x in points]),
+        ("nearestLearner predict", lambda: new.predict(points)),
+    ]
+    expected = None
+    for name, classify in comparisons:
+        predictions, seconds = time_call(classify)
+        predictions = [int(y) for y in predictions]
+        if expected is None:
+            expected = predictions
+        elif predictions != expected:
+            raise Exception("%s predicts differently from the old scan" % name)
+        print("%-40s %8.3fs" % (name, seconds))
+
+if __name__ == '__main__':
+    fire.Fire(run)
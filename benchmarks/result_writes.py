@@ -0,0 +1,63 @@
+"""
+Measures the throughput of writing result rows through results.BatchedWriter with different
+durability settings, against the per-row flush and fsync that ResultsFile.write used to do.
+
+    python benchmarks/result_writes.py --rows 5000 --metrics 60 --directory /path/on/the/disk
+"""
+
+import fire
+import os
+import random
+import tempfile
+import time
+
+from fairness.results import BatchedWriter
+
+SYNC_ROWS = [10, 100, 1000]
+
+class PerRowWriter(object):
+    """
+    The previous behaviour of ResultsFile.write: every row is flushed and fsynced.
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+
+    def write(self, *args):
+        self.handle.write(*args)
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+
+    def close(self):
+        self.handle.close()
+
+def make_rows(rows, metrics):
+    return ["alg,param=%d,%d,%s\n" % (i % 7, i, ",".join(str(random.random())
+                                                          for _ in range(metrics)))
+            for i in range(rows)]
+
+def time_writer(create_writer, filename, rows):
+    start = time.perf_counter()
+    writer = create_writer(open(filename, "w"))
+    for row in rows:
+        writer.write(row)
+    writer.close()
+    return len(rows) / (time.perf_counter() - start)
+
+def run(rows = 5000, metrics = 60, directory = None):
+    """
+    Writes the given number of rows (of the given number of metrics) to a temporary file in
+    directory (the system temporary directory by default) with each writer, and prints the rows
+    written per second.
+    """
+    data = make_rows(rows, metrics)
+    writers = [("per-row fsync (old behaviour)", PerRowWriter)] + \
+        [("sync_rows=%d" % n, lambda handle, n=n: BatchedWriter(handle, n, None))
+         for n in SYNC_ROWS]
+    with tempfile.TemporaryDirectory(dir=directory) as temp_dir:
+        filename = os.path.join(temp_dir, "results.csv")
+        for name, create_writer in writers:
+            print("%-32s %10.0f rows/s" % (name, time_writer(create_writer, filename, data)))
+
+if __name__ == '__main__':
+    fire.Fire(run)
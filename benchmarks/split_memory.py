@@ -0,0 +1,78 @@
+"""
+Measures the memory held by the train / test splits of ProcessedData.create_train_test_splits,
+which stores each trial's row positions (TrainTestSplits), against materialising the (train, test)
+frames of every tag and trial up front as it used to.
+
+    python benchmarks/split_memory.py --dataset adult --trials 50
+"""
+
+import fire
+import gc
+import numpy.random
+import tracemalloc
+
+from fairness.data.objects.Adult import Adult
+from fairness.data.objects.German import German
+from fairness.data.objects.ProcessedData import ProcessedData, TAGS
+
+DATASETS = {
+    'adult': Adult(),
+    'german': German(),
+}
+
+def get_available_tags(dataset):
+    return [tag for tag in TAGS if dataset.get_filename(tag).exists()]
+
+def materialise_splits(processed_data, trials, tags):
+    """
+    The previous behaviour of create_train_test_splits: an iloc copy of every tag's frame for
+    every trial.
+    """
+    splits = processed_data.create_train_test_splits(trials, tags)
+    return dict((tag, [splits[tag][i] for i in range(trials)]) for tag in tags)
+
+def access_each_split(processed_data, trials, tags):
+    """
+    Creates the index splits and builds each (train, test) pair once, as the benchmark units do,
+    keeping only the splits themselves.
+    """
+    splits = processed_data.create_train_test_splits(trials, tags)
+    for tag in tags:
+        for train, test in splits[tag]:
+            pass
+    return splits
+
+def measure(create_splits, dataset, trials, tags, seed):
+    """
+    Returns the megabytes held by the splits create_splits returns and the peak while creating
+    them.  The processed data frames are loaded beforehand, so only the splits are counted.
+    """
+    processed_data = ProcessedData(dataset)
+    for tag in tags:
+        processed_data.get_dataframe(tag)
+    numpy.random.seed(seed)
+    gc.collect()
+    tracemalloc.start()
+    splits = create_splits(processed_data, trials, tags)
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del splits
+    return held / 2**20, peak / 2**20
+
+def run(dataset = 'adult', trials = 50, seed = 0):
+    """
+    Prints the memory held by and the peak memory of the splits of the given dataset's processed
+    tags, with each way of storing them.
+    """
+    data = DATASETS[dataset]
+    tags = get_available_tags(data)
+    print("%s, %d trials, tags: %s" % (dataset, trials, ', '.join(tags)))
+    storages = [("materialised splits (old behaviour)", materialise_splits),
+                ("index splits, each accessed once", access_each_split)]
+    for name, create_splits in storages:
+        held, peak = measure(create_splits, data, trials, tags, seed)
+        print("%-40s %8.1f MB held %8.1f MB peak" % (name, held, peak))
+
+if __name__ == '__main__':
+    fire.Fire(run)
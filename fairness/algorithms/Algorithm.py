@@ -37,6 +37,44 @@ class Algorithm():
         """
         return {}
 
+    def run_param_values(self, train_df, test_df, class_attr, positive_class_val, sensitive_attrs,
+                         single_sensitive, privileged_vals, param_name, param_vals):
+        """
+        Runs the algorithm once for each of the given values of the parameter param_name (as
+        listed by get_param_info) and returns a list of (param_val, predictions) pairs, leaving
+        out the runs that failed.  The other arguments are as in run.
+
+        This default implementation calls run separately for each value.  Algorithms whose runs
+        for a sequence of parameter values can share work, e.g., by starting each training from
+        the model trained with the previous value, may override it.
+        """
+        param_data = ((param_val, train_df, test_df) for param_val in param_vals)
+        return self.run_param_data(param_name, param_data, class_attr, positive_class_val,
+                                   sensitive_attrs, single_sensitive, privileged_vals)
+
+    def run_param_data(self, param_name, param_data, class_attr, positive_class_val,
+                       sensitive_attrs, single_sensitive, privileged_vals, run=None):
+        """
+        Calls run (or the given function taking the same arguments) once for each
+        (param_val, train_df, test_df) in param_data, with params { param_name : param_val }, and
+        returns a list of (param_val, predictions) pairs, leaving out the runs that failed.  This
+        is the loop of run_param_values, for overrides that prepare the data of each value
+        themselves.
+        """
+        if run is None:
+            run = self.run
+        results = []
+        for param_val, train_df, test_df in param_data:
+            params = { param_name : param_val }
+            try:
+                predictions, trash = \
+                    run(train_df, test_df, class_attr, positive_class_val, sensitive_attrs,
+                        single_sensitive, privileged_vals, params)
+                results.append( (param_val, predictions) )
+            except Exception as e:
+                print("run for parameters %s failed: %s" % (params, e))
+        return results
+
     def get_supported_data_types(self):
         """
         Returns a set of datatypes which this algorithm can process.
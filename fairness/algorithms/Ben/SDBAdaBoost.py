@@ -14,17 +14,22 @@ from fairness.algorithms.Ben.margin import *
 from fairness.algorithms.Algorithm import Algorithm
 
 class SDBAdaBoost(Algorithm):
-   def __init__(self):
+   # workers: the number of processes on which the cross validation splits are run
+   # (utils.REPETITION_WORKERS if None, see utils.repeat)
+   def __init__(self, workers=None):
         Algorithm.__init__(self)
         self.name = "SDB-AdaBoost"
+        self.workers = workers
 
    def get_supported_data_types(self):
         return set(["numerical-binsensitive"])
 
    @arrayErrorBars(2)
-   def statistics(self, train, test, protectedIndex, protectedValue, learner):
+   def statistics(self, train, test, protectedIndex, protectedValue, learner, h=None):
       #print("in statistics-----------------------",train[0])
-      h = learner(train, protectedIndex, protectedValue)
+      # the classifier already trained on train by experimentCrossValidate
+      if h is None:
+         h = learner(train, protectedIndex, protectedValue)
       #print("Computing error")
       error = labelError(test, h)
       #print("Computing bias")
@@ -78,5 +83,5 @@ class SDBAdaBoost(Algorithm):
    def runAll(self,train, test, protectedIndex, protectedValue):
       print("Shifted Decision Boundary Relabeling")
       dataset = test+train
-      return experimentCrossValidate(train,test, self.boostingLearner, 2, self.statistics, protectedIndex, protectedValue)
+      return experimentCrossValidate(train,test, self.boostingLearner, 2, self.statistics, protectedIndex, protectedValue, workers=self.workers)
       
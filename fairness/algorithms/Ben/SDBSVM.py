@@ -15,17 +15,22 @@ from fairness.algorithms.Ben.margin import *
 from fairness.algorithms.Algorithm import Algorithm
 
 class SDBSVM(Algorithm):
-   def __init__(self):
+   # workers: the number of processes on which the cross validation splits are run
+   # (utils.REPETITION_WORKERS if None, see utils.repeat)
+   def __init__(self, workers=None):
         Algorithm.__init__(self)
         self.name = "SDBSVM"
+        self.workers = workers
 
    def get_supported_data_types(self):
         return set(["numerical-binsensitive"])
 
    @arrayErrorBars(2)
-   def statistics(self, train, test, protectedIndex, protectedValue, learner):
+   def statistics(self, train, test, protectedIndex, protectedValue, learner, h=None):
       #print("in statistics test-----------------------",test)
-      h = learner(train, protectedIndex, protectedValue)
+      # the classifier already trained on train by experimentCrossValidate
+      if h is None:
+         h = learner(train, protectedIndex, protectedValue)
       #print("Computing error")
       error = labelError(test, h)
       #print("error on test set-------------------------", error)
@@ -119,5 +124,5 @@ class SDBSVM(Algorithm):
 
       for (learnerName, learner) in experiments:
          #print("%s" % (learnerName), flush=True)
-         return experimentCrossValidate(train, test, learner, 2, self.statistics, protectedIndex, protectedValue)
+         return experimentCrossValidate(train, test, learner, 2, self.statistics, protectedIndex, protectedValue, workers=self.workers)
       
@@ -1,7 +1,9 @@
 import math
+import numpy
 from fairness.algorithms.Ben.utils import *
+from fairness.algorithms.Ben.utils import bulkClassifier, bulkPredict
 from fairness.algorithms.Ben.errorfunctions import labelError
-from fairness.algorithms.Ben.weaklearners.decisionstump import buildDecisionStump
+from fairness.algorithms.Ben.weaklearners.decisionstump import buildDecisionStump, buildWeightedDecisionStump
 
 # compute the weighted error of a given hypothesis on a distribution
 # return all of the hypothesis results and the error
@@ -30,10 +32,11 @@ def adaboostGenerator(examples, weakLearner, rounds, computeError=weightedLabelE
       distr = normalize([d * math.exp(-alpha[t] * r)
                          for (d,r) in zip(distr, hypothesisResults)])
 
-      def weightedMajorityVote(x):
-         return sign(sum(a * h(x) for (a, h) in zip(alpha, hypotheses[:t+1])))
+      def weightedMajorityVote(points):
+         votes = sum(a * bulkPredict(h, points) for (a, h) in zip(alpha, hypotheses[:t+1]))
+         return (votes >= 0).astype(int)
 
-      yield weightedMajorityVote, hypotheses[:t+1], alpha[:t+1]
+      yield bulkClassifier(weightedMajorityVote), hypotheses[:t+1], alpha[:t+1]
 
 
 #convenience wrapper for boosting
@@ -59,6 +62,60 @@ def detailedBoost(trainingData, numRounds=20, weakLearner=buildDecisionStump, co
    return h, hypotheses, alphas
 
 
+# boost a weighted weak learner on arrays: in each round the weak learner is given all of the
+# examples, weighted by the distribution, instead of examples drawn from it
+# where a weighted learner is (points, labels, weights) -> hypothesis with a predict method,
+# and the labels are +1/-1 (any label other than 1 is taken as -1)
+# the outputs of the hypotheses on the examples are also yielded, one column per hypothesis
+def arrayAdaboostGenerator(examples, weakLearner, rounds):
+   points = numpy.array([x for (x, y) in examples], dtype=float)
+   labels = numpy.array([1 if y == 1 else -1 for (x, y) in examples])
+   distr = numpy.full(len(examples), 1.0 / len(examples))
+   hypotheses = []
+   alpha = numpy.zeros(rounds)
+   outputs = numpy.zeros((len(examples), rounds))
+
+   for t in range(rounds):
+      hypotheses.append(weakLearner(points, labels, distr))
+      outputs[:, t] = hypotheses[t].predict(points)
+      error = numpy.sum(distr[outputs[:, t] != labels])
+
+      alpha[t] = 0.5 * math.log((1 - error) / (.0001 + error))
+      distr = distr * numpy.exp(-alpha[t] * outputs[:, t] * labels)
+      distr /= numpy.sum(distr)
+
+      yield (arrayWeightedMajorityVote(hypotheses[:t+1], alpha[:t+1]), hypotheses[:t+1],
+             alpha[:t+1], outputs[:, :t+1])
+
+
+# compute the outputs of hypotheses with predict methods on a list of points, as a matrix
+# with one column per hypothesis
+def hypothesisMatrix(points, hypotheses):
+   points = numpy.asarray(points, dtype=float)
+   return numpy.column_stack([h.predict(points) for h in hypotheses])
+
+
+def arrayWeightedMajorityVote(hypotheses, alpha):
+   return bulkClassifier(lambda points: (hypothesisMatrix(points, hypotheses).dot(alpha) >= 0).astype(int))
+
+
+#convenience wrapper for boosting on arrays
+#returns the outputted hypothesis from boosting
+def arrayBoost(trainingData, numRounds=20, weakLearner=buildWeightedDecisionStump):
+   for h, _, _, _ in arrayAdaboostGenerator(trainingData, weakLearner, numRounds):
+      pass
+
+   return h
+
+
+# return the hypotheses, their weights and their outputs on the training data as well
+def detailedArrayBoost(trainingData, numRounds=20, weakLearner=buildWeightedDecisionStump):
+   for h, hypotheses, alphas, outputs in arrayAdaboostGenerator(trainingData, weakLearner, numRounds):
+      pass
+
+   return h, hypotheses, alphas, outputs
+
+
 # compute the margin of a point with the label to express whether it's correct
 # alpha is the weights of the hypotheses from the boosting algorithm
 def marginWithLabel(point, label, hypotheses, alpha):
@@ -71,6 +128,16 @@ def margin(point, hypotheses, alpha):
 	return sum(a*h(point) for (h, a) in zip(hypotheses, alpha)) / sum(alpha)
 
 
+# compute the margins of a list of points as an array
+def bulkMargin(points, hypotheses, alpha):
+   return sum(a*bulkPredict(h, points) for (h, a) in zip(hypotheses, alpha)) / sum(alpha)
+
+
+# compute the margins of a list of points as an array, for hypotheses with predict methods
+def arrayMargin(points, hypotheses, alpha):
+   return hypothesisMatrix(points, hypotheses).dot(alpha) / numpy.sum(alpha)
+
+
 # compute the absolute value of the margin of a point
 # alpha is the weights of the hypotheses from the boosting algorithm
 def absMargin(point, hypotheses, alpha):
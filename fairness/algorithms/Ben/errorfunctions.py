@@ -1,4 +1,5 @@
 from fairness.algorithms.Ben import utils 
+import numpy
 import random
 import heapq
 
@@ -26,7 +27,8 @@ def precomputedLabelError(data, labels):
 
 
 def labelError(data, h):
-   return len([1 for (x,y) in data if h(x) != y]) / len(data)
+   pts, labels = zip(*data)
+   return numpy.count_nonzero(utils.bulkPredict(h, pts) != numpy.array(labels)) / len(data)
 
 
 # data is a list of unlabeled examples
@@ -63,7 +65,7 @@ def signedStatisticalParity(data, protectedIndex, protectedValue, h=None, weight
       labels = None
 
    if h is not None:
-      labels = [h(x) for x in pts]
+      labels = utils.bulkPredict(h, pts)
 
    if labels is None:
       raise Exception("Must provide either labels or a hypothesis to signedStatisticalParity")
@@ -99,5 +101,6 @@ def individualFairness(data, learner, flipProportion=0.2, passProtected=False):
    flippedPts = [x for i,x in enumerate(biasedData) if i in indicesOfFlippedData]
    if (len(flippedPts)==0):
       raise Exception("zero length array")
-   error = sum(h(x) != y for (x,y) in flippedPts) / len(flippedPts)
+   pts, labels = zip(*flippedPts)
+   error = numpy.count_nonzero(utils.bulkPredict(h, pts) != numpy.array(labels)) / len(flippedPts)
    return error
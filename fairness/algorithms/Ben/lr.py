@@ -10,7 +10,9 @@ def lrDetailedSKL(data):
    clf = linear_model.LogisticRegression()
    lrClassifier = clf.fit(points, labels)
    #print("lrClassifier---------------", lrClassifier)
-   return lambda x: lrClassifier.predict_proba(x)[0][1], lambda x: 1 if lrClassifier.predict_proba(x)[0][1]>=0.5 else 0
+   probability = lambda pts: lrClassifier.predict_proba(pts)[:, 1]
+   return (utils.bulkClassifier(probability),
+           utils.bulkClassifier(lambda pts: (probability(pts) >= 0.5).astype(int)))
    
    
 def lrSKL(data):
@@ -5,7 +5,7 @@ from fairness.algorithms.Ben import svm
 import numpy
 from fairness.algorithms.Ben import lr
 from fairness.algorithms.Ben import boosting
-from fairness.algorithms.Ben.weaklearners.decisionstump import buildDecisionStump
+from fairness.algorithms.Ben.weaklearners.decisionstump import buildWeightedDecisionStump
 import random
 
 try:
@@ -16,7 +16,8 @@ except ImportError:
 
 class marginAnalyzer(object):
    def __init__(self, data=None, defaultThreshold=None, marginRange=None,
-                  protectedIndex=None, protectedValue=None, bulkMargin=None):
+                  protectedIndex=None, protectedValue=None, bulkMargin=None,
+                  trainingMargins=None):
       self.defaultThreshold = defaultThreshold
       if data is not None and 'trainingData' not in dir(self):
          self.splitData(data)
@@ -25,11 +26,20 @@ class marginAnalyzer(object):
          self.trainingMargins = [self.margin(x[0]) for x in self.trainingData]
          self.validationMargins = [self.margin(x[0]) for x in self.validationData]
          self.bulkMargin = None
+      elif trainingMargins is not None:
+         # the margins of the training data are already known to the subclass
+         self.trainingMargins = trainingMargins
+         self.validationMargins = bulkMargin([x[0] for x in self.validationData])
+         self.bulkMargin = bulkMargin
       else:
          self.trainingMargins = bulkMargin([x[0] for x in self.trainingData])
          self.validationMargins = bulkMargin([x[0] for x in self.validationData])
          self.bulkMargin = bulkMargin
 
+      # the validation margins as an array, so that the classifiers tried by optimalShift are
+      # evaluated on the validation data without computing any margin again
+      self.validationMarginArray = numpy.asarray(self.validationMargins, dtype=float).ravel()
+
       self.margins = numpy.concatenate([self.trainingMargins, self.validationMargins], axis=0)
       self.margins=self.margins.ravel()
       
@@ -54,6 +64,8 @@ class marginAnalyzer(object):
       assert protectedValue is not None
       self.protectedIndex = protectedIndex
       self.protectedValue = protectedValue
+      self.validationProtected = self.conditionMask([x[0] for x in self.validationData],
+                                                    self.protected)
 
    #returns True if x is protected, False otherwise; can be used as a condition for conditionalShiftClassifier
    def protected(self, x):
@@ -62,18 +74,40 @@ class marginAnalyzer(object):
       return x[self.protectedIndex] == self.protectedValue
 
 
+   #returns an array which is True for the points satisfying condition
+   def conditionMask(self, points, condition):
+      if condition == self.protected:
+         return numpy.asarray(points)[:, self.protectedIndex] == self.protectedValue
+      return numpy.array([condition(x) for x in points], dtype=bool)
+
+
+   #returns the margins of a list of points as an array
+   def bulkMargins(self, points):
+      if self.bulkMargin is not None:
+         return numpy.asarray(self.bulkMargin(points), dtype=float).ravel()
+      return numpy.array([self.margin(x) for x in points], dtype=float)
+
+
    #returns a classifier which takes a data point as an input and returns 1 if margin is above threshold, 0 otherwise
+   #its predict method classifies a list of points at once
    def classifier(self, threshold=None):
       if threshold == None:
          threshold = lambda x: self.defaultThreshold
-      return lambda x: 1  if  self.margin(x) >= threshold(x) else 0
+      return bulkClassifier(lambda points: (self.bulkMargins(points) >=
+                                            numpy.array([threshold(x) for x in points])).astype(int))
 
 
    #returns a classifier with shifted threshold for data points satisfying condition
    def conditionalShiftClassifier(self, shift, condition=None):
       if condition == None:
          condition = self.protected
-      return self.classifier(lambda x: self.defaultThreshold + shift if condition(x) else self.defaultThreshold)
+
+      def shiftedLabels(points):
+         thresholds = numpy.where(self.conditionMask(points, condition),
+                                  self.defaultThreshold + shift, self.defaultThreshold)
+         return (self.bulkMargins(points) >= thresholds).astype(int)
+
+      return bulkClassifier(shiftedLabels)
 
 
    def conditionalMarginShiftedLabels(self, data, margins, shift, condition):
@@ -84,29 +118,53 @@ class marginAnalyzer(object):
       return labels
 
 
+   #signed statistical parity on the validation data of conditionalShiftClassifier(shift),
+   #computed from the precomputed validation margins as signedStatisticalParity does
+   def shiftedStatisticalParity(self, shift):
+      thresholds = numpy.where(self.validationProtected, self.defaultThreshold + shift,
+                               self.defaultThreshold)
+      labels = self.validationMarginArray >= thresholds
+      numProtected = numpy.count_nonzero(self.validationProtected)
+      numElse = len(labels) - numProtected
+      numProtectedPositive = numpy.count_nonzero(labels & self.validationProtected)
+      numElsePositive = numpy.count_nonzero(labels) - numProtectedPositive
+
+      if numProtected == 0:
+         print("Nobody in the protected class")
+         return numElsePositive / numElse
+      elif numElse == 0:
+         print("Nobody in the else class")
+         return -numProtectedPositive / numProtected
+      return numElsePositive / numElse - numProtectedPositive / numProtected
+
+
    #finds the shift which achieves goal=0 under condition
    #goal takes two arguments, data and h
+   #with the default goal and condition, the classifiers are evaluated on the validation margins
    def optimalShift(self, goal=None, condition=None, rounds=3):
       #print("in optimalshift function--------------------")
-      if goal == None:
-         goal = lambda d, h: signedStatisticalParity(d, self.protectedIndex, self.protectedValue, h)
-      if condition == None:
-         condition = self.protected
+      if goal == None and condition == None:
+         shiftGoal = self.shiftedStatisticalParity
+      else:
+         if goal == None:
+            goal = lambda d, h: signedStatisticalParity(d, self.protectedIndex, self.protectedValue, h)
+         if condition == None:
+            condition = self.protected
+         shiftGoal = lambda shift: goal(self.validationData,
+                                        self.conditionalShiftClassifier(shift, condition))
 
       low = self.minShift
       high = self.maxShift
-      dataToUse = self.validationData
 
-      minGoalValue = goal(dataToUse, self.conditionalShiftClassifier(low, condition))
-      maxGoalValue = goal(dataToUse, self.conditionalShiftClassifier(high, condition))
+      minGoalValue = shiftGoal(low)
+      maxGoalValue = shiftGoal(high)
      
 
       if sign(minGoalValue) != sign(maxGoalValue):
          # a binary search for zero
          for _ in range(rounds):
             midpoint = (low + high) / 2
-            if (sign(goal(dataToUse, self.conditionalShiftClassifier(low, condition))) ==
-                  sign(goal(dataToUse, self.conditionalShiftClassifier(midpoint, condition)))):
+            if sign(shiftGoal(low)) == sign(shiftGoal(midpoint)):
                low = midpoint
             else:
                high = midpoint
@@ -117,7 +175,7 @@ class marginAnalyzer(object):
          bestVal = float('inf')
          step = (high-low)/rounds
          for newShift in numpy.arange(low, high, step):
-            newVal = goal(dataToUse, self.conditionalShiftClassifier(newShift, condition))
+            newVal = shiftGoal(newShift)
             #print(newVal)
             newVal = abs(newVal)
             if newVal < bestVal:
@@ -126,21 +184,30 @@ class marginAnalyzer(object):
          return bestShift
 
    def optimalShiftClassifier(self, goal=None, condition=None, rounds=3):
-      if goal == None:
-         goal = lambda d, h: signedStatisticalParity(d, self.protectedIndex, self.protectedValue, h)
-      if condition == None:
-         condition = self.protected
-      return self.conditionalShiftClassifier(self.optimalShift(goal, condition, rounds), condition)
+      shift = self.optimalShift(goal, condition, rounds)
+      return self.conditionalShiftClassifier(shift, condition)
 
 
+#without a weakLearner, the weightedLearner (weighted decision stumps by default) is boosted
+#on arrays, and the margins are computed from the matrix of the hypotheses' outputs; a
+#weakLearner taking drawExample is boosted as in boosting.boost
 class boostingMarginAnalyzer(marginAnalyzer):
    def __init__(self, data, protectedIndex, protectedValue, numRounds=3,
-               weakLearner=buildDecisionStump, computeError=boosting.weightedLabelError):
+               weakLearner=None, computeError=boosting.weightedLabelError,
+               weightedLearner=buildWeightedDecisionStump):
 
       self.splitData(data)
-      _, self.hypotheses, self.alphas = boosting.detailedBoost(self.trainingData, numRounds, weakLearner, computeError)
+      if weakLearner is None:
+         _, self.hypotheses, self.alphas, outputs = boosting.detailedArrayBoost(self.trainingData, numRounds, weightedLearner)
+         trainingMargins = outputs.dot(self.alphas) / numpy.sum(self.alphas)
+         bulkMargin = lambda pts: boosting.arrayMargin(pts, self.hypotheses, self.alphas)
+      else:
+         _, self.hypotheses, self.alphas = boosting.detailedBoost(self.trainingData, numRounds, weakLearner, computeError)
+         trainingMargins = None
+         bulkMargin = lambda pts: boosting.bulkMargin(pts, self.hypotheses, self.alphas)
       super().__init__(defaultThreshold=0, marginRange=(-1,1), protectedIndex=protectedIndex,
-                  protectedValue=protectedValue)
+                  protectedValue=protectedValue, bulkMargin=bulkMargin,
+                  trainingMargins=trainingMargins)
 
 
 
@@ -174,7 +241,7 @@ class lrSKLMarginAnalyzer(marginAnalyzer):
       self.splitData(data)
       self.margin = lr.lrDetailedSKL(self.trainingData)[0]
       super().__init__(defaultThreshold=0.5, marginRange=(0,1), protectedIndex=protectedIndex,
-                     protectedValue=protectedValue)
+                     protectedValue=protectedValue, bulkMargin=self.margin.predict)
 
 
 
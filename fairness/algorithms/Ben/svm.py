@@ -26,7 +26,7 @@ def svmDetailedSKL(data, gamma=DEFAULT_GAMMA, verbose=False, kernel='rbf'):
    #   print("Training classifier")
 
    skClassifier = clf.fit(points, labels)
-   hypothesis = lambda x: skClassifier.predict([x])[0]
+   hypothesis = utils.bulkClassifier(skClassifier.predict)
    bulkHypothesis = lambda data: skClassifier.predict(data)
 
    alphas = skClassifier.dual_coef_[0]
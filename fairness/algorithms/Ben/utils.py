@@ -1,7 +1,14 @@
 import random
 import math
+import multiprocessing
 import numpy
 
+# the default number of processes on which the repetitions of errorBars, arrayErrorBars and
+# experimentCrossValidate are run, when they are not given workers; each repetition is seeded
+# explicitly, so the results do not depend on it. Raise it (e.g., to os.cpu_count()) to run
+# the repetitions on a pool of forked processes.
+REPETITION_WORKERS = 1
+
 # draw: [float] -> int
 # pick an index from the given list of floats proportionally
 # to the size of the entry (i.e. normalize to a probability
@@ -59,22 +66,70 @@ def transpose(A):
    return [column(A, j) for j in range(len(A[0]))]
 
 
+# the function and arguments of the repetitions, set in every pool worker by
+# initRepetitionWorker
+_repetitionState = {}
+
+def initRepetitionWorker(f, args, kwargs):
+   _repetitionState['f'] = f
+   _repetitionState['args'] = args
+   _repetitionState['kwargs'] = kwargs
+
+
+def runRepetition(f, args, kwargs, seed):
+   random.seed(seed)
+   numpy.random.seed(seed)
+   return f(*args, **kwargs)
+
+
+def runRepetitionInWorker(seed):
+   return runRepetition(_repetitionState['f'], _repetitionState['args'],
+                        _repetitionState['kwargs'], seed)
+
+
+# call f(*args, **kwargs) n times and return the results in order. Every call seeds random
+# and numpy.random with its own seed, drawn from random, so the calls can be run on a pool of
+# up to workers forked processes (REPETITION_WORKERS if workers is None), which need not
+# pickle f or its arguments. They are run in this process, leaving its random state as it was
+# after drawing the seeds, when there is a single worker, when fork is not available, or when
+# this process is itself a pool worker (e.g., of benchmark.py), which cannot start processes.
+def repeat(n, workers, f, *args, **kwargs):
+   seeds = [random.randrange(2**32) for _ in range(n)]
+   if workers is None:
+      workers = REPETITION_WORKERS
+   workers = min(n, workers)
+
+   if (workers > 1 and not multiprocessing.current_process().daemon and
+         'fork' in multiprocessing.get_all_start_methods()):
+      context = multiprocessing.get_context('fork')
+      with context.Pool(processes=workers, initializer=initRepetitionWorker,
+                        initargs=(f, args, kwargs)) as pool:
+         return pool.map(runRepetitionInWorker, seeds)
+
+   randomState, numpyState = random.getstate(), numpy.random.get_state()
+   try:
+      return [runRepetition(f, args, kwargs, seed) for seed in seeds]
+   finally:
+      random.setstate(randomState)
+      numpy.random.set_state(numpyState)
+
+
 # take any function f which produces a number and produce a function which
 # outputs aggregate statistics from calling f n times.
-def errorBars(n):
+def errorBars(n, workers=None):
    def errorbarDecorator(f):
-      def newF(*args):
-         results = [f(*args) for _ in range(n)]
+      def newF(*args, **kwargs):
+         results = repeat(n, workers, f, *args, **kwargs)
          return avg(results), min(results), max(results), variance(results)
       return newF
    return errorbarDecorator
 
 
 # compute coordinatewise error bars for an array-valued function
-def arrayErrorBars(n):
+def arrayErrorBars(n, workers=None):
    def errorbarDecorator(f):
-      def newF(*args):
-         results = [f(*args) for _ in range(n)]
+      def newF(*args, **kwargs):
+         results = repeat(n, workers, f, *args, **kwargs)
          return [(avg(x), min(x), max(x), variance(x)) for x in transpose(results)]
       return newF
    return errorbarDecorator
@@ -111,31 +166,65 @@ def lpDistance(u, v, p):
 
 def sigmoid(z):
    return 1.0 / (1 + numpy.exp(-z))
+
+
+# a hypothesis which classifies a list of points at once with h.predict(points), and a
+# single point with h(x)
+class bulkClassifier(object):
+   def __init__(self, bulkHypothesis):
+      self.bulkHypothesis = bulkHypothesis
+
+   def predict(self, points):
+      return self.bulkHypothesis(points)
+
+   def __call__(self, x):
+      return self.predict([x])[0]
+
+
+# compute the outputs of a hypothesis on a list of points as an array, at once if the
+# hypothesis has a predict method and point by point otherwise
+def bulkPredict(h, points):
+   if hasattr(h, 'predict'):
+      return numpy.asarray(h.predict(points))
+   return numpy.array([h(x) for x in points])
  
-def experimentCrossValidate(Train, Test, learner, times, statistics, protectedIndex, protectedValue, massage=False):
+# one of the random splits of experimentCrossValidate: the learner is trained once, and the
+# classifier is given to statistics (as h) rather than trained again
+# returns the statistics and the classifier's predictions on the original test data
+def crossValidationTrial(allData, trainSize, Test, learner, statistics, protectedIndex,
+                         protectedValue, massage):
    PI = protectedIndex
    PV = protectedValue
-   originalTrain = Train
-   originalTest = Test
+   allData = list(allData)
+   random.shuffle(allData)
+   train = allData[:trainSize]
+   test = allData[trainSize:]
+   if not massage:
+     classifier_t = learner(train, protectedIndex, protectedValue)
+     output = statistics(train, test, PI, PV, learner, h=classifier_t)
+   else:
+     from massaging import randomOneSideMassageData
+     classifier_t = learner(train, protectedIndex, protectedValue)
+     output = statistics(randomOneSideMassageData, train, test, PI, PV, learner)
+
+   #prediction on test data
+   prediction = bulkPredict(classifier_t, [datapoints[0] for datapoints in Test]).tolist()
+   return output, prediction
+
+
+def experimentCrossValidate(Train, Test, learner, times, statistics, protectedIndex, protectedValue, massage=False,
+                            workers=None):
    allData = Train+Test
    #allData= allData.values.tolist()
    variances = [[], [], []] #error, bias, ubif
    mins = [float('inf'), float('inf'), float('inf')]
    maxes = [-float('inf'), -float('inf'), -float('inf')]
    avgs = [0, 0, 0]
+
+   trials = repeat(times, workers, crossValidationTrial, allData, len(Train), Test, learner, statistics,
+                   protectedIndex, protectedValue, massage)
    
-   for time in range(times):
-     random.shuffle(allData)
-     train = allData[:len(originalTrain)]
-     test = allData[len(originalTrain):]
-     if not massage:
-       classifier_t = learner(train, protectedIndex, protectedValue)
-       output = statistics(train, test, PI, PV, learner)
-     else:
-       from massaging import randomOneSideMassageData
-       classifier_t = learner(train, protectedIndex, protectedValue)
-       output = statistics(randomOneSideMassageData, train, test, PI, PV, learner)
-     
+   for time, (output, _) in enumerate(trials):
      for i in range(len(output)):
        avgs[i] += (output[i][0] - avgs[i]) / (time + 1)
        mins[i] = min(mins[i], output[i][1])
@@ -145,9 +234,6 @@ def experimentCrossValidate(Train, Test, learner, times, statistics, protectedIn
    
    for i in range(len(variances)):
      variances[i] = variance(variances[i])
-  #prediction on test data
-   prediction=[]
-   for datapoints in Test:
-    y=classifier_t(datapoints[0])
-    prediction.append(y)
+   # the predictions of the classifier of the last split
+   prediction = trials[-1][1]
    return prediction
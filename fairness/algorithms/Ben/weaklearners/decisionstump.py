@@ -1,4 +1,5 @@
 from fairness.algorithms.Ben.errorfunctions import minLabelErrorOfHypothesisAndNegation
+import numpy
 import sys
 
 
@@ -18,6 +19,10 @@ class Stump:
    def __call__(self, point):
       return self.classify(point)
 
+   def predict(self, points):
+      return numpy.where(numpy.asarray(points)[:, self.splitFeature] >= self.splitThreshold,
+                         self.gtLabel, self.ltLabel)
+
 
 def majorityVote(data):
    ''' Compute the majority of the class labels in the given data set. '''
@@ -40,6 +45,52 @@ def bestThreshold(data, index, errorFunction):
    return min(errors, key=lambda p: p[1])
 
 
+def weightedBestThresholds(points, signedWeights):
+   '''Compute the best threshold of every feature for the given labels (+1/-1) times the
+   weights of the points. Returns (thresholds, correlations), where the correlation of a
+   threshold is the total weight of the points it classifies correctly as +1 above it and -1
+   below it, minus the weight of those it misclassifies. The values of each feature are
+   sorted once, and the correlations of all thresholds come from a prefix sum of the
+   weights, so this is O(n log n) per feature.'''
+
+   features = numpy.arange(points.shape[1])
+   order = numpy.argsort(points, axis=0, kind='mergesort')
+   sortedValues = points[order, features]
+   sortedWeights = signedWeights[order]
+
+   # the weight of the points below each position, which are classified as -1
+   below = numpy.zeros(sortedWeights.shape)
+   below[1:] = numpy.cumsum(sortedWeights, axis=0)[:-1]
+   correlations = numpy.sum(signedWeights) - 2 * below
+
+   # as in bestThreshold, the thresholds are the values of the points, and each one splits
+   # the points before the first point with that value
+   isThreshold = numpy.ones(points.shape, dtype=bool)
+   isThreshold[1:] = sortedValues[1:] != sortedValues[:-1]
+   best = numpy.argmax(numpy.where(isThreshold, numpy.abs(correlations), -1), axis=0)
+   return sortedValues[best, features], correlations[best, features]
+
+
+def buildWeightedDecisionStump(points, labels, weights, forbiddenFeatures=()):
+   '''Build the decision stump with the least weighted error on an array of points with
+   labels +1/-1, labelling the points on either side of the threshold +1 or -1.'''
+
+   thresholds, correlations = weightedBestThresholds(points, labels * weights)
+   scores = numpy.abs(correlations)
+   scores[list(forbiddenFeatures)] = -1
+   feature = int(numpy.argmax(scores))
+
+   stump = Stump()
+   stump.splitFeature = feature
+   stump.splitThreshold = thresholds[feature]
+   if correlations[feature] >= 0:
+      stump.gtLabel, stump.ltLabel = 1, -1
+   else:
+      stump.gtLabel, stump.ltLabel = -1, 1
+
+   return stump
+
+
 def defaultError(data, h):
    return minLabelErrorOfHypothesisAndNegation(data, h)
 
@@ -1,11 +1,45 @@
+import numpy
+from fairness.algorithms.Ben.utils import bulkClassifier
+
+# the number of query points whose distances to all of the data are computed at once
+BLOCK_SIZE = 256
+
+
 def dist(x,y):
    return sum((a-b)**2 for (a,b) in zip(x,y))
 
 
+def nearestIndices(points, queries):
+   ''' Return the index of the nearest of the given points to each query point (the first
+       one if several are nearest), computing the squared distances of a block of queries
+       to all points at once. '''
+   points = numpy.asarray(points, dtype=float)
+   queries = numpy.asarray(queries, dtype=float)
+   indices = numpy.empty(len(queries), dtype=int)
+
+   for start in range(0, len(queries), BLOCK_SIZE):
+      block = queries[start:start + BLOCK_SIZE]
+      distances = ((block[:, numpy.newaxis, :] - points[numpy.newaxis, :, :]) ** 2).sum(axis=2)
+      indices[start:start + BLOCK_SIZE] = numpy.argmin(distances, axis=1)
+
+   return indices
+
+
+def nearestNeighborClassifier(points, labels):
+   ''' Return a classifier labelling a point (or with predict, a list of points) like the
+       nearest of the given points. '''
+   points = numpy.asarray(points, dtype=float)
+   labels = numpy.asarray(labels)
+   return bulkClassifier(lambda queries: labels[nearestIndices(points, queries)])
+
+
 def nearestLearner(draw):
    data = [draw() for _ in range(100)]
+   return nearestNeighborClassifier([x for (x, y) in data], [y for (x, y) in data])
 
-   def classify(x):
-      return min(data, key=lambda y: dist(x, y[0]))[1]
 
-   return classify
+def buildWeightedNearestLearner(points, labels, weights, sampleSize=100):
+   ''' A weighted learner for boosting.arrayAdaboostGenerator: the nearest neighbor
+       classifier of a sample drawn from the points according to the weights. '''
+   sample = numpy.random.choice(len(points), sampleSize, p=weights)
+   return nearestNeighborClassifier(points[sample], labels[sample])
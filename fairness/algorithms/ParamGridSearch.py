@@ -1,6 +1,7 @@
 import math
 
 from fairness.algorithms.Algorithm import Algorithm
+from fairness.metrics.MetricGrid import MetricGrid
 
 class ParamGridSearch(Algorithm):
     def __init__(self, algorithm, metric):
@@ -23,16 +24,13 @@ class ParamGridSearch(Algorithm):
         for param_name in search_space:
              ## Note: this only maximizes one parameter at a time - if the maximum involves
              ## two parameters being set, this will not find it.
-             for param_val in search_space[param_name]:
-                  trial_params = { param_name : param_val }
-                  try:
-                      predictions, trash = \
-                          self.algorithm.run(train_df, test_df, class_attr, positive_class_val,
-                                             sensitive_attrs, single_sensitive, privileged_vals,
-                                             trial_params)
-                      all_predictions.append( (param_name, param_val, predictions) )
-                  except Exception as e:
-                      print("run for parameters %s failed: %s" % (params, e))
+             param_results = \
+                 self.algorithm.run_param_values(train_df, test_df, class_attr,
+                                                 positive_class_val, sensitive_attrs,
+                                                 single_sensitive, privileged_vals, param_name,
+                                                 search_space[param_name])
+             for param_val, predictions in param_results:
+                  all_predictions.append( (param_name, param_val, predictions) )
         best_predictions = self.find_best(all_predictions, train_df, test_df, class_attr,
                                           positive_class_val, sensitive_attrs, single_sensitive,
                                           privileged_vals, params)
@@ -48,13 +46,17 @@ class ParamGridSearch(Algorithm):
         for sens in sensitive_attrs:
              dict_sensitive[sens] = test_df[sens].values.tolist()
 
+        # the metric is evaluated for every point of the grid at once
+        grid = MetricGrid(actual, [predictions for (_, _, predictions) in all_predictions],
+                          dict_sensitive, single_sensitive, privileged_vals, positive_class_val,
+                          {})
+        vals = grid.evaluate(self.metric)
+
         best_val = None
         best = None
         best_name = None
         best_metric = None
-        for param_name, param_val, predictions in all_predictions:
-             val = self.metric.calc(actual, predictions, dict_sensitive, single_sensitive,
-                                    privileged_vals, positive_class_val)
+        for (param_name, param_val, predictions), val in zip(all_predictions, vals):
              if best_val == None or self.metric.is_better_than(val, best_metric):
                   best = predictions
                   best_name = param_name
@@ -1,32 +1,67 @@
 from BlackBoxAuditing.repairers.GeneralRepairer import Repairer
 from pandas import DataFrame
 from fairness.algorithms.Algorithm import Algorithm
+from fairness.algorithms.feldman.QuantileRepairer import get_repairer
 
 REPAIR_LEVEL_DEFAULT = 1.0
 
 class FeldmanAlgorithm(Algorithm):
-    def __init__(self, algorithm):
+    """
+    By default, the data is repaired by a QuantileRepairer fitted on the training data, and the
+    test data is transformed with the same repair.  With use_blackbox_auditing, the training and
+    test data are each repaired separately by BlackBoxAuditing's Repairer, as originally done.
+    """
+    def __init__(self, algorithm, use_blackbox_auditing=False):
         Algorithm.__init__(self)
         self.model = algorithm
         self.name = 'Feldman-' + self.model.get_name()
+        self.use_blackbox_auditing = use_blackbox_auditing
 
     def run(self, train_df, test_df, class_attr, positive_class_val, sensitive_attrs,
             single_sensitive, privileged_vals, params):
         if not 'lambda' in params:
-            params = get_default_params()
+            params = self.get_default_params()
         repair_level = params['lambda']
 
-        repaired_train_df = self.repair(train_df, single_sensitive, class_attr, repair_level)
+        if self.use_blackbox_auditing:
+            repaired_train_df = self.repair(train_df, single_sensitive, class_attr, repair_level)
 
-        # What should be happening here is that the test_df is transformed using exactly the same
-        # transformation as the train_df.  This will only be the case based on the usage below if
-        # the distribution of each attribute conditioned on the sensitive attribute is the same
-        # in the training set and the test set.
-        repaired_test_df = self.repair(test_df, single_sensitive, class_attr, repair_level)
+            # What should be happening here is that the test_df is transformed using exactly the
+            # same transformation as the train_df.  This will only be the case based on the usage
+            # below if the distribution of each attribute conditioned on the sensitive attribute
+            # is the same in the training set and the test set.
+            repaired_test_df = self.repair(test_df, single_sensitive, class_attr, repair_level)
+        else:
+            repairer = get_repairer(train_df, single_sensitive, [class_attr])
+            repaired_train_df = repairer.repair(train_df, repair_level)
+            repaired_test_df = repairer.repair(test_df, repair_level)
 
         return self.model.run(repaired_train_df, repaired_test_df, class_attr, positive_class_val,
                               sensitive_attrs, single_sensitive, privileged_vals, params)
 
+    def run_param_values(self, train_df, test_df, class_attr, positive_class_val, sensitive_attrs,
+                         single_sensitive, privileged_vals, param_name, param_vals):
+        """
+        The repaired data for every repair level is interpolated from the same fully repaired
+        values, which are computed once for the whole sweep.  The data for each level is created
+        just before the model is run on it, so only one level's data is held at a time.
+        """
+        if self.use_blackbox_auditing or param_name != 'lambda':
+            return Algorithm.run_param_values(self, train_df, test_df, class_attr,
+                                              positive_class_val, sensitive_attrs,
+                                              single_sensitive, privileged_vals, param_name,
+                                              param_vals)
+
+        repairer = get_repairer(train_df, single_sensitive, [class_attr])
+        repaired = zip(repairer.repair_levels(train_df, param_vals),
+                       repairer.repair_levels(test_df, param_vals))
+        param_data = ((param_val, repaired_train_df, repaired_test_df)
+                      for param_val, (repaired_train_df, repaired_test_df)
+                      in zip(param_vals, repaired))
+        return self.run_param_data(param_name, param_data, class_attr, positive_class_val,
+                                   sensitive_attrs, single_sensitive, privileged_vals,
+                                   run=self.model.run)
+
     def get_param_info(self):
         """
         Returns lambda values in [0.0, 1.0] at increments of 0.05.
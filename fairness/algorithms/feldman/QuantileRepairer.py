@@ -0,0 +1,137 @@
+import collections
+import hashlib
+import numpy
+import pandas as pd
+
+# The number of fitted repairers kept by get_repairer.
+REPAIRER_CACHE_SIZE = 8
+
+_repairers = collections.OrderedDict()
+
+def get_repairer(train_df, single_sensitive, features_to_ignore):
+    """
+    Returns a QuantileRepairer fitted on train_df.  Repairers are cached on the contents of the
+    training data (including its index, which identifies the split), so the runs for all repair
+    levels and for all models wrapped by FeldmanAlgorithm reuse a single fit.
+    """
+    key = (hashlib.sha1(pd.util.hash_pandas_object(train_df).values).hexdigest(),
+           tuple(train_df.columns), single_sensitive, tuple(features_to_ignore))
+    if key in _repairers:
+        _repairers.move_to_end(key)
+        return _repairers[key]
+
+    repairer = QuantileRepairer(train_df, single_sensitive, features_to_ignore)
+    _repairers[key] = repairer
+    if len(_repairers) > REPAIRER_CACHE_SIZE:
+        _repairers.popitem(last=False)
+    return repairer
+
+class QuantileRepairer():
+    """
+    A NumPy implementation of the numerical repair of BlackBoxAuditing's Repairer (Feldman et
+    al.), fitted on the training data and then applicable to any data frame with the same columns.
+
+    For each numerical column, the sorted distinct values of each group (value of the sensitive
+    attribute) are split into the same number of quantiles, and the values in each quantile are
+    mapped to the median over the groups of the groups' medians in that quantile.  A value is
+    repaired by moving it that fraction (the repair level) of the way to its target, counted in
+    the positions of the sorted distinct values of the column, so that repaired values are always
+    values that occur in the training data.  On the training data, this gives the same numerical
+    columns as BlackBoxAuditing.
+
+    The sensitive attribute, non-numerical columns and the features to ignore are left unchanged.
+    (BlackBoxAuditing also relabels part of the sensitive attribute, with its own random draws,
+    but the models wrapped by FeldmanAlgorithm drop the sensitive attributes before training.)
+    """
+
+    def __init__(self, train_df, single_sensitive, features_to_ignore=[]):
+        self.single_sensitive = single_sensitive
+        sensitive = train_df[single_sensitive].values
+        self.groups = numpy.unique(sensitive)
+
+        self.columns = [col for col in train_df.columns
+                        if col != single_sensitive and not col in features_to_ignore and
+                           pd.api.types.is_numeric_dtype(train_df[col])]
+        self.column_maps = dict((col, self.fit_column(train_df[col].values, sensitive))
+                                for col in self.columns)
+
+        # the sorted distinct values of all columns, as floats, with each column's offset, so that
+        # all columns can be repaired at once
+        values = [self.column_maps[col][0].astype(float) for col in self.columns]
+        self.offsets = numpy.cumsum([0] + [len(v) for v in values[:-1]]).astype(int)
+        self.all_values = numpy.concatenate(values) if values else numpy.empty(0)
+
+    def fit_column(self, col, sensitive):
+        """
+        Returns the sorted distinct values of the column and, for each group, the sorted distinct
+        values in that group and the positions of their targets among the values of the column.
+        """
+        values = numpy.unique(col)
+        group_values = [numpy.unique(col[sensitive == group]) for group in self.groups]
+
+        # The quantile boundaries are computed as in BlackBoxAuditing, which accumulates the
+        # quantile size in a float, so the rounding of the boundaries is the same.
+        num_quantiles = min(len(v) for v in group_values)
+        offsets = numpy.cumsum(numpy.r_[0.0, numpy.repeat(1.0 / num_quantiles, num_quantiles)])
+        bounds = [numpy.rint(offsets * len(v)).astype(int) for v in group_values]
+
+        # the (lower) median of the groups' (lower) medians of every quantile
+        targets = numpy.empty(num_quantiles, dtype=int)
+        for quantile in range(num_quantiles):
+            medians = [v[b[quantile] + (b[quantile + 1] - b[quantile] - 1) // 2]
+                       for v, b in zip(group_values, bounds) if b[quantile + 1] > b[quantile]]
+            medians.sort()
+            targets[quantile] = numpy.searchsorted(values, medians[(len(medians) - 1) // 2])
+
+        group_targets = []
+        for v, b in zip(group_values, bounds):
+            quantiles = numpy.searchsorted(b, numpy.arange(len(v)), side='right') - 1
+            group_targets.append(targets[numpy.clip(quantiles, 0, num_quantiles - 1)])
+        return values, group_values, group_targets
+
+    def get_positions(self, col_name, col, sensitive):
+        """
+        Returns the positions of the column's values among the sorted distinct training values
+        and the positions of their fully repaired values.  Values of groups that do not occur in
+        the training data are their own targets.
+        """
+        values, group_values, group_targets = self.column_maps[col_name]
+        current = numpy.clip(numpy.searchsorted(values, col), 0, len(values) - 1)
+        target = current.copy()
+        for group, v, t in zip(self.groups, group_values, group_targets):
+            rows = sensitive == group
+            quantiles = numpy.searchsorted(v, col[rows], side='right') - 1
+            target[rows] = t[numpy.clip(quantiles, 0, len(v) - 1)]
+        return current, target
+
+    def repair(self, data_df, repair_level):
+        """
+        Returns a copy of data_df repaired to the given level in [0, 1].
+        """
+        return next(self.repair_levels(data_df, [repair_level]))
+
+    def repair_levels(self, data_df, repair_levels):
+        """
+        Yields copies of data_df repaired to each of the given levels, in order.  The positions of
+        the fully repaired values are found once, and each level only interpolates towards them
+        (for all columns at once), so a copy is only created when the generator is advanced to it.
+        """
+        original = dict((col_name, data_df[col_name].values) for col_name in data_df.columns)
+        sensitive = original[self.single_sensitive]
+        data = numpy.empty((len(data_df), len(self.columns)))
+        current = numpy.empty((len(data_df), len(self.columns)), dtype=int)
+        target = numpy.empty((len(data_df), len(self.columns)), dtype=int)
+        for j, col_name in enumerate(self.columns):
+            data[:, j] = original[col_name]
+            current[:, j], target[:, j] = self.get_positions(col_name, data[:, j], sensitive)
+        current += self.offsets
+        target += self.offsets
+
+        for repair_level in repair_levels:
+            shift = numpy.rint((target - current) * repair_level).astype(int)
+            # values that are not moved are kept as they are, even if they do not occur in training
+            repaired = numpy.where(shift == 0, data, self.all_values[current + shift])
+            columns = dict(original)
+            for j, col_name in enumerate(self.columns):
+                columns[col_name] = repaired[:, j].astype(original[col_name].dtype)
+            yield pd.DataFrame(columns, index=data_df.index)
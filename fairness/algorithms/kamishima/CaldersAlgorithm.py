@@ -1,9 +1,35 @@
 from fairness.algorithms.Algorithm import Algorithm
+from fairness.algorithms.kamishima.KamishimaAlgorithm import KAMFADM_DIR, import_kamfadm
 import numpy
+import pandas as pd
 import tempfile
 import os
 import subprocess
 
+def create_calders_matrices(train_df, test_df, class_attr, sensitive_attrs, single_sensitive):
+    """
+    The Calders code only handles discrete values, so the values of every column are encoded as
+    0, 1, ... in order of their first appearance in the train and then the test set.  Returns
+    the encoded train and test matrices (the nonsensitive attributes, then the single sensitive
+    attribute, then the class), the number of values of each nonsensitive attribute, and the
+    class values in the order of their codes.
+    """
+    nonsensitive = [col for col in train_df
+                    if col != class_attr and col not in sensitive_attrs]
+
+    x = []
+    nfv = []
+    for col in nonsensitive + [single_sensitive, class_attr]:
+        codes, values = pd.factorize(pd.concat([train_df[col], test_df[col]],
+                                               ignore_index=True),
+                                     use_na_sentinel=False)
+        x.append(codes)
+        nfv.append(max(2, len(values)))
+
+    result = numpy.array(x, dtype=numpy.int32).T
+    n_train = len(train_df)
+    return result[:n_train], result[n_train:], nfv[:len(nonsensitive)], values
+
 class CaldersAlgorithm(Algorithm):
     """
     Notes:
@@ -12,11 +38,16 @@ class CaldersAlgorithm(Algorithm):
     it to have python3 support by adding a minimal commands.py module with
     a getoutput function.
 
+    - By default, fadm.nb.cv2nb.CaldersVerwerTwoNaiveBayes is trained and
+    applied in-process, as train_cv2nb.py and predict_nb.py would do.  Pass
+    use_subprocess=True to run these scripts on temporary files instead.
+
     """
 
-    def __init__(self):
+    def __init__(self, use_subprocess=False):
         Algorithm.__init__(self)
         self.name = "Calders"
+        self.use_subprocess = use_subprocess
 
     def run(self, train_df, test_df, class_attr, positive_class_val, sensitive_attrs,
             single_sensitive, privileged_vals, params):
@@ -30,65 +61,63 @@ class CaldersAlgorithm(Algorithm):
         else:
             class_type = type(value_0.item()) # this should be numpy.int64 or numpy.int32,
 
-        def create_file_in_calders_format(df, dicts):
-            y = df[class_attr]
-            s = df[single_sensitive]
-
-            x = []
-            
-            for col in df:
-                if col not in dicts:
-                    col_dict = {}
-                    dicts[col] = col_dict
-                else:
-                    col_dict = dicts[col]
-                # col_dict = dicts.setdefault(col, {})
-                if col == class_attr:
-                    continue
-                if col in sensitive_attrs:
-                    continue
-                values = []
-                for val in df[col].values:
-                    values.append(col_dict.setdefault(val, len(col_dict)))
-                x.append(numpy.array(values, dtype=numpy.int32))
-
-            for col in [single_sensitive, class_attr]:
-                if col not in dicts:
-                    col_dict = {}
-                    dicts[col] = col_dict
-                else:
-                    col_dict = dicts[col]
-                values = []
-                for val in df[col].values:
-                    values.append(col_dict.setdefault(val, len(col_dict)))
-                x.append(numpy.array(values, dtype=numpy.int32))
-
-            result = numpy.array(x).T
+        train, test, nfv, class_values = \
+            create_calders_matrices(train_df, test_df, class_attr, sensitive_attrs,
+                                    single_sensitive)
+        beta_val = params['beta']
+
+        if self.use_subprocess:
+            predictions = self.run_subprocess(train, test, nfv, beta_val)
+        else:
+            predictions = self.run_in_process(train, test, nfv, beta_val)
+
+        predictions_correct = [class_type(class_values[int(x)]) for x in predictions]
+
+        return predictions_correct, []
+
+    def run_in_process(self, train, test, nfv, beta_val):
+        """
+        Trains and predicts as train_cv2nb.py and predict_nb.py do, but directly on the given
+        matrices.
+        """
+        import_kamfadm()
+        from fadm.nb.cv2nb import CaldersVerwerTwoNaiveBayes
+
+        # the scripts ignore all floating point errors, as numpy.seterr(all='ignore') does.
+        with numpy.errstate(all='ignore'):
+            clr = CaldersVerwerTwoNaiveBayes(len(nfv), nfv, beta=beta_val)
+            clr.fit(train[:, :-1], train[:, -1], 1)
+            p = clr.predict_proba(test[:, :-1])
+
+        return numpy.argmax(p, 1)
+
+    def run_subprocess(self, train, test, nfv, beta_val):
+        """
+        Trains and predicts by writing the given matrices to temporary files and running the
+        original train_cv2nb.py and predict_nb.py scripts on them.  The temporary files are
+        removed afterwards.
+        """
+        temp_names = []
+
+        def create_temp_file():
             fd, name = tempfile.mkstemp()
             os.close(fd)
-            numpy.savetxt(name, result, fmt='%d')
+            temp_names.append(name)
+            return name
+
+        def create_file_in_calders_format(matrix):
+            name = create_temp_file()
+            numpy.savetxt(name, matrix, fmt='%d')
             return name
-        
-        train_col_sets = list(set(train_df[col]) for col in train_df
-                              if col not in sensitive_attrs + [class_attr])
-        test_col_sets = list(set(test_df[col]) for col in test_df
-                             if col not in sensitive_attrs + [class_attr])
-        lengths = list(max(2, len(a.union(b))) for (a,b) in zip(train_col_sets, test_col_sets))
-        nfv = ":".join(str(l) for l in lengths)
 
         try:
-            fd, model_name = tempfile.mkstemp()
-            os.close(fd)
-            fd, output_name = tempfile.mkstemp()
-            os.close(fd)
-            dicts = {}
-            train_name = create_file_in_calders_format(train_df, dicts)
-            test_name = create_file_in_calders_format(test_df, dicts)
-            beta_val = params['beta']
-            BASE_DIR = os.path.dirname(__file__)
-            cmdline = ['python3', BASE_DIR + '/kamfadm-2012ecmlpkdd/train_cv2nb.py',
+            model_name = create_temp_file()
+            output_name = create_temp_file()
+            train_name = create_file_in_calders_format(train)
+            test_name = create_file_in_calders_format(test)
+            cmdline = ['python3', KAMFADM_DIR + '/train_cv2nb.py',
                             '-b', str(beta_val),
-                            '-f', nfv,
+                            '-f', ":".join(str(l) for l in nfv),
                             '-i', train_name,
                             '-o', model_name,
                             '--quiet']
@@ -99,7 +128,7 @@ class CaldersAlgorithm(Algorithm):
                     raise Exception("Training procedure failed")
             except subprocess.TimeoutExpired:
                 raise Exception("Training procedure timeout")
-            result2 = subprocess.run(['python3', BASE_DIR + '/kamfadm-2012ecmlpkdd/predict_nb.py',
+            result2 = subprocess.run(['python3', KAMFADM_DIR + '/predict_nb.py',
                             '-i', test_name,
                             '-m', model_name,
                             '-o', output_name,
@@ -109,18 +138,10 @@ class CaldersAlgorithm(Algorithm):
 
             m = numpy.loadtxt(output_name)
 
-            inv_class_dict = dict((v,k) for (k,v) in dicts[class_attr].items())
-
-            predictions = m[:,1]
-            predictions_correct = [class_type(inv_class_dict[x]) for x in predictions]
-
-            return predictions_correct, []
+            return m[:,1]
         finally:
-            pass
-            # os.unlink(train_name)
-            # os.unlink(model_name)
-            # os.unlink(test_name)
-            # os.unlink(output_name)
+            for name in temp_names:
+                os.unlink(name)
 
     def get_supported_data_types(self):
         return set(["numerical-binsensitive"])
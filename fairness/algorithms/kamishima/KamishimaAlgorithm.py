@@ -1,8 +1,43 @@
 from fairness.algorithms.Algorithm import Algorithm
+from fairness.algorithms.utils import load_module
 import numpy
 import tempfile
 import os
 import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(__file__)
+KAMFADM_DIR = os.path.join(BASE_DIR, 'kamfadm-2012ecmlpkdd')
+
+def import_kamfadm():
+    """
+    Loads the downloaded fadm package once, as fadm, so that its modules (e.g., fadm.lr.pr) can
+    be imported and run in-process instead of through its command line scripts.  sys.path is
+    left as it is.
+    """
+    if 'fadm' not in sys.modules:
+        load_module('fadm', os.path.join(KAMFADM_DIR, 'fadm', '__init__.py'))
+
+def create_kamishima_matrix(df, class_attr, sensitive_attrs, single_sensitive):
+    """
+    Returns the matrix taken by train_pr.py and predict_lr.py (see KamishimaAlgorithm): the
+    nonsensitive attributes, then the single sensitive attribute, then the class.
+    """
+    y = df[class_attr]
+    s = df[single_sensitive]
+
+    x = []
+    for col in df:
+        if col == class_attr:
+            continue
+        if col in sensitive_attrs:
+            continue
+        x.append(numpy.array(df[col].values, dtype=numpy.float64))
+
+    x.append(numpy.array(s, dtype=numpy.float64))
+    x.append(numpy.array(y, dtype=numpy.float64))
+
+    return numpy.array(x).T
 
 class KamishimaAlgorithm(Algorithm):
     """
@@ -38,11 +73,34 @@ class KamishimaAlgorithm(Algorithm):
     second-to-last column as the sensitive attribute, and pr.py:265-268
     will take the remaining columns as non-sensitive.
 
+    ## Running in-process
+
+    By default, the matrix described above is built in memory and handed
+    directly to fadm.lr.pr.LRwPRType4, with the same settings as train_pr.py
+    (C=1.0, itype=3, a single try) and the same argmax prediction as
+    predict_lr.py, so no temporary files or python subprocesses are needed.
+    Pass use_subprocess=True to run the original scripts instead, e.g., to
+    check that both give the same predictions.
+
+    ## Sweeping eta
+
+    With eta_path=True, a parameter search over eta (see ParamGridSearch)
+    trains the models for all etas as one regularization path
+    (fadm.lr.pr.LRwPRType4Path): in increasing order of eta, each model
+    starting from the coefficients of the previous one instead of from
+    itype=3, which skips the initial logistic regressions of all but the
+    first model and can shorten the optimizations.  Since the objective is
+    not convex, the warm-started models can end in different local optima
+    than separate runs, especially for large etas, so this is not the
+    default.
+
     """
 
-    def __init__(self):
+    def __init__(self, use_subprocess=False, eta_path=False):
         Algorithm.__init__(self)
         self.name = "Kamishima"
+        self.use_subprocess = use_subprocess
+        self.eta_path = eta_path
 
     def run(self, train_df, test_df, class_attr, positive_class_val, sensitive_attrs,
             single_sensitive, privileged_vals, params):
@@ -52,42 +110,105 @@ class KamishimaAlgorithm(Algorithm):
 
         class_type = type(train_df[class_attr].values[0].item())
 
-        def create_file_in_kamishima_format(df):
-            y = df[class_attr]
-            s = df[single_sensitive]
+        train = create_kamishima_matrix(train_df, class_attr, sensitive_attrs, single_sensitive)
+        test = create_kamishima_matrix(test_df, class_attr, sensitive_attrs, single_sensitive)
+        eta_val = params['eta']
 
-            x = []
-            for col in df:
-                if col == class_attr:
-                    continue
-                if col in sensitive_attrs:
-                    continue
-                x.append(numpy.array(df[col].values, dtype=numpy.float64))
+        if self.use_subprocess:
+            predictions = self.run_subprocess(train, test, eta_val)
+        else:
+            predictions = self.run_in_process(train, test, eta_val)
 
-            x.append(numpy.array(s, dtype=numpy.float64))
-            x.append(numpy.array(df[class_attr], dtype=numpy.float64))
+        predictions_correct = [class_type(x) for x in predictions]
+
+        return predictions_correct, []
 
-            result = numpy.array(x).T
+    def run_param_values(self, train_df, test_df, class_attr, positive_class_val, sensitive_attrs,
+                         single_sensitive, privileged_vals, param_name, param_vals):
+        """
+        Trains the models for all given etas as one warm-started path if eta_path is set,
+        otherwise runs each eta separately.
+        """
+        if not self.eta_path or self.use_subprocess or param_name != 'eta':
+            return Algorithm.run_param_values(self, train_df, test_df, class_attr,
+                                              positive_class_val, sensitive_attrs,
+                                              single_sensitive, privileged_vals, param_name,
+                                              param_vals)
+
+        class_type = type(train_df[class_attr].values[0].item())
+        train = create_kamishima_matrix(train_df, class_attr, sensitive_attrs, single_sensitive)
+        test = create_kamishima_matrix(test_df, class_attr, sensitive_attrs, single_sensitive)
+        etas = sorted(set(param_vals))
+
+        try:
+            path_predictions = self.run_path_in_process(train, test, etas)
+        except Exception as e:
+            print("eta path failed, running each eta separately: %s" % e)
+            return Algorithm.run_param_values(self, train_df, test_df, class_attr,
+                                              positive_class_val, sensitive_attrs,
+                                              single_sensitive, privileged_vals, param_name,
+                                              param_vals)
+
+        predictions_by_eta = {}
+        for eta_val, predictions in zip(etas, path_predictions):
+            predictions_by_eta[eta_val] = [class_type(x) for x in predictions]
+        return [(eta_val, predictions_by_eta[eta_val]) for eta_val in param_vals]
+
+    def run_in_process(self, train, test, eta_val):
+        """
+        Trains and predicts as train_pr.py and predict_lr.py do, but directly on the given
+        matrices.
+        """
+        import_kamfadm()
+        from fadm.lr.pr import LRwPRType4
+        from fadm.util import fill_missing_with_mean
+
+        # the scripts ignore all floating point errors, as numpy.seterr(all='ignore') does.
+        with numpy.errstate(all='ignore'):
+            clr = LRwPRType4(eta=eta_val, C=1.0)
+            clr.fit(fill_missing_with_mean(train[:, :-1]), train[:, -1], 1, itype=3)
+            p = clr.predict_proba(fill_missing_with_mean(test[:, :-1]))
+
+        return numpy.argmax(p, 1)
+
+    def run_path_in_process(self, train, test, etas):
+        """
+        As run_in_process, but for each of the given etas, in order, with each model starting from
+        the previous one.  Returns one row of predictions per eta.
+        """
+        import_kamfadm()
+        from fadm.lr.pr import LRwPRType4Path
+        from fadm.util import fill_missing_with_mean
+
+        with numpy.errstate(all='ignore'):
+            path = LRwPRType4Path(etas, C=1.0)
+            path.fit(fill_missing_with_mean(train[:, :-1]), train[:, -1], 1, itype=3)
+            return path.predict(fill_missing_with_mean(test[:, :-1]))
+
+    def run_subprocess(self, train, test, eta_val):
+        """
+        Trains and predicts by writing the given matrices to temporary files and running the
+        original train_pr.py and predict_lr.py scripts on them.
+        """
+        def create_file_in_kamishima_format(matrix):
             fd, name = tempfile.mkstemp()
             os.close(fd)
-            numpy.savetxt(name, result)
+            numpy.savetxt(name, matrix)
             return name
 
         fd, model_name = tempfile.mkstemp()
         os.close(fd)
         fd, output_name = tempfile.mkstemp()
         os.close(fd)
-        train_name = create_file_in_kamishima_format(train_df)
-        test_name = create_file_in_kamishima_format(test_df)
-        eta_val = params['eta']
+        train_name = create_file_in_kamishima_format(train)
+        test_name = create_file_in_kamishima_format(test)
 
-        BASE_DIR = os.path.dirname(__file__)
-        subprocess.run(['python3', BASE_DIR + '/kamfadm-2012ecmlpkdd/train_pr.py',
+        subprocess.run(['python3', KAMFADM_DIR + '/train_pr.py',
                         '-e', str(eta_val),
                         '-i', train_name,
                         '-o', model_name,
                         '--quiet'])
-        subprocess.run(['python3', BASE_DIR + '/kamfadm-2012ecmlpkdd/predict_lr.py',
+        subprocess.run(['python3', KAMFADM_DIR + '/predict_lr.py',
                         '-i', test_name,
                         '-m', model_name,
                         '-o', output_name,
@@ -99,10 +220,7 @@ class KamishimaAlgorithm(Algorithm):
         m = numpy.loadtxt(output_name)
         os.unlink(output_name)
 
-        predictions = m[:,1]
-        predictions_correct = [class_type(x) for x in predictions]
-
-        return predictions_correct, []
+        return m[:,1]
 
     def get_supported_data_types(self):
         return set(["numerical-binsensitive"])
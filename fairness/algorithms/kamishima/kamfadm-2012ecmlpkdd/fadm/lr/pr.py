@@ -38,7 +38,7 @@ from sklearn.base import BaseEstimator, ClassifierMixin
 # Public symbols
 #==============================================================================
 
-__all__ = ['LRwPRType4']
+__all__ = ['LRwPRType4', 'LRwPRType4Path']
 
 #==============================================================================
 # Constants
@@ -77,6 +77,48 @@ def sigmoid(x, w):
 
     return 1.0 / (1.0 + np.exp(-s))
 
+def sigmoid_rows(X, W):
+    """ sigmoid(w_i^T x_i) for every row i
+    To suppress the warnings at np.exp, do "np.seterr(all='ignore')"
+
+    Parameters
+    ----------
+    X : array, shape=(n_samples, d)
+        input vectors
+    W : array, shape=(n_samples, d)
+        weights, W[i, :] is used for X[i, :]
+
+    -------
+    sigmoid : array, shape=(n_samples)
+        sigmoid(w_i^T x_i)
+    """
+
+    s = np.clip(np.einsum('ij,ij->i', X, W), -SIGMOID_RANGE, SIGMOID_RANGE)
+
+    return 1.0 / (1.0 + np.exp(-s))
+
+def sum_by_sensitive(a, s, n_sfv):
+    """ sums of the elements or rows of a for each sensitive value
+
+    Parameters
+    ----------
+    a : array, shape=(n_samples) or (n_samples, d)
+        values to sum
+    s : array, shape=(n_samples)
+        values of sensitive features
+    n_sfv : int
+        the number of sensitive feature values
+
+    -------
+    sums : array, shape=(n_sfv) or (n_sfv, d)
+        sums[si] is the sum of a[i] over the i such that s[i] is exactly si
+    """
+
+    if a.ndim == 1:
+        return np.bincount(s, weights=a, minlength=n_sfv)
+
+    return np.dot((s == np.arange(n_sfv)[:, np.newaxis]).astype(float), a)
+
 
 #==============================================================================
 # Classes
@@ -177,8 +219,7 @@ class LRwPRPredictProbaType2Mixin(LRwPR):
         coef = self.coef_.reshape(self.n_sfv_, self.n_features_)
 
         proba = np.empty((X.shape[0], N_CLASSES))
-        proba[:, 1] = [sigmoid(X[i, :], coef[s[i], :])
-                       for i in range(X.shape[0])]
+        proba[:, 1] = sigmoid_rows(X, coef[s, :])
         proba[:, 0] = 1.0 - proba[:, 1]
 
         return proba
@@ -213,7 +254,7 @@ class LRwPRFittingType1Mixin(LRwPR):
         if itype == 0:
             # clear by zeros
             self.coef_ = np.zeros(self.n_sfv_ * self.n_features_,
-                                  dtype=np.float)
+                                  dtype=float)
         elif itype == 1:
             # at random
             self.coef_ = np.random.randn(self.n_sfv_ * self.n_features_)
@@ -221,7 +262,7 @@ class LRwPRFittingType1Mixin(LRwPR):
         elif itype == 2:
             # learned by standard LR
             self.coef_ = np.empty(self.n_sfv_ * self.n_features_,
-                                  dtype=np.float)
+                                  dtype=float)
             coef = self.coef_.reshape(self.n_sfv_, self.n_features_)
 
             clr = LogisticRegression(C=self.C, penalty='l2',
@@ -232,7 +273,7 @@ class LRwPRFittingType1Mixin(LRwPR):
         elif itype == 3:
             # learned by standard LR
             self.coef_ = np.empty(self.n_sfv_ * self.n_features_,
-                                  dtype=np.float)
+                                  dtype=float)
             coef = self.coef_.reshape(self.n_sfv_, self.n_features_)
 
             for i in range(self.n_sfv_):
@@ -243,7 +284,7 @@ class LRwPRFittingType1Mixin(LRwPR):
         else:
             raise typeError
 
-    def fit(self, X, y, ns=N_S, itype=0, **kwargs):
+    def fit(self, X, y, ns=N_S, itype=0, coef_init=None, **kwargs):
         """ train this model
 
         Parameters
@@ -256,6 +297,9 @@ class LRwPRFittingType1Mixin(LRwPR):
             number of sensitive features. currently fixed to N_S
         itype : int
             type of initialization method
+        coef_init : array, shape=(`n_sfv_` * n_features), optional
+            initial coefficients, e.g., those of a model trained on the same
+            samples with another eta. if given, itype is ignored
         kwargs : any
             arguments to optmizer
         """
@@ -276,13 +320,16 @@ class LRwPRFittingType1Mixin(LRwPR):
         # set instance variables
         self.n_s_ = ns
         self.n_sfv_ = np.max(s) + 1
-        self.c_s_ = np.array([np.sum(s == si).astype(np.float)
+        self.c_s_ = np.array([np.sum(s == si).astype(float)
                               for si in range(self.n_sfv_)])
         self.n_features_ = X.shape[1]
         self.n_samples_ = X.shape[0]
 
         # optimization
-        self.init_coef(itype, X, y, s)
+        if coef_init is None:
+            self.init_coef(itype, X, y, s)
+        else:
+            self.coef_ = np.array(coef_init, dtype=float)
         self.coef_ = fmin_cg(self.loss,
                              self.coef_,
                              fprime=self.grad_loss,
@@ -328,12 +375,12 @@ class LRwPRObjetiveType4Mixin(LRwPR):
         ### constants
 
         # sigma = Pr[y=0|x,s] = sigmoid(w(s)^T x)
-        p = np.array([sigmoid(X[i, :], coef[s[i], :])
-                      for i in range(self.n_samples_)])
+        p = sigmoid_rows(X, coef[s, :])
+        log_p = np.log(p)
+        log_1p = np.log(1.0 - p)
 
         # rho(s) = Pr[y=0|s] = \sum_{(xi,si)in D st si=s} sigma(xi,si) / #D[s]
-        q = np.array([np.sum(p[s == si])
-                      for si in range(self.n_sfv_)]) / self.c_s_
+        q = sum_by_sensitive(p, s, self.n_sfv_) / self.c_s_
 
         # pi = Pr[y=0] = \sum_{(xi,si)in D} sigma(xi,si)
         r = np.sum(p) / self.n_samples_
@@ -342,19 +389,20 @@ class LRwPRObjetiveType4Mixin(LRwPR):
 
         # likelihood
         # \sum_{x,s,y in D} y log(sigma) + (1 - y) log(1 - sigma)
-        l = np.sum(y * np.log(p) + (1.0 - y) * np.log(1.0 - p))
-
         # fairness-aware regularizer
         # \sum_{x,s in D} \
         #    sigma(x,x)       [log(rho(s))     - log(pi)    ] + \
         #    (1 - sigma(x,s)) [log(1 - rho(s)) - log(1 - pi)]
-        f = np.sum(p * (np.log(q[s]) - np.log(r))
-             + (1.0 - p) * (np.log(1.0 - q[s]) - np.log(1.0 - r)))
+        # are summed together, per sample
+        log_q = (np.log(q) - np.log(r))[s]
+        log_1q = (np.log(1.0 - q) - np.log(1.0 - r))[s]
+        lf = np.sum(self.eta * (p * log_q + (1.0 - p) * log_1q)
+                    - (y * log_p + (1.0 - y) * log_1p))
 
         # l2 regularizer
         reg = np.sum(coef * coef)
 
-        l = -l + self.eta * f + 0.5 * self.C * reg
+        l = lf + 0.5 * self.C * reg
 #        print >> sys.stderr, l
         return l
 
@@ -378,8 +426,6 @@ class LRwPRObjetiveType4Mixin(LRwPR):
         """
 
         coef = coef_.reshape(self.n_sfv_, self.n_features_)
-        l_ = np.empty(self.n_sfv_ * self.n_features_)
-        l = l_.reshape(self.n_sfv_, self.n_features_)
 #        print >> sys.stderr, "grad_loss:", coef[0, :], coef[1, :]
 
         ### constants
@@ -387,29 +433,22 @@ class LRwPRObjetiveType4Mixin(LRwPR):
 
         # sigma = Pr[y=0|x,s] = sigmoid(w(s)^T x)
         # d_sigma(x,s) = d sigma / d w(s) = sigma (1 - sigma) x
-        p = np.array([sigmoid(X[i, :], coef[s[i], :])
-                      for i in range(self.n_samples_)])
-        dp = (p * (1.0 - p))[:, np.newaxis] * X
+        p = sigmoid_rows(X, coef[s, :])
+        dp = p * (1.0 - p)
 
         # rho(s) = Pr[y=0|s] = \sum_{(xi,si)in D st si=s} sigma(xi,si) / #D[s]
         # d_rho(s) = \sum_{(xi,si)in D st si=s} d_sigma(xi,si) / #D[s]
-        q = np.array([np.sum(p[s == si])
-                      for si in range(self.n_sfv_)]) / self.c_s_
-        dq = np.array([np.sum(dp[s == si, :], axis=0)
-                       for si in range(self.n_sfv_)]) \
-                       / self.c_s_[:, np.newaxis]
+        q = sum_by_sensitive(p, s, self.n_sfv_) / self.c_s_
+        dq = sum_by_sensitive(dp[:, np.newaxis] * X, s, self.n_sfv_) \
+             / self.c_s_[:, np.newaxis]
 
         # pi = Pr[y=0] = \sum_{(xi,si)in D} sigma(xi,si) / #D
         # d_pi = \sum_{(xi,si)in D} d_sigma(xi,si) / #D
         r = np.sum(p) / self.n_samples_
-        dr = np.sum(dp, axis=0) / self.n_samples_
+        dr = np.dot(self.c_s_, dq) / self.n_samples_
 
         # likelihood
         # l(si) = \sum_{x,y in D st s=si} (y - sigma(x, si)) x
-        for si in range(self.n_sfv_):
-            l[si, :] = np.sum((y - p)[s == si][:, np.newaxis] * X[s == si, :],
-                              axis=0)
-
         # fairness-aware regularizer
         # differentialy by w(s)
         # \sum_{x,s in {D st s=si} \
@@ -421,25 +460,25 @@ class LRwPRObjetiveType4Mixin(LRwPR):
         # - \sum_{x,s in {D st s=si} \
         #     [ {sigma(xi, si) - pi} / {pi (1 - pi)} ] \
         #     * d_pi
+        # the terms multiplying x are summed per sample before summing over D,
+        # while d_rho and d_pi are the same for all x with s=si
 
-        f1 = (np.log(q[s]) - np.log(r)) \
-             - (np.log(1.0 - q[s]) - np.log(1.0 - r))
-        f2 = (p - q[s]) / (q[s] * (1.0 - q[s]))
+        f1 = ((np.log(q) - np.log(r)) - (np.log(1.0 - q) - np.log(1.0 - r)))[s]
+        f2 = (p - q[s]) / (q * (1.0 - q))[s]
         f3 = (p - r) / (r * (1.0 - r))
-        f4 = f1[:, np.newaxis] * dp \
-            + f2[:, np.newaxis] * dq[s, :] \
-            - np.outer(f3, dr)
-        f = np.array([np.sum(f4[s == si, :], axis=0)
-                      for si in range(self.n_sfv_)])
+        lf = sum_by_sensitive((self.eta * f1 * dp - (y - p))[:, np.newaxis] * X,
+                              s, self.n_sfv_)
+        f = sum_by_sensitive(f2, s, self.n_sfv_)[:, np.newaxis] * dq \
+            - np.outer(sum_by_sensitive(f3, s, self.n_sfv_), dr)
 
         # l2 regularizer
         reg = coef
 
         # sum
-        l[:, :] = -l + self.eta * f + self.C * reg
+        l = lf + self.eta * f + self.C * reg
 #        print >> sys.stderr, "l =", l
 
-        return l_
+        return l.ravel()
 
 class LRwPRType4\
     (LRwPRObjetiveType4Mixin,
@@ -471,6 +510,99 @@ class LRwPRType4\
         self.n_sfv_ = 0
         self.minor_type = 4
 
+class LRwPRType4Path(object):
+    """ LRwPRType4 models trained for a sequence of penalty parameters
+
+    The models are trained in the order of `etas`, and each optimization
+    starts from the coefficients of the previous model (warm start), so
+    a sequence of nearby etas costs little more than a single training.
+
+    Parameters
+    ----------
+    etas : array-like, shape=(n_etas)
+        penalty parameters
+    C : float
+        regularization parameter
+    fit_intercept : bool
+        use a constant term
+    penalty : str
+        fixed to 'l2'
+
+    Attributes
+    ----------
+    `models_` : list of LRwPRType4, length=n_etas
+        models_[i] is the model trained with etas[i]
+    """
+
+    def __init__(self, etas, C=1.0, fit_intercept=True, penalty='l2'):
+
+        self.etas = list(etas)
+        self.C = C
+        self.fit_intercept = fit_intercept
+        self.penalty = penalty
+        self.models_ = []
+
+    def fit(self, X, y, ns=N_S, itype=0, **kwargs):
+        """ train the models
+
+        Parameters
+        ----------
+        X : array, shape = (n_samples, n_features)
+            feature vectors of samples
+        y : array, shape = (n_samples)
+            target class of samples
+        ns : int
+            number of sensitive features. currently fixed to N_S
+        itype : int
+            type of initialization method of the first model
+        kwargs : any
+            arguments to optmizer
+        """
+
+        self.models_ = []
+        coef = None
+        for eta in self.etas:
+            clr = LRwPRType4(eta=eta, C=self.C,
+                             fit_intercept=self.fit_intercept,
+                             penalty=self.penalty)
+            clr.fit(X, y, ns, itype=itype, coef_init=coef, **kwargs)
+            coef = clr.coef_
+            self.models_.append(clr)
+
+        return self
+
+    def predict_proba(self, X):
+        """ predict probabilities of every model
+
+        Parameters
+        ----------
+        X : array, shape=(n_samples, n_features)
+            feature vectors of samples
+
+        Returns
+        -------
+        y_proba : array, shape=(n_etas, n_samples, n_classes), dtype=float
+            y_proba[i] is the prediction of the model trained with etas[i]
+        """
+
+        return np.array([clr.predict_proba(X) for clr in self.models_])
+
+    def predict(self, X):
+        """ predict classes of every model
+
+        Parameters
+        ----------
+        X : array, shape=(n_samples, n_features)
+            feature vectors of samples
+
+        Returns
+        -------
+        y : array, shape=(n_etas, n_samples), dtype=int
+            y[i] is the prediction of the model trained with etas[i]
+        """
+
+        return np.argmax(self.predict_proba(X), 2)
+
 #==============================================================================
 # Module initialization
 #==============================================================================
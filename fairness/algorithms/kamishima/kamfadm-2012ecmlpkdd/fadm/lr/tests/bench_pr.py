@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+benchmark of the vectorized LRwPRType4 against the original per-sample loops
+
+run from the kamfadm-2012ecmlpkdd directory as::
+
+    python -m fadm.lr.tests.bench_pr [n_samples] [n_features]
+
+the defaults are about the size of the Adult data set
+"""
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import sys
+import timeit
+import numpy as np
+
+from fadm.lr.pr import LRwPRType4
+from fadm.lr.tests.test_pr import LRwPRType4Loop, make_data, setup_model
+
+##### Main routine #####
+
+def main(n_samples=45000, n_features=40):
+    np.seterr(all='ignore')
+    X, y = make_data(n_samples, n_features)
+    print("n_samples =", n_samples, "n_features =", n_features)
+
+    for name, cls in [("loop", LRwPRType4Loop), ("vectorized", LRwPRType4)]:
+        clr = cls(eta=1.0)
+        args = setup_model(clr, X, y)
+        coef = np.zeros(clr.n_sfv_ * clr.n_features_)
+        n = 3
+        t_loss = timeit.timeit(lambda: clr.loss(coef, *args), number=n) / n
+        t_grad = timeit.timeit(lambda: clr.grad_loss(coef, *args),
+                               number=n) / n
+        t_fit = timeit.timeit(lambda: cls(eta=1.0).fit(X, y, 1, itype=3),
+                              number=1)
+        print("%-10s loss %8.4fs  grad_loss %8.4fs  fit %8.2fs"
+              % (name, t_loss, t_grad, t_fit))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+from numpy.testing import assert_allclose
+import numpy as np
+import unittest
+
+from fadm.lr.pr import LRwPRType4, LRwPRType4Path, sigmoid
+
+##### Reference Implementation #####
+
+class LRwPRType4Loop(LRwPRType4):
+    """ LRwPRType4 with the original per-sample loops, used as a reference
+    for the vectorized loss, grad_loss and predict_proba
+    """
+
+    def predict_proba(self, X):
+        s = np.atleast_1d(np.squeeze(np.array(X)[:, -self.n_s_]).astype(int))
+        if self.fit_intercept:
+            X = np.c_[np.atleast_2d(X)[:, :-self.n_s_], np.ones(X.shape[0])]
+        else:
+            X = np.atleast_2d(X)[:, :-self.n_s_]
+        coef = self.coef_.reshape(self.n_sfv_, self.n_features_)
+
+        proba = np.empty((X.shape[0], 2))
+        proba[:, 1] = [sigmoid(X[i, :], coef[s[i], :])
+                       for i in range(X.shape[0])]
+        proba[:, 0] = 1.0 - proba[:, 1]
+
+        return proba
+
+    def loss(self, coef_, X, y, s):
+        coef = coef_.reshape(self.n_sfv_, self.n_features_)
+
+        p = np.array([sigmoid(X[i, :], coef[s[i], :])
+                      for i in range(self.n_samples_)])
+        q = np.array([np.sum(p[s == si])
+                      for si in range(self.n_sfv_)]) / self.c_s_
+        r = np.sum(p) / self.n_samples_
+
+        l = np.sum(y * np.log(p) + (1.0 - y) * np.log(1.0 - p))
+        f = np.sum(p * (np.log(q[s]) - np.log(r))
+             + (1.0 - p) * (np.log(1.0 - q[s]) - np.log(1.0 - r)))
+        reg = np.sum(coef * coef)
+
+        return -l + self.eta * f + 0.5 * self.C * reg
+
+    def grad_loss(self, coef_, X, y, s):
+        coef = coef_.reshape(self.n_sfv_, self.n_features_)
+        l_ = np.empty(self.n_sfv_ * self.n_features_)
+        l = l_.reshape(self.n_sfv_, self.n_features_)
+
+        p = np.array([sigmoid(X[i, :], coef[s[i], :])
+                      for i in range(self.n_samples_)])
+        dp = (p * (1.0 - p))[:, np.newaxis] * X
+        q = np.array([np.sum(p[s == si])
+                      for si in range(self.n_sfv_)]) / self.c_s_
+        dq = np.array([np.sum(dp[s == si, :], axis=0)
+                       for si in range(self.n_sfv_)]) \
+                       / self.c_s_[:, np.newaxis]
+        r = np.sum(p) / self.n_samples_
+        dr = np.sum(dp, axis=0) / self.n_samples_
+
+        for si in range(self.n_sfv_):
+            l[si, :] = np.sum((y - p)[s == si][:, np.newaxis] * X[s == si, :],
+                              axis=0)
+
+        f1 = (np.log(q[s]) - np.log(r)) \
+             - (np.log(1.0 - q[s]) - np.log(1.0 - r))
+        f2 = (p - q[s]) / (q[s] * (1.0 - q[s]))
+        f3 = (p - r) / (r * (1.0 - r))
+        f4 = f1[:, np.newaxis] * dp \
+            + f2[:, np.newaxis] * dq[s, :] \
+            - np.outer(f3, dr)
+        f = np.array([np.sum(f4[s == si, :], axis=0)
+                      for si in range(self.n_sfv_)])
+
+        l[:, :] = -l + self.eta * f + self.C * coef
+
+        return l_
+
+##### Utility Functions #####
+
+def make_data(n_samples, n_features, n_sfv=2, seed=0):
+    """ random samples in the format taken by LRwPRType4.fit: non-sensitive
+    features followed by a sensitive feature, and binary classes depending on
+    both
+    """
+
+    rs = np.random.RandomState(seed)
+    X = rs.randn(n_samples, n_features + 1)
+    X[:, -1] = rs.randint(n_sfv, size=n_samples)
+    w = rs.randn(n_features)
+    z = np.dot(X[:, :-1], w) + X[:, -1] - 0.5
+    y = (rs.rand(n_samples) < 1.0 / (1.0 + np.exp(-z))).astype(float)
+
+    return X, y
+
+def setup_model(clr, X, y):
+    """ set the attributes that fit sets before optimizing, and return the
+    arguments of loss and grad_loss
+    """
+
+    s = X[:, -1].astype(int)
+    X = np.c_[X[:, :-1], np.ones(X.shape[0])]
+    clr.n_s_ = 1
+    clr.n_sfv_ = np.max(s) + 1
+    clr.c_s_ = np.array([np.sum(s == si).astype(float)
+                         for si in range(clr.n_sfv_)])
+    clr.n_features_ = X.shape[1]
+    clr.n_samples_ = X.shape[0]
+
+    return X, y, s
+
+##### Test Classes #####
+
+class TestLRwPRType4(unittest.TestCase):
+    def setUp(self):
+        self.errstate = np.seterr(all='ignore')
+
+    def tearDown(self):
+        np.seterr(**self.errstate)
+
+    def test_loss_and_grad(self):
+        rs = np.random.RandomState(1)
+        for n_sfv in [2, 3]:
+            X, y = make_data(500, 6, n_sfv)
+            for eta in [0.0, 1.0, 30.0]:
+                m = LRwPRType4(eta=eta, C=0.5)
+                ref = LRwPRType4Loop(eta=eta, C=0.5)
+                args = setup_model(m, X, y)
+                setup_model(ref, X, y)
+                for trial in range(5):
+                    coef = rs.randn(m.n_sfv_ * m.n_features_)
+                    assert_allclose(m.loss(coef, *args),
+                                    ref.loss(coef, *args), rtol=1e-10)
+                    assert_allclose(m.grad_loss(coef, *args),
+                                    ref.grad_loss(coef, *args),
+                                    rtol=1e-8, atol=1e-8)
+
+    def test_predict_proba(self):
+        X, y = make_data(300, 4)
+        m = LRwPRType4(eta=1.0)
+        m.fit(X, y, 1, itype=0)
+        ref = LRwPRType4Loop(eta=1.0)
+        ref.__dict__.update(m.__dict__)
+        assert_allclose(m.predict_proba(X), ref.predict_proba(X), rtol=1e-12)
+
+    def test_fit(self):
+        X, y = make_data(400, 5)
+        for itype in [0, 3]:
+            m = LRwPRType4(eta=10.0)
+            m.fit(X, y, 1, itype=itype)
+            ref = LRwPRType4Loop(eta=10.0)
+            ref.fit(X, y, 1, itype=itype)
+            assert_allclose(m.coef_, ref.coef_, rtol=1e-5, atol=1e-6)
+            assert_allclose(m.f_loss_, ref.f_loss_, rtol=1e-8)
+
+class TestLRwPRType4Path(unittest.TestCase):
+    def setUp(self):
+        self.errstate = np.seterr(all='ignore')
+
+    def tearDown(self):
+        np.seterr(**self.errstate)
+
+    def runTest(self):
+        X, y = make_data(400, 5)
+        etas = [0.0, 1.0, 5.0]
+        path = LRwPRType4Path(etas).fit(X, y, 1, itype=3)
+        self.assertEqual(len(path.models_), 3)
+
+        # the first model is trained as usual, the others start from the
+        # coefficients of the previous one
+        m = LRwPRType4(eta=0.0)
+        m.fit(X, y, 1, itype=3)
+        assert_allclose(path.models_[0].coef_, m.coef_)
+        for i in range(1, len(etas)):
+            m = LRwPRType4(eta=etas[i])
+            m.fit(X, y, 1, coef_init=path.models_[i - 1].coef_)
+            assert_allclose(path.models_[i].coef_, m.coef_)
+
+        proba = path.predict_proba(X)
+        self.assertEqual(proba.shape, (3, 400, 2))
+        assert_allclose(proba[2], path.models_[2].predict_proba(X))
+        assert_allclose(path.predict(X), np.argmax(proba, 2))
+
+##### Main routine #####
+if __name__ == '__main__':
+    unittest.main()
@@ -280,9 +280,7 @@ class GaussianNaiveBayes(BaseNaiveBayes):
         log_proba = np.repeat(\
             self._predict_class_log_proba_upto_const()[np.newaxis, :],
             X.shape[0], axis=0)
-        for i in range(X.shape[0]):
-            log_proba[i, :] += \
-                self._predict_Gaussian_log_proba_upto_const(X[i, :])
+        log_proba += self._predict_Gaussian_log_likelihoods(X)
 
         return log_proba
 
@@ -329,6 +327,38 @@ class GaussianNaiveBayes(BaseNaiveBayes):
 
         return log_proba
 
+    def _predict_Gaussian_log_likelihoods(self, X):
+        """ log probabilities of the given feature values of all samples
+
+        the same as _predict_Gaussian_log_proba_upto_const applied to each
+        row of X, computed over the whole matrix at once
+
+        Parameters
+        ----------
+        X : array-like, shape=(n_samples, n_gfeatures), dtype=float
+            array of feature values
+
+        Returns
+        -------
+        y_log_proba : array, shape=(n_samples, n_classes), dtype=float
+            log probabilities of the given feature values
+        """
+
+        X = np.atleast_2d(X)
+        f = np.logical_and(self.f_valid_[np.newaxis, :], np.isfinite(X))
+        if not np.any(f):
+            return np.zeros((X.shape[0], self.n_classes))
+
+        v = self.f_valid_
+        X = np.where(f, X, 0.0)[:, np.newaxis, v]
+        m = self.x_mean_[np.newaxis, :, v]
+        var = self.x_var_[np.newaxis, :, v]
+        log_normal_pdf = - np.log(var) / 2.0 - (X - m) ** 2 / (2.0 * var)
+        log_proba = np.sum(np.where(f[:, np.newaxis, v], log_normal_pdf, 0.0),
+                           axis=2)
+
+        return log_proba
+
     def _get_mean_var(self):
         """ returns mean and variance parameters
 
@@ -398,7 +428,7 @@ class MultinomialNaiveBayes(BaseNaiveBayes):
 
         self.pf_ = []
         for i in range(self.n_mfeatures):
-            self.pf_.append(np.repeat(self.beta / np.float(self.nfv[i]),
+            self.pf_.append(np.repeat(self.beta / float(self.nfv[i]),
                                       self.n_classes * self.nfv[i]).\
                                       reshape((self.n_classes, self.nfv[i])))
 
@@ -473,9 +503,7 @@ class MultinomialNaiveBayes(BaseNaiveBayes):
             self._predict_class_log_proba_upto_const()[np.newaxis, :],
             X.shape[0], axis=0)
 
-        for i in range(X.shape[0]):
-            log_proba[i, :] = \
-                self._predict_multinomial_log_proba_upto_const(X[i, :])
+        log_proba[:, :] = self._predict_multinomial_log_likelihoods(X)
 
         return log_proba
 
@@ -503,6 +531,33 @@ class MultinomialNaiveBayes(BaseNaiveBayes):
 
         return log_proba
 
+    def _predict_multinomial_log_likelihoods(self, X):
+        """ log probabilities of the given feature values of all samples
+
+        the same as _predict_multinomial_log_proba_upto_const applied to each
+        row of X, computed over the whole matrix at once
+
+        Parameters
+        ----------
+        X : array-like, shape=(n_samples, n_mfeatures), dtype=float
+            array of feature values
+
+        Returns
+        -------
+        y_log_proba : array, shape=(n_samples, n_classes), dtype=float
+            log probabilities of the given feature values
+        """
+
+        X = np.atleast_2d(X)
+        log_proba = np.zeros((X.shape[0], self.n_classes))
+        for i in range(self.n_mfeatures):
+            f = np.isfinite(X[:, i])
+            log_pf = np.log(self.pf_[i]) \
+                - np.log(np.sum(self.pf_[i], axis=1))[:, np.newaxis]
+            log_proba[f, :] += log_pf[:, X[f, i].astype(int)].T
+
+        return log_proba
+
 class CompositeNaiveBayes(MultinomialNaiveBayes, GaussianNaiveBayes):
     """ naive Bayes classifier, p[x_i|c] follows Multinomial or Gaussian
     distribution
@@ -626,15 +681,13 @@ class CompositeNaiveBayes(MultinomialNaiveBayes, GaussianNaiveBayes):
         if self.n_gfeatures > 0:
             if not self.is_valid_params_:
                 self._update_mean_var()
-            for i in range(X.shape[0]):
-                log_proba[i, :] += \
-                    self._predict_Gaussian_log_proba_upto_const(X[i, self.gfeatures])
+            log_proba += \
+                self._predict_Gaussian_log_likelihoods(X[:, self.gfeatures])
 
         # multinomial probabiliteis
         if self.n_mfeatures > 0:
-            for i in range(X.shape[0]):
-                log_proba[i, :] += \
-                    self._predict_multinomial_log_proba_upto_const(X[i, self.mfeatures])
+            log_proba += \
+                self._predict_multinomial_log_likelihoods(X[:, self.mfeatures])
 
         return log_proba
 
@@ -119,9 +119,9 @@ class CaldersVerwerTwoNaiveBayes(BaseEstimator,
         """
 
         X = np.array(X)
-        s = X[:, -ns].astype(np.int)
+        s = X[:, -ns].astype(int)
         XX = X[:, :-ns]
-        y = np.array(y).astype(np.int)
+        y = np.array(y).astype(int)
         self.ns = ns
         self.n_samples = X.shape[0]
 
@@ -133,7 +133,10 @@ class CaldersVerwerTwoNaiveBayes(BaseEstimator,
             self.clr_[i].fit(XX[s == i, :], y[s == i])
 
         # modify joint statistics of y and s
-        numpos, disc = self._get_stats(X, y)
+        # only the class prior terms of predictions depend on pys_, so the
+        # log likelihoods of the non-sensitive features are computed once
+        log_likelihood = self._predict_log_likelihood(X)
+        numpos, disc = self._get_stats(log_likelihood, s)
 #        print >> sys.stderr, "numpos, disc =", numpos, disc
 #        print >> sys.stderr, "pys_ =", self.pys_[0, :], self.pys_[1, :]
         pos_flag = True
@@ -152,24 +155,25 @@ class CaldersVerwerTwoNaiveBayes(BaseEstimator,
                     self.pys_[0, 1] -= delta * self.pys_[1, 0]
                     self.pys_[1, 1] += delta * self.pys_[1, 0]
                     pos_flag = False
-            numpos, disc = self._get_stats(X, y)
+            numpos, disc = self._get_stats(log_likelihood, s)
 #            print >> sys.stderr, "numpos, disc =", numpos, disc
 #            print >> sys.stderr, "pys_ =", self.pys_[0, :], self.pys_[1, :]
 
-    def _get_stats(self, X, y):
-        """ get statistics
+    def _get_stats(self, log_likelihood, s):
+        """ get statistics of the predictions for the current `pys_`
 
         Parameters
         ----------
-        X : array, shape=(n_samples, n_features)
-            feature vectors of samples
-        y : array, shape=(n_samples)
-            target class of samples
+        log_likelihood : array, shape=(n_samples, n_classes)
+            log likelihoods of samples, see _predict_log_likelihood
+        s : array, shape=(n_samples), dtype=int
+            values of sensitive feature of samples
         """
 
-        py = self.predict(X)
-        s = X[:, -self.ns]
-        m = np.histogram2d(py, s, [2, 2], [[0, 2], [0, 2]])[0]
+        py = np.argmax(log_likelihood + self._log_prior()[s, :], axis=1)
+        m = np.bincount(py * self.N_S_VALUES + s,
+                        minlength=self.N_CLASSES * self.N_S_VALUES)\
+            .reshape((self.N_CLASSES, self.N_S_VALUES)).astype(float)
 
         numpos = np.sum(m[1, :])
         disc = m[1, 1] / np.sum(m[:, 1]) - m[1, 0] / np.sum(m[:, 0])
@@ -190,18 +194,48 @@ class CaldersVerwerTwoNaiveBayes(BaseEstimator,
             log probabilities up to constant term
         """
 
+        s = np.atleast_1d(X[:, -self.ns].astype(int))
+
+        return self._predict_log_likelihood(X) + self._log_prior()[s, :]
+
+    def _predict_log_likelihood(self, X):
+        """ log probabilities of non-sensitive features given classes, that
+        is, log probabilities up to constant term without the class prior
+        terms
+
+        Parameters
+        ----------
+        X : array-like, shape=(n_samples, n_features)
+            array of feature values
+
+        Returns
+        -------
+        log_likelihood : array-like, shape=(n_samples, n_classes)
+            log likelihoods
+        """
+
         s = np.atleast_1d(X[:, -self.ns].astype(int))
         XX = np.atleast_2d(X[:, :-self.ns])
 
-        log_proba = np.empty((X.shape[0], self.N_CLASSES))
+        log_likelihood = np.empty((X.shape[0], self.N_CLASSES))
         for si in np.unique(s):
-            log_proba[s == si, :] = \
+            log_likelihood[s == si, :] = \
                 self.clr_[si]._predict_composite_log_proba_upto_const(
-                    XX[s == si, :]) + \
-                np.log(self.pys_[:, si] +
-                       self.alpha / self.N_CLASSES)[np.newaxis, :]
+                    XX[s == si, :])
+
+        return log_likelihood
+
+    def _log_prior(self):
+        """ log class prior terms
+
+        Returns
+        -------
+        log_prior : array-like, shape=(N_S_VALUES, n_classes)
+            log_prior[si, :] is added to the log likelihoods of samples whose
+            sensitive feature is si
+        """
 
-        return log_proba
+        return np.log(self.pys_ + self.alpha / self.N_CLASSES).T
 
 #==============================================================================
 # Functions
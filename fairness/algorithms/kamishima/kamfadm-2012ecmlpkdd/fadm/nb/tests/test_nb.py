@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+from numpy.testing import assert_allclose, assert_array_equal
+import numpy as np
+import unittest
+
+##### Utility Functions #####
+
+def make_data(n_samples, nfv, seed=0):
+    """ random samples whose i-th feature is Gaussian if nfv[i] is 0, and
+    takes values in {0, ..., nfv[i] - 1} otherwise, with some missing values
+    """
+
+    rs = np.random.RandomState(seed)
+    y = rs.randint(2, size=n_samples)
+    X = np.empty((n_samples, len(nfv)))
+    for i, n in enumerate(nfv):
+        if n == 0:
+            X[:, i] = rs.randn(n_samples) + y
+        else:
+            X[:, i] = (rs.randint(n, size=n_samples) + y) % n
+    X[rs.rand(n_samples, len(nfv)) < 0.05] = np.nan
+
+    return X, y
+
+def fit_by_predicting(clr, X, y, delta=0.01):
+    """ CaldersVerwerTwoNaiveBayes.fit as originally written, predicting the
+    whole training set after every modification of the joint histogram
+    """
+
+    def get_stats():
+        m = np.histogram2d(clr.predict(X), X[:, -1], [2, 2],
+                           [[0, 2], [0, 2]])[0]
+        return np.sum(m[1, :]), \
+            m[1, 1] / np.sum(m[:, 1]) - m[1, 0] / np.sum(m[:, 0])
+
+    s = X[:, -1].astype(int)
+    clr.ns = 1
+    clr.n_samples = X.shape[0]
+    d_numpos = np.sum(y == 1)
+    clr.pys_ = np.histogram2d(y, s, [2, 2], [[0, 2], [0, 2]])[0]
+    for i in range(clr.N_S_VALUES):
+        clr.clr_[i].fit(X[s == i, :-1], y[s == i])
+
+    numpos, disc = get_stats()
+    pos_flag = True
+    while disc > 0.0 and pos_flag == True:
+        if numpos < d_numpos:
+            clr.pys_[1, 0] += delta * clr.pys_[0, 1]
+            clr.pys_[0, 0] -= delta * clr.pys_[0, 1]
+            if clr.pys_[0, 0] < 0.0:
+                clr.pys_[1, 0] -= delta * clr.pys_[0, 1]
+                clr.pys_[0, 0] += delta * clr.pys_[0, 1]
+                pos_flag = False
+        else:
+            clr.pys_[0, 1] += delta * clr.pys_[1, 0]
+            clr.pys_[1, 1] -= delta * clr.pys_[1, 0]
+            if clr.pys_[1, 1] < 0.0:
+                clr.pys_[0, 1] -= delta * clr.pys_[1, 0]
+                clr.pys_[1, 1] += delta * clr.pys_[1, 0]
+                pos_flag = False
+        numpos, disc = get_stats()
+
+##### Test Classes #####
+
+class TestCaldersVerwerTwoNaiveBayesFit(unittest.TestCase):
+    def setUp(self):
+        self.errstate = np.seterr(all='ignore')
+
+    def tearDown(self):
+        np.seterr(**self.errstate)
+
+    def runTest(self):
+        from fadm.nb.cv2nb import CaldersVerwerTwoNaiveBayes
+
+        nfv = [2, 3, 4, 2]
+        for seed in range(3):
+            X, y = make_data(500, nfv + [2], seed)
+            X[np.isnan(X[:, -1]), -1] = 1
+
+            # the sensitive feature favors the positive class
+            X[:, -1] = np.where(np.random.RandomState(seed).rand(500) < 0.8,
+                                y, X[:, -1])
+            m = CaldersVerwerTwoNaiveBayes(len(nfv), nfv)
+            m.fit(X, y)
+            ref = CaldersVerwerTwoNaiveBayes(len(nfv), nfv)
+            fit_by_predicting(ref, X, y)
+            assert_allclose(m.pys_, ref.pys_, rtol=1e-12)
+            assert_array_equal(m.predict(X), ref.predict(X))
+
+class TestCompositeNaiveBayes(unittest.TestCase):
+    def runTest(self):
+        from fadm.nb._nb import CompositeNaiveBayes
+
+        nfv = [2, 0, 3, 0, 5]
+        X, y = make_data(300, nfv)
+        m = CompositeNaiveBayes(2, len(nfv), nfv)
+        m.fit(X, y)
+
+        # vectorized log likelihoods equal the original per-sample ones
+        log_proba = m._predict_composite_log_proba_upto_const(X)
+        for i in range(X.shape[0]):
+            expected = \
+                m._predict_Gaussian_log_proba_upto_const(X[i, m.gfeatures]) + \
+                m._predict_multinomial_log_proba_upto_const(X[i, m.mfeatures])
+            assert_allclose(log_proba[i, :], expected, rtol=1e-12)
+
+        assert_array_equal(m.predict(X),
+                           np.argmax(m._predict_log_proba_upto_const(X), 1))
+
+class TestGaussianNaiveBayes(unittest.TestCase):
+    def runTest(self):
+        from fadm.nb._nb import GaussianNaiveBayes
+
+        X, y = make_data(200, [0, 0, 0])
+        m = GaussianNaiveBayes(2, 3)
+        m.fit(X, y)
+        log_proba = m._predict_log_proba_upto_const(X)
+        for i in range(X.shape[0]):
+            assert_allclose(log_proba[i, :],
+                            np.log(m.py_) +
+                            m._predict_Gaussian_log_proba_upto_const(X[i, :]),
+                            rtol=1e-12)
+
+##### Main routine #####
+if __name__ == '__main__':
+    unittest.main()
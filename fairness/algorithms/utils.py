@@ -0,0 +1,18 @@
+import importlib.util
+import sys
+
+def load_module(name, filename):
+    """
+    Loads the module in the given file as sys.modules[name] and returns it, without adding its
+    directory to sys.path.  If filename is a package's __init__.py, its submodules can then be
+    imported as name.submodule.  The module is removed from sys.modules again if loading fails.
+    """
+    spec = importlib.util.spec_from_file_location(name, filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[name]
+        raise
+    return module
@@ -1,16 +1,63 @@
 from fairness.algorithms.Algorithm import Algorithm
+from fairness.algorithms.utils import load_module
 import numpy
 import tempfile
 import os
+import shutil
 import subprocess
 import json
 import sys
-import numpy
+
+BASE_DIR = os.path.dirname(__file__)
+FAIR_CLASSIFICATION_DIR = os.path.join(BASE_DIR, 'fair-classification-master',
+                                       'fair_classification')
+RUN_CLASSIFIER_DIR = os.path.join(BASE_DIR, 'fair-classification-master', 'disparate_impact',
+                                  'run-classifier')
+
+def import_fair_classification():
+    """
+    Returns the utils and loss_funcs modules of the downloaded fair_classification code, loaded
+    once as fair_classification.utils and fair_classification.loss_funcs so that they do not
+    shadow other modules named utils or loss_funcs.  sys.path is left as it is.
+    """
+    if 'fair_classification.utils' in sys.modules:
+        return sys.modules['fair_classification.utils'], \
+            sys.modules['fair_classification.loss_funcs']
+
+    loss_funcs = load_module('fair_classification.loss_funcs',
+                             os.path.join(FAIR_CLASSIFICATION_DIR, 'loss_funcs.py'))
+    # utils imports loss_funcs as a top-level module (as run-classifier/main.py sets it up), so
+    # that name is only provided while utils is loaded
+    previous = sys.modules.get('loss_funcs')
+    sys.modules['loss_funcs'] = loss_funcs
+    try:
+        utils = load_module('fair_classification.utils',
+                            os.path.join(FAIR_CLASSIFICATION_DIR, 'utils.py'))
+    finally:
+        if previous is None:
+            del sys.modules['loss_funcs']
+        else:
+            sys.modules['loss_funcs'] = previous
+    return utils, loss_funcs
 
 class ZafarAlgorithmBase(Algorithm):
+    """
+    The classifier is trained by fair_classification.utils.train_model with the settings of
+    run-classifier/main.py.  The engine given to the constructor selects how:
+
+    - 'in-process' (the default): train_model is called directly on the NumPy arrays.
+    - 'npy': main.py is run in a separate process on .npy files, which it memory-maps.
+    - 'json': main.py is run in a separate process on JSON files, as originally done.
+    """
 
-    def __init__(self):
+    ENGINES = ['in-process', 'npy', 'json']
+
+    def __init__(self, engine='in-process'):
         Algorithm.__init__(self)
+        if engine not in self.ENGINES:
+            raise ValueError("Unknown Zafar engine %s, expected one of %s" %
+                             (engine, self.ENGINES))
+        self.engine = engine
 
     def get_supported_data_types(self):
         return set(["numerical-binsensitive"])
@@ -24,69 +71,153 @@ class ZafarAlgorithmBase(Algorithm):
         else:
             class_type = type(value_0.item()) # this should be numpy.int64 or numpy.int32,
 
-        def create_file(df):
+        def get_arrays(df):
+            # C order, as the arrays parsed from JSON files are: the optimization is sensitive
+            # enough to the rounding of dot products to be affected by the memory layout
+            x = numpy.ascontiguousarray(df.drop(columns=[class_attr]).values)
+            y = (2 * df[class_attr] - 1).values
+            sensitive = df[single_sensitive].values
+            return x, y, sensitive
+
+        train = get_arrays(train_df)
+        test = get_arrays(test_df)
+        setting, value = self.get_setting(params)
+
+        if self.engine == 'in-process':
+            predictions = self.run_in_process(train, test, setting, value)
+        else:
+            predictions = self.run_subprocess(train, test, single_sensitive, setting, value)
+
+        predictions_correct = [0 if class_type(x) == -1 else 1 for x in predictions]
+
+        # print("Predictions:  %s" % predictions_correct)
+        # print("ground truth: %s" % test_df[class_attr].values.tolist())
+        return predictions_correct, []
+
+    def run_in_process(self, train, test, setting, value):
+        """
+        Trains and predicts as run-classifier/main.py does, but directly on the given arrays.
+        """
+        ut, lf = import_fair_classification()
+        x_train, y_train, sensitive_train = train
+        x_train = ut.add_intercept(x_train)
+        x_test = ut.add_intercept(test[0])
+        x_control_train = { 'sensitive' : sensitive_train }
+
+        if setting == 'gamma':
+            mode = {"accuracy": 1, "gamma": float(value)}
+        elif setting == 'sep-gamma':
+            mode = {"accuracy": 1, "separation": 1, "gamma": float(value)}
+        elif setting == 'c':
+            mode = {"fairness": 1}
+        else:
+            mode = {}
+
+        thresh = {}
+        if setting == 'c':
+            thresh = { 'sensitive' : float(value) }
+
+        # main.py starts the optimization from a random point drawn right after importing utils,
+        # which seeds numpy; the same seed is used here, leaving the caller's random state as it
+        # was.
+        random_state = numpy.random.get_state()
+        numpy.random.seed(ut.SEED)
+        try:
+            w = ut.train_model(x_train, y_train, x_control_train, lf._logistic_loss,
+                               mode.get('fairness', 0), mode.get('accuracy', 0),
+                               mode.get('separation', 0), ['sensitive'], thresh,
+                               mode.get('gamma', None))
+        finally:
+            numpy.random.set_state(random_state)
+
+        return numpy.sign(numpy.dot(x_test, w))
+
+    def run_subprocess(self, train, test, single_sensitive, setting, value):
+        """
+        Writes the given arrays to a temporary directory, as .npy or JSON files depending on the
+        engine, and runs run-classifier/main.py on them in a separate process.
+        """
+        temp_dir = tempfile.mkdtemp()
+
+        def create_npy_dir(name, arrays):
+            x, y, sensitive = arrays
+            path = os.path.join(temp_dir, name)
+            os.mkdir(path)
+            numpy.save(os.path.join(path, "x.npy"), x)
+            numpy.save(os.path.join(path, "class.npy"), y)
+            numpy.save(os.path.join(path, "sensitive.npy"), sensitive)
+            return path
+
+        def create_file(name, arrays):
+            x, y, sensitive = arrays
             out = {}
-            out["x"] = df.drop(columns=[class_attr]).as_matrix().tolist()
-            out["class"] = (2 * df[class_attr] - 1).as_matrix().tolist()
+            out["x"] = x.tolist()
+            out["class"] = y.tolist()
             out["sensitive"] = {}
-            out["sensitive"][single_sensitive] = df[single_sensitive].as_matrix().tolist()
-            fd, name = tempfile.mkstemp()
-            os.close(fd)
-            out_file = open(name, "w")
+            out["sensitive"][single_sensitive] = sensitive.tolist()
+            path = os.path.join(temp_dir, name + ".json")
+            out_file = open(path, "w")
             json.dump(out, out_file)
             out_file.close()
-            return name
-
-        train_name = create_file(train_df)
-        test_name = create_file(test_df)
-        fd, predictions_name = tempfile.mkstemp()
-        os.close(fd)
-        # print("CURRENT DIR: %s" % os.getcwd())
-        # print("SENSITIVE ATTR: %s" % single_sensitive)
-
-        cmd = self.create_command_line(train_name, test_name, predictions_name, params)
-        BASE_DIR = os.path.dirname(__file__)
-        result = subprocess.run(cmd,
-            cwd = BASE_DIR + '/fair-classification-master/disparate_impact/run-classifier/')
-        os.unlink(train_name)
-        os.unlink(test_name)
-        if result.returncode != 0:
-            os.unlink(predictions_name)
-            raise Exception("Algorithm did not execute succesfully")
-        else:
+            return path
+
+        try:
+            if self.engine == 'npy':
+                train_name = create_npy_dir("train", train)
+                test_name = create_npy_dir("test", test)
+                predictions_name = os.path.join(temp_dir, "predictions.npy")
+            else:
+                train_name = create_file("train", train)
+                test_name = create_file("test", test)
+                predictions_name = os.path.join(temp_dir, "predictions.json")
+
+            cmd = ['python3', 'main.py',
+                   train_name,
+                   test_name,
+                   predictions_name,
+                   setting, str(value)]
+            result = subprocess.run(cmd, cwd = RUN_CLASSIFIER_DIR)
+            if result.returncode != 0:
+                raise Exception("Algorithm did not execute succesfully")
+
+            if self.engine == 'npy':
+                return numpy.load(predictions_name)
             predictions = open(predictions_name).read()
-            predictions = json.loads(predictions)
-            os.unlink(predictions_name)
-            # m = numpy.loadtxt(output_name)
-            # os.unlink(output_name)
+            return json.loads(predictions)
+        finally:
+            shutil.rmtree(temp_dir)
 
-            # predictions = m[:,1]
-            predictions_correct = [0 if class_type(x) == -1 else 1 for x in predictions]
-
-            # print("Predictions:  %s" % predictions_correct)
-            # print("ground truth: %s" % test_df[class_attr].as_matrix().tolist())
-            return predictions_correct, []
+    def get_setting(self, params):
+        """
+        Returns the setting and value arguments of run-classifier/main.py.
+        """
+        raise NotImplementedError("get_setting() in ZafarAlgorithmBase is not implemented")
 
 ##############################################################################
 
 class ZafarAlgorithmBaseline(ZafarAlgorithmBase):
 
-    def __init__(self):
-        ZafarAlgorithmBase.__init__(self)
+    def __init__(self, engine='in-process'):
+        ZafarAlgorithmBase.__init__(self, engine)
         self.name = "ZafarBaseline"
 
-    def create_command_line(self, train_name, test_name, predictions_name, params):
-        return ['python3', 'main.py',
-                train_name,
-                test_name,
-                predictions_name,
-                'baseline', '0']
+    def get_setting(self, params):
+        return 'baseline', 0
 
 class ZafarAlgorithmAccuracy(ZafarAlgorithmBase):
-
-    def __init__(self):
-        ZafarAlgorithmBase.__init__(self)
-        self.name = "ZafarAccuracy"
+    """
+    With sep_constraint, gamma bounds the loss of each training point separately rather than the
+    total loss, and the points of the sensitive group classified as positive by the unconstrained
+    classifier stay positive (the fine-grained accuracy constraint of Zafar et al.).
+    """
+
+    def __init__(self, engine='in-process', sep_constraint=False):
+        ZafarAlgorithmBase.__init__(self, engine)
+        self.sep_constraint = sep_constraint
+        if sep_constraint:
+            self.name = "ZafarAccuracySep"
+        else:
+            self.name = "ZafarAccuracy"
 
     # take 10 logarithmic steps for gamma between 0.1 and 1.0
     def get_param_info(self):
@@ -95,20 +226,17 @@ class ZafarAlgorithmAccuracy(ZafarAlgorithmBase):
     def get_default_params(self):
         return {'gamma': 0.5}
 
-    def create_command_line(self, train_name, test_name, predictions_name, params):
-        return ['python3', 'main.py',
-                train_name,
-                test_name,
-                predictions_name,
-                'gamma',
-                str(params['gamma'])]
+    def get_setting(self, params):
+        if self.sep_constraint:
+            return 'sep-gamma', params['gamma']
+        return 'gamma', params['gamma']
 
 class ZafarAlgorithmFairness(ZafarAlgorithmBase):
 
-    def __init__(self):
-        ZafarAlgorithmBase.__init__(self)
+    def __init__(self, engine='in-process'):
+        ZafarAlgorithmBase.__init__(self, engine)
         self.name = "ZafarFairness"
-        
+
     # take 10 logarithmic steps for gamma between 0.1 and 1.0
     def get_param_info(self):
         return {'c': list(numpy.exp(numpy.linspace(numpy.log(0.001), numpy.log(1), 10)))}
@@ -116,11 +244,5 @@ class ZafarAlgorithmFairness(ZafarAlgorithmBase):
     def get_default_params(self):
         return {'c': 0.001}
 
-    def create_command_line(self, train_name, test_name, predictions_name, params):
-        return ['python3', 'main.py',
-                train_name,
-                test_name,
-                predictions_name,
-                'c',
-                str(params['c'])]
-
+    def get_setting(self, params):
+        return 'c', params['c']
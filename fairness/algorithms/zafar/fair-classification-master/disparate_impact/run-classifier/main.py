@@ -45,9 +45,21 @@ def load_json(filename):
     sensitive = dict((k, np.array(v)) for (k,v) in f["sensitive"].items())
     return x, y, sensitive
 
+def load_npy(dirname):
+    # a directory with x.npy, class.npy and sensitive.npy, memory-mapped rather than parsed
+    x = np.load(os.path.join(dirname, "x.npy"), mmap_mode='r')
+    y = np.load(os.path.join(dirname, "class.npy"), mmap_mode='r')
+    sensitive = {"sensitive": np.load(os.path.join(dirname, "sensitive.npy"), mmap_mode='r')}
+    return x, y, sensitive
+
+def load(filename):
+    if os.path.isdir(filename):
+        return load_npy(filename)
+    return load_json(filename)
+
 def main(train_file, test_file, output_file, setting, value):
-    x_train, y_train, x_control_train = load_json(train_file)
-    x_test, y_test, x_control_test = load_json(test_file)
+    x_train, y_train, x_control_train = load(train_file)
+    x_test, y_test, x_control_test = load(test_file)
 
     # X = ut.add_intercept(X) # add intercept to X before applying the linear classifier
     x_train = ut.add_intercept(x_train)
@@ -60,6 +72,8 @@ def main(train_file, test_file, output_file, setting, value):
 
     if setting == 'gamma':
         mode = {"accuracy": 1, "gamma": float(value)}
+    elif setting == 'sep-gamma':
+        mode = {"accuracy": 1, "separation": 1, "gamma": float(value)}
     elif setting == 'c':
         mode = {"fairness": 1}
     elif setting == 'baseline':
@@ -81,9 +95,12 @@ def main(train_file, test_file, output_file, setting, value):
                          
     # print("Model trained successfully.", file=sys.stderr)
 
-    predictions = predict(w, x_test).tolist()
+    predictions = predict(w, x_test)
+    if output_file.endswith(".npy"):
+        np.save(output_file, predictions)
+        return
     output_file = open(output_file, "w")
-    json.dump(predictions, output_file)
+    json.dump(predictions.tolist(), output_file)
     output_file.close()
 
     
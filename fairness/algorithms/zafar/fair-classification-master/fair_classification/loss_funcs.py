@@ -43,6 +43,33 @@ def _logistic_loss(w, X, y, return_arr=None):
 		out = -np.sum(log_logistic(yz))
 	return out
 
+def _logistic_loss_grad(w, X, y, return_arr=None):
+	"""Computes the gradient of the logistic loss with respect to w, or
+	the gradients of the losses of the individual samples if return_arr is
+	True.
+
+	Parameters
+	----------
+	w : ndarray, shape (n_features,) or (n_features + 1,)
+	    Coefficient vector.
+
+	X : {array-like, sparse matrix}, shape (n_samples, n_features)
+	    Training data.
+
+	y : ndarray, shape (n_samples,)
+	    Array of labels.
+
+	"""
+
+	yz = y * np.dot(X,w)
+	# d/dz -log(logistic(z)) = -logistic(-z)
+	yd = y * scipy.special.expit(-yz)
+	if return_arr == True:
+		out = -(yd[:, np.newaxis] * X)
+	else:
+		out = -np.dot(yd, X)
+	return out
+
 def _logistic_loss_l2_reg(w, X, y, lam=None):
 
 	if lam is None:
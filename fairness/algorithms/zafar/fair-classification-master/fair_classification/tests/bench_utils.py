@@ -0,0 +1,90 @@
+"""
+benchmark of train_model with the analytic gradients against the finite
+differences it used before, on 2/3 of the German and Adult data sets with the
+settings of run-classifier/main.py
+
+run from the fair_classification directory as::
+
+    python -m tests.bench_utils [german] [adult]
+
+besides the fit times, prints how far apart the decision values x.w of the
+two models are and how often their predictions agree; the German design
+matrix is rank deficient, so its weights themselves are not unique
+"""
+
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+import loss_funcs as lf
+import utils as ut
+from tests.test_utils import train_model_fd
+
+PREPROCESSED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', '..', '..', '..', 'data', 'preprocessed')
+
+MODES = [("baseline", 0, 0, {}, None),
+         ("c=0.01", 1, 0, {'s': 0.01}, None),
+         ("gamma=0.5", 0, 1, {}, 0.5)]
+
+##### Utility Functions #####
+
+def load_data(name):
+    """ the features with an intercept, classes in {-1, 1} and the sensitive
+    feature of the given data set, as the ZafarAlgorithm passes them; Adult's
+    numerical features are built from its categorical-binsensitive file, as
+    its numerical-binsensitive file is only a sample
+    """
+
+    if name == 'german':
+        df = pd.read_csv(os.path.join(PREPROCESSED_DIR, 'german_numerical-binsensitive.csv'))
+        class_attr, sensitive = 'credit', 'sex'
+        df[class_attr] = (df[class_attr] == 1).astype(int)
+    else:
+        df = pd.read_csv(os.path.join(PREPROCESSED_DIR, 'adult_categorical-binsensitive.csv'))
+        df = df.drop(columns=['race-sex'])
+        class_attr, sensitive = 'income-per-year', 'race'
+        df[class_attr] = (df[class_attr] == '>50K').astype(int)
+        df = pd.get_dummies(df, columns=[k for k in df.columns
+                                         if not pd.api.types.is_numeric_dtype(df[k])])
+        for k in ['age', 'education-num', 'capital-gain', 'capital-loss', 'hours-per-week']:
+            df[k] = (df[k] - df[k].mean()) / df[k].std()
+    df = df.astype(float)
+
+    rs = np.random.RandomState(0)
+    df = df.iloc[rs.permutation(len(df))[:int(len(df) * 2 / 3)]]
+    x = ut.add_intercept(np.ascontiguousarray(df.drop(columns=[class_attr]).values))
+    y = (2 * df[class_attr] - 1).values
+    return x, y, {'s': df[sensitive].values.astype(int)}
+
+def fit(train, x, y, x_control, fairness, accuracy, thresh, gamma):
+    np.random.seed(ut.SEED)
+    return train(x, y, x_control, lf._logistic_loss, fairness, accuracy, 0,
+                 ['s'], thresh, gamma)
+
+##### Main routine #####
+
+def main(names=('german', 'adult')):
+    for name in names:
+        x, y, x_control = load_data(name)
+        print(name, "n_samples =", x.shape[0], "n_features =", x.shape[1])
+        for mode, fairness, accuracy, thresh, gamma in MODES:
+            args = (x, y, x_control, fairness, accuracy, thresh, gamma)
+            w = [None, None]
+            def fit_analytic():
+                w[0] = fit(ut.train_model, *args)
+            def fit_fd():
+                w[1] = fit(train_model_fd, *args)
+            t_fd = timeit.timeit(fit_fd, number=1)
+            t_analytic = timeit.timeit(fit_analytic, number=1)
+            z, z_fd = np.dot(x, w[0]), np.dot(x, w[1])
+            print("%-10s finite differences %8.2fs  analytic %8.2fs"
+                  "  |dz|/|z| %.1e  predictions agree %.4f"
+                  % (mode, t_fd, t_analytic,
+                     np.linalg.norm(z - z_fd) / np.linalg.norm(z_fd),
+                     np.mean(np.sign(z) == np.sign(z_fd))))
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or ('german', 'adult'))
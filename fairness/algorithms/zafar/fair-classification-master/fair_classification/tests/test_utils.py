@@ -0,0 +1,123 @@
+"""
+checks of the analytic gradients given to SLSQP by train_model against the
+finite differences it used before
+
+run from the fair_classification directory as::
+
+    python -m tests.test_utils
+"""
+
+from numpy.testing import assert_allclose
+from scipy.optimize import approx_fprime, minimize
+import numpy as np
+import unittest
+
+import loss_funcs as lf
+import utils as ut
+
+##### Reference Implementation #####
+
+def minimize_fd(*args, **kwargs):
+    """ scipy.optimize.minimize without any of the given jacobians, so that
+    SLSQP approximates all of them by finite differences
+    """
+
+    kwargs['jac'] = None
+    kwargs['constraints'] = [dict((k, v) for k, v in c.items() if k != 'jac')
+                             for c in kwargs.get('constraints', [])]
+    return minimize(*args, **kwargs)
+
+def train_model_fd(*args, **kwargs):
+    """ train_model with finite difference gradients, as it was run before
+    the analytic ones were added
+    """
+
+    ut.minimize = minimize_fd
+    try:
+        return ut.train_model(*args, **kwargs)
+    finally:
+        ut.minimize = minimize
+
+##### Utility Functions #####
+
+def make_data(n_samples, n_features, seed=0):
+    """ random samples in the format taken by train_model: features with an
+    intercept, classes in {-1, 1}, and a binary sensitive feature that the
+    classes depend on
+    """
+
+    rs = np.random.RandomState(seed)
+    x = rs.randn(n_samples, n_features)
+    s = (rs.rand(n_samples) < 1.0 / (1.0 + np.exp(-2.0 * x[:, 0]))).astype(int)
+    w = rs.randn(n_features)
+    z = np.dot(x, w) + 2.0 * s - 1.0
+    y = np.where(rs.rand(n_samples) < 1.0 / (1.0 + np.exp(-z)), 1.0, -1.0)
+
+    return ut.add_intercept(x), y, {'s': s}
+
+def train_both(x, y, x_control, fairness, accuracy, sep, thresh, gamma):
+    """ returns the weights learned with the analytic and the finite
+    difference gradients, both starting from the same random point
+    """
+
+    weights = []
+    for train in [ut.train_model, train_model_fd]:
+        np.random.seed(ut.SEED)
+        weights.append(train(x, y, x_control, lf._logistic_loss, fairness,
+                             accuracy, sep, ['s'], thresh, gamma))
+    return weights
+
+##### Test Classes #####
+
+class TestGradients(unittest.TestCase):
+    def test_logistic_loss_grad(self):
+        x, y, x_control = make_data(300, 4)
+        rs = np.random.RandomState(1)
+        for trial in range(5):
+            w = rs.randn(x.shape[1])
+            assert_allclose(lf._logistic_loss_grad(w, x, y),
+                            approx_fprime(w, lf._logistic_loss, 1e-6, x, y),
+                            rtol=1e-4, atol=1e-4)
+            per_point = lf._logistic_loss_grad(w, x, y, return_arr=True)
+            assert_allclose(per_point.sum(axis=0), lf._logistic_loss_grad(w, x, y))
+
+    def test_cov_constraint(self):
+        x, y, x_control = make_data(300, 4)
+        cov_vec = ut.get_cov_vector(x, x_control['s'])
+        rs = np.random.RandomState(2)
+        for trial in range(5):
+            w = rs.randn(x.shape[1])
+            # the covariance test_sensitive_attr_constraint_cov computes
+            assert_allclose(ut.cov_constraint(w, cov_vec, 0.1),
+                            ut.test_sensitive_attr_constraint_cov(
+                                w, x, None, x_control['s'], 0.1, False))
+            assert_allclose(ut.cov_constraint_jac(w, cov_vec, 0.1),
+                            approx_fprime(w, ut.cov_constraint, 1e-7, cov_vec, 0.1),
+                            rtol=1e-5, atol=1e-8)
+
+class TestTrainModel(unittest.TestCase):
+    def setUp(self):
+        self.x, self.y, self.x_control = make_data(1000, 5)
+
+    def check_weights(self, fairness, accuracy, sep, thresh, gamma):
+        w, w_fd = train_both(self.x, self.y, self.x_control, fairness,
+                             accuracy, sep, thresh, gamma)
+        assert_allclose(w, w_fd, rtol=1e-5, atol=1e-6)
+        assert_allclose(lf._logistic_loss(w, self.x, self.y),
+                        lf._logistic_loss(w_fd, self.x, self.y), rtol=1e-5)
+
+    def test_unconstrained(self):
+        self.check_weights(0, 0, 0, {}, None)
+
+    def test_fairness_constraint(self):
+        self.check_weights(1, 0, 0, {'s': 0.01}, None)
+
+    def test_accuracy_constraint(self):
+        self.check_weights(0, 1, 0, {}, 0.5)
+
+    def test_sep_constraint(self):
+        self.check_weights(0, 1, 1, {}, 0.5)
+
+##### Main routine #####
+if __name__ == '__main__':
+    unittest.main()
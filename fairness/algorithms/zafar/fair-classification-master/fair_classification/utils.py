@@ -52,6 +52,7 @@ def train_model(x, y, x_control, loss_function, apply_fairness_constraints, appl
     assert((apply_accuracy_constraint == 1 and apply_fairness_constraints == 1) == False) # both constraints cannot be applied at the same time
 
     max_iter = 100000 # maximum number of iterations for the minimization algorithm
+    loss_grad = get_loss_grad(loss_function) # None lets the minimizer approximate the gradient by finite differences
 
     if apply_fairness_constraints == 0:
         constraints = []
@@ -65,6 +66,7 @@ def train_model(x, y, x_control, loss_function, apply_fairness_constraints, appl
             x0 = np.random.rand(x.shape[1],),
             args = f_args,
             method = 'SLSQP',
+            jac = loss_grad,
             options = {"maxiter":max_iter},
             constraints = constraints
             )
@@ -76,6 +78,7 @@ def train_model(x, y, x_control, loss_function, apply_fairness_constraints, appl
             x0 = np.random.rand(x.shape[1],),
             args = (x, y),
             method = 'SLSQP',
+            jac = loss_grad,
             options = {"maxiter":max_iter},
             constraints = []
             )
@@ -90,38 +93,47 @@ def train_model(x, y, x_control, loss_function, apply_fairness_constraints, appl
             old_loss = sum(initial_loss_arr)
             return ((1.0 + gamma) * old_loss) - new_loss
 
-        def constraint_protected_people(w,x,y): # dont confuse the protected here with the sensitive feature protected/non-protected values -- protected here means that these points should not be misclassified to negative class
-            return np.dot(w, x.T) # if this is positive, the constraint is satisfied
-        def constraint_unprotected_people(w,ind,old_loss,x,y):
-            
-            new_loss = loss_function(w, np.array([x]), np.array(y))
-            return ((1.0 + gamma) * old_loss) - new_loss
+        def constraint_gamma_all_jac(w, x, y, initial_loss_arr):
+            return -loss_grad(w, x, y)
+
+        def constraint_people(w, x, y, protected, initial_loss_arr): # one entry per point, all of them should be positive
+            # dont confuse the protected here with the sensitive feature protected/non-protected values -- protected here means that these points should not be misclassified to negative class
+            # the other points should not lose more than gamma of their own loss
+            new_loss_arr = loss_function(w, x, y, return_arr=True)
+            return np.where(protected, np.dot(x, w), ((1.0 + gamma) * initial_loss_arr) - new_loss_arr)
+
+        def constraint_people_jac(w, x, y, protected, initial_loss_arr): # every row only depends on its own point
+            return np.where(protected[:, np.newaxis], x, -loss_grad(w, x, y, return_arr=True))
 
         constraints = []
         predicted_labels = np.sign(np.dot(w.x, x.T))
         unconstrained_loss_arr = loss_function(w.x, x, y, return_arr=True)
 
         if sep_constraint == True: # separate gemma for different people
-            for i in range(0, len(predicted_labels)):
-                if predicted_labels[i] == 1.0 and x_control[sensitive_attrs[0]][i] == 1.0: # for now we are assuming just one sensitive attr for reverse constraint, later, extend the code to take into account multiple sensitive attrs
-                    c = ({'type': 'ineq', 'fun': constraint_protected_people, 'args':(x[i], y[i])}) # this constraint makes sure that these people stay in the positive class even in the modified classifier             
-                    constraints.append(c)
-                else:
-                    c = ({'type': 'ineq', 'fun': constraint_unprotected_people, 'args':(i, unconstrained_loss_arr[i], x[i], y[i])})                
-                    constraints.append(c)
+            # a single vector valued constraint rather than one constraint (and one callback) per point
+            protected = (predicted_labels == 1.0) & (np.asarray(x_control[sensitive_attrs[0]]) == 1.0) # for now we are assuming just one sensitive attr for reverse constraint, later, extend the code to take into account multiple sensitive attrs
+            c = ({'type': 'ineq', 'fun': constraint_people, 'args':(x, y, protected, unconstrained_loss_arr)}) # this constraint makes sure that the protected people stay in the positive class even in the modified classifier
+            if loss_grad is not None:
+                c['jac'] = constraint_people_jac
+            constraints.append(c)
         else: # same gamma for everyone
             c = ({'type': 'ineq', 'fun': constraint_gamma_all, 'args':(x,y,unconstrained_loss_arr)})
+            if loss_grad is not None:
+                c['jac'] = constraint_gamma_all_jac
             constraints.append(c)
 
-        def cross_cov_abs_optm_func(weight_vec, x_in, x_control_in_arr):
-            cross_cov = (x_control_in_arr - np.mean(x_control_in_arr)) * np.dot(weight_vec, x_in.T)
-            return float(abs(sum(cross_cov))) / float(x_in.shape[0])
+        def cross_cov_abs_optm_func(weight_vec, cov_vec):
+            return abs(np.dot(cov_vec, weight_vec))
+
+        def cross_cov_abs_optm_func_jac(weight_vec, cov_vec):
+            return np.sign(np.dot(cov_vec, weight_vec)) * cov_vec
 
 
         w = minimize(fun = cross_cov_abs_optm_func,
             x0 = old_w,
-            args = (x, x_control[sensitive_attrs[0]]),
+            args = (get_cov_vector(x, x_control[sensitive_attrs[0]]),),
             method = 'SLSQP',
+            jac = cross_cov_abs_optm_func_jac,
             options = {"maxiter":100000},
             constraints = constraints
             )
@@ -483,6 +495,44 @@ def get_correlations(model, x_test, y_predicted, x_control_test, sensitive_attrs
 
 
 
+def get_loss_grad(loss_function):
+
+    """
+    returns the analytic gradient of the loss function, or None if there is none, in which case the minimizer approximates it by finite differences
+    """
+
+    if loss_function is lf._logistic_loss:
+        return lf._logistic_loss_grad
+    return None
+
+def get_cov_vector(x_arr, x_control):
+
+    """
+    The covariance b/w the sensitive attr val and the distance from the boundary is linear in the model:
+    it is np.dot(cov_vec, model) with the vector returned here, which is computed once per fit
+    rather than in every evaluation of the constraint
+    """
+
+    x_control = np.array(x_control, dtype=np.float64)
+    return np.dot(x_control - np.mean(x_control), x_arr) / float(len(x_control))
+
+def cov_constraint(model, cov_vec, thresh):
+
+    """
+    same as test_sensitive_attr_constraint_cov, with the covariance vector given by get_cov_vector
+    if the return value is >=0, then the constraint is satisfied
+    """
+
+    return thresh - abs(np.dot(cov_vec, model))
+
+def cov_constraint_jac(model, cov_vec, thresh):
+
+    """
+    the jacobian of cov_constraint with respect to the model
+    """
+
+    return -np.sign(np.dot(cov_vec, model)) * cov_vec
+
 def get_constraint_list_cov(x_train, y_train, x_control_train, sensitive_attrs, sensitive_attrs_to_cov_thresh):
 
     """
@@ -500,7 +550,7 @@ def get_constraint_list_cov(x_train, y_train, x_control_train, sensitive_attrs,
                 
         if index_dict is None: # binary attribute
             thresh = sensitive_attrs_to_cov_thresh[attr]
-            c = ({'type': 'ineq', 'fun': test_sensitive_attr_constraint_cov, 'args':(x_train, y_train, attr_arr_transformed,thresh, False)})
+            c = ({'type': 'ineq', 'fun': cov_constraint, 'jac': cov_constraint_jac, 'args':(get_cov_vector(x_train, attr_arr_transformed), thresh)})
             constraints.append(c)
         else: # otherwise, its a categorical attribute, so we need to set the cov thresh for each value separately
 
@@ -510,7 +560,7 @@ def get_constraint_list_cov(x_train, y_train, x_control_train, sensitive_attrs,
                 thresh = sensitive_attrs_to_cov_thresh[attr][attr_name]
                 
                 t = attr_arr_transformed[:,ind]
-                c = ({'type': 'ineq', 'fun': test_sensitive_attr_constraint_cov, 'args':(x_train, y_train, t ,thresh, False)})
+                c = ({'type': 'ineq', 'fun': cov_constraint, 'jac': cov_constraint_jac, 'args':(get_cov_vector(x_train, t), thresh)})
                 constraints.append(c)
 
 
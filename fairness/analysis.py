@@ -1,5 +1,4 @@
 import fire
-import pandas as pd
 import pathlib
 import sys
 import subprocess
@@ -10,13 +9,14 @@ matplotlib.use('TkAgg')
 
 from ggplot import *
 
+from fairness import results
 from fairness.data.objects.list import DATASETS, get_dataset_names
 from fairness.data.objects.ProcessedData import TAGS
 
 # The graphs to generate: (xaxis measure, yaxis measure)
 GRAPHS = [('DIbinary', 'accuracy'), ('sex-TPR', 'sex-calibration-')]
 
-def run(dataset = get_dataset_names(), graphs = GRAPHS):
+def run(dataset = get_dataset_names(), graphs = GRAPHS, backend = results.BACKEND_DEFAULT):
     for dataset_obj in DATASETS:
         if not dataset_obj.get_dataset_name() in dataset:
             continue
@@ -26,12 +26,12 @@ def run(dataset = get_dataset_names(), graphs = GRAPHS):
             for tag in TAGS:
                 print("    type:" + tag)
                 filename = dataset_obj.get_results_filename(sensitive, tag)
-                make_all_graphs(filename, graphs)
+                make_all_graphs(filename, graphs, backend)
     print("Generating additional figures in R...")
     subprocess.run(["Rscript",
                     "./fairness/results/generate-report.R"])
 
-def make_all_graphs(filename, graphs):
+def make_all_graphs(filename, graphs, backend = results.BACKEND_DEFAULT):
     print(f'filename: {filename}')
     # try:
     #     filename = str(filename).replace('.fairness', 'fairness')
@@ -40,8 +40,12 @@ def make_all_graphs(filename, graphs):
     # except FileNotFoundError as e:
     #    print("File not found:" + filename)
     #    return
+    # only the measures being graphed need to be loaded
+    metrics = None
+    if graphs != 'all':
+        metrics = sorted(set(m for graph in graphs for m in graph))
     try:
-       f = pd.read_csv(filename)
+       f = results.read_results(filename, metrics, backend)
     except FileNotFoundError as e:
        print("File not found:" + filename)
        return
@@ -1,20 +1,29 @@
 import fire
+import multiprocessing
+import numpy
 import os
 import pandas as pd
 import pathlib
+import random
 import statistics
 import sys
+import traceback
+import zlib
 
 
 from fairness import results
 from fairness.data.objects.list import DATASETS, get_dataset_names
-from fairness.data.objects.ProcessedData import ProcessedData
+from fairness.data.objects.ProcessedData import ProcessedData, TAGS
 from fairness.algorithms.list import ALGORITHMS
 from fairness.metrics.list import get_metrics
+from fairness.metrics.MetricContext import MetricContext
+from fairness.metrics.MetricGrid import MetricGrid
 
 from fairness.algorithms.ParamGridSearch import ParamGridSearch
 
 NUM_TRIALS_DEFAULT = 10
+WORKERS_DEFAULT = 1
+SEED_DEFAULT = 0
 
 def get_algorithm_names():
     result = [algorithm.get_name() for algorithm in ALGORITHMS]
@@ -24,7 +33,24 @@ def get_algorithm_names():
     return result
 
 def run(num_trials = NUM_TRIALS_DEFAULT, dataset = get_dataset_names(),
-        algorithm = get_algorithm_names()):
+        algorithm = get_algorithm_names(), workers = WORKERS_DEFAULT, seed = SEED_DEFAULT,
+        resume = False, sync_rows = results.SYNC_ROWS_DEFAULT,
+        sync_seconds = results.SYNC_SECONDS_DEFAULT, group_commit = False,
+        backend = results.BACKEND_DEFAULT):
+    """
+    Runs every selected algorithm on every selected dataset.  Each (algorithm, trial, tag) unit is
+    independent, so with workers > 1 the units are evaluated on a process pool.  Results are
+    always written in the same (algorithm, trial, tag) order, and each unit seeds the random
+    number generators from `seed` and its own identity, so the serial and parallel runs give the
+    same output.
+
+    Every result row is checkpointed as soon as it is written.  With resume, the checkpoints left
+    by an interrupted run are kept, and the units whose rows are already recorded there or stored
+    by the results backend are skipped; without it, the run stops rather than overwrite an
+    existing checkpoint.  Rows are fsynced every sync_rows rows or sync_seconds seconds; with
+    group_commit, all result files are also synced whenever a trial finishes.  The finished rows
+    are stored by the given results backend ('csv' or 'parquet').
+    """
     algorithms_to_run = algorithm
 
     # L0: For each dataset
@@ -35,8 +61,18 @@ def run(num_trials = NUM_TRIALS_DEFAULT, dataset = get_dataset_names(),
 
         print("\nEvaluating dataset:" + dataset_obj.get_dataset_name())
 
+        # only the data types used by the selected algorithms are loaded and split
+        algorithms = [a for a in ALGORITHMS if a.get_name() in algorithms_to_run]
+        tags = [tag for tag in TAGS
+                if any(tag in a.get_supported_data_types() for a in algorithms)]
+        if len(tags) == 0:
+            continue
+
         processed_dataset = ProcessedData(dataset_obj)
-        train_test_splits = processed_dataset.create_train_test_splits(num_trials)
+        numpy.random.seed(get_seed(seed, dataset_obj.get_dataset_name()))
+        train_test_splits = processed_dataset.create_train_test_splits(num_trials, tags)
+
+        pool = create_pool(workers, processed_dataset, train_test_splits)
 
         all_sensitive_attributes = dataset_obj.get_sensitive_attributes_with_joint()
         # L1: For each sensitive attribute
@@ -44,59 +80,159 @@ def run(num_trials = NUM_TRIALS_DEFAULT, dataset = get_dataset_names(),
 
             print("Sensitive attribute:" + sensitive)
 
-            detailed_files = dict((k, create_detailed_file(
-                                          dataset_obj.get_results_filename(sensitive, k),
-                                          dataset_obj,
-                                          processed_dataset.get_sensitive_values(k), k))
-                for k in train_test_splits.keys())
+            # All result files are opened before any unit runs, so that a run refused by one of
+            # them (see results.ResultsFile) leaves no checkpoints behind.
+            open_files = []
+            try:
+                detailed_files = {}
+                for k in train_test_splits.keys():
+                    detailed_files[k] = create_detailed_file(
+                        dataset_obj.get_results_filename(sensitive, k), dataset_obj,
+                        processed_dataset.get_sensitive_values(k), k, resume, sync_rows,
+                        sync_seconds, backend)
+                    open_files.append(detailed_files[k])
+                param_files = {}
+                for algorithm in algorithms:
+                    if algorithm.__class__ is ParamGridSearch:
+                        # Optional: L3: For each parameter combination (I think this actually occurs in run_eval_alg)
+                        param_files[algorithm.get_name()] = {}
+                        for k in train_test_splits.keys():
+                            param_files[algorithm.get_name()][k] = create_detailed_file(
+                                dataset_obj.get_param_results_filename(sensitive, k,
+                                                                       algorithm.get_name()),
+                                dataset_obj, processed_dataset.get_sensitive_values(k), k,
+                                resume, sync_rows, sync_seconds, backend)
+                            open_files.append(param_files[algorithm.get_name()][k])
+            except Exception:
+                for f in open_files:
+                    f.discard()
+                raise
 
             # L2: For each algorithm
-            for algorithm in ALGORITHMS:
-                if not algorithm.get_name() in algorithms_to_run:
-                    continue
-
+            units = []
+            for algorithm in algorithms:
                 print("    Algorithm: %s" % algorithm.get_name())
                 print("       supported types: %s" % algorithm.get_supported_data_types())
-                if algorithm.__class__ is ParamGridSearch:
-                    # Optional: L3: For each parameter combination (I think this actually occurs in run_eval_alg)
-                    param_files =  \
-                        dict((k, create_detailed_file(
-                                     dataset_obj.get_param_results_filename(sensitive, k,
-                                                                            algorithm.get_name()),
-                                     dataset_obj, processed_dataset.get_sensitive_values(k), k))
-                          for k in train_test_splits.keys())
                 # L3: For each trial
                 for i in range(0, num_trials):
-                    print(f'\nTrial {i+1}')
                     # L4: For each supported data type
-                    for supported_tag in algorithm.get_supported_data_types():
-                        train, test = train_test_splits[supported_tag][i]
-                        try:
-                            params, results, param_results =  \
-                                run_eval_alg(algorithm, train, test, dataset_obj, processed_dataset,
-                                             all_sensitive_attributes, sensitive, supported_tag, i, dataset_obj)
-                        except Exception as e:
-                            import traceback
-                            traceback.print_exc(file=sys.stderr)
-                            print("Failed: %s" % e, file=sys.stderr)
-                        else:
-                            write_alg_results(detailed_files[supported_tag],
-                                              algorithm.get_name(), params, i, results)
-                            if algorithm.__class__ is ParamGridSearch:
-                                for params, results in param_results:
-                                    write_alg_results(param_files[supported_tag],
-                                                      algorithm.get_name(), params, i, results)
-
-            print("Results written to:")
+                    for supported_tag in sorted(algorithm.get_supported_data_types()):
+                        if has_unit_results(algorithm, i, supported_tag, detailed_files,
+                                            param_files):
+                            print("    Skipping checkpointed trial %d of %s on %s" %
+                                  (i + 1, algorithm.get_name(), supported_tag))
+                            continue
+                        unit_seed = get_seed(seed, dataset_obj.get_dataset_name(), sensitive,
+                                             algorithm.get_name(), i, supported_tag)
+                        units.append((algorithm, dataset_obj, all_sensitive_attributes, sensitive,
+                                      i, supported_tag, unit_seed))
+
+            if pool is None:
+                evaluated = (evaluate_unit(unit, processed_dataset, train_test_splits)
+                             for unit in units)
+            else:
+                evaluated = pool.imap(evaluate_unit_in_worker, units)
+
+            # Units come back in submission order, so the files are written deterministically.
+            last_trial = None
+            for unit, outcome, error in evaluated:
+                algorithm, i, supported_tag = unit[0], unit[4], unit[5]
+                if group_commit and last_trial not in (None, (algorithm.get_name(), i)):
+                    for f in open_files:
+                        f.sync()
+                last_trial = (algorithm.get_name(), i)
+                if error is not None:
+                    print(error, file=sys.stderr, end='')
+                    continue
+                params, unit_results, param_results = outcome
+                # The detailed row is written last: once it is checkpointed, the unit is complete.
+                # The files sync on their own schedules, so the param rows are synced first.
+                if algorithm.__class__ is ParamGridSearch:
+                    param_file = param_files[algorithm.get_name()][supported_tag]
+                    for grid_params, grid_results in param_results:
+                        write_alg_results(param_file, algorithm.get_name(), grid_params, i,
+                                          grid_results)
+                    param_file.sync()
+                write_alg_results(detailed_files[supported_tag],
+                                  algorithm.get_name(), params, i, unit_results)
+
+            print("Results written to (merged by fairness-compact-results or on read):")
             for supported_tag in algorithm.get_supported_data_types():
                 print("    %s" % dataset_obj.get_results_filename(sensitive, supported_tag))
 
-            for detailed_file in detailed_files.values():
-                detailed_file.close()
+            for f in open_files:
+                f.close()
+
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+def has_unit_results(algorithm, i, tag, detailed_files, param_files):
+    """
+    Returns True if the results of the (algorithm, trial, tag) unit were already stored when the
+    result files were resumed.  A grid search needs a param file row for every point of its grid,
+    and a detailed row for one of them (its best params), which is only known once it has run.
+    """
+    name = algorithm.get_name()
+    if algorithm.__class__ is not ParamGridSearch:
+        return detailed_files[tag].has_results_for(name, algorithm.get_default_params(), i)
+
+    grid = [{ param_name : param_val }
+            for param_name, param_vals in algorithm.algorithm.get_param_info().items()
+            for param_val in param_vals]
+    return all(param_files[name][tag].has_results_for(name, params, i) for params in grid) and \
+        any(detailed_files[tag].has_results_for(name, params, i) for params in grid)
+
+def get_seed(seed, *identity):
+    """
+    Derives a random seed from the base seed and the identity of what is being seeded, e.g., a
+    dataset's splits or a single (algorithm, trial, tag) unit.  The seed does not depend on which
+    process uses it or in which order.
+    """
+    key = ','.join(str(x) for x in (seed,) + identity)
+    return zlib.crc32(key.encode('utf-8'))
+
+def evaluate_unit(unit, processed_dataset, train_test_splits):
+    """
+    Runs a single (algorithm, trial, tag) unit and returns (unit, (params, results,
+    param_results), None) on success or (unit, None, error message) on failure.
+    """
+    algorithm, dataset_obj, all_sensitive_attributes, sensitive, i, tag, unit_seed = unit
+    print(f'\nTrial {i+1}')
+    random.seed(unit_seed)
+    numpy.random.seed(unit_seed)
+    try:
+        train, test = train_test_splits[tag][i]
+        outcome = run_eval_alg(algorithm, train, test, dataset_obj, processed_dataset,
+                               all_sensitive_attributes, sensitive, tag, i, dataset_obj)
+    except Exception as e:
+        return unit, None, traceback.format_exc() + "Failed: %s\n" % e
+    return unit, outcome, None
+
+# State shared with the pool workers, set once per worker by init_worker.
+_worker_state = {}
+
+def init_worker(processed_dataset, train_test_splits):
+    _worker_state['processed_dataset'] = processed_dataset
+    _worker_state['train_test_splits'] = train_test_splits
+
+def evaluate_unit_in_worker(unit):
+    return evaluate_unit(unit, _worker_state['processed_dataset'],
+                         _worker_state['train_test_splits'])
+
+def create_pool(workers, processed_dataset, train_test_splits):
+    """
+    Returns a process pool with the dataset and its splits preloaded in every worker, or None if
+    the units should be run serially in this process.
+    """
+    if workers is None or workers <= 1:
+        return None
+    return multiprocessing.Pool(processes=workers, initializer=init_worker,
+                                initargs=(processed_dataset, train_test_splits))
 
 def write_alg_results(file_handle, alg_name, params, run_id, results_list):
     line = alg_name + ','
-    params = ";".join("%s=%s" % (k, v) for (k, v) in params.items())
+    params = results.format_params(params)
     line += params + (',%s,' % run_id)
     line += ','.join(str(x) for x in results_list) + '\n'
     file_handle.write(line)
@@ -140,24 +276,28 @@ def run_eval_alg(algorithm, train, test, dataset, processed_data, all_sensitive_
         dict_nonclass_lists[sens] = dataset.get_nonclass_attribute_values(sens, test)
 
     sensitive_dict = processed_data.get_sensitive_values(tag)
+    metrics = get_metrics(dataset, sensitive_dict, tag)
 
+    # the metrics share their sub-results (filtered rows, confusion counts, ...) via the context
+    context = MetricContext(actual, predicted, dict_sensitive_lists, single_sensitive,
+                            privileged_vals, positive_val, dict_nonclass_lists)
     one_run_results = []
-    for metric in get_metrics(dataset, sensitive_dict, tag):
-        result = metric.calc(actual, predicted, dict_sensitive_lists, single_sensitive,
-                privileged_vals, positive_val, dict_nonclass_lists)
+    for metric in metrics:
+        result = context.evaluate(metric)
         one_run_results.append(result)
 
-    # handling the set of predictions returned by ParamGridSearch
+    # handling the set of predictions returned by ParamGridSearch, which are all evaluated
+    # together (see MetricGrid)
     results_lol = []
     if len(predictions_list) > 0:
-        for param_name, param_val, predictions in predictions_list:
+        grid = MetricGrid(actual, [predictions for (_, _, predictions) in predictions_list],
+                          dict_sensitive_lists, single_sensitive, privileged_vals, positive_val,
+                          dict_nonclass_lists)
+        grid_results = grid.evaluate_all(metrics)
+        for (param_name, param_val, predictions), metric_results in zip(predictions_list,
+                                                                        grid_results):
             params_dict = { param_name : param_val }
-            results = []
-            for metric in get_metrics(dataset, sensitive_dict, tag):
-                result = metric.calc(actual, predictions, dict_sensitive_lists, single_sensitive,
-                        privileged_vals, positive_val, dict_nonclass_lists)
-                results.append(result)
-            results_lol.append( (params_dict, results) )
+            results_lol.append( (params_dict, metric_results) )
 
     return params, one_run_results, results_lol
 
@@ -194,8 +334,12 @@ def get_dict_sensitive_vals(dict_sensitive_lists):
          newdict[sens] = list(set(sensitive))
     return newdict
 
-def create_detailed_file(filename, dataset, sensitive_dict, tag):
-    return results.ResultsFile(filename, dataset, sensitive_dict, tag)
+def create_detailed_file(filename, dataset, sensitive_dict, tag, resume=False,
+                         sync_rows=results.SYNC_ROWS_DEFAULT,
+                         sync_seconds=results.SYNC_SECONDS_DEFAULT,
+                         backend=results.BACKEND_DEFAULT):
+    return results.ResultsFile(filename, dataset, sensitive_dict, tag, resume, sync_rows,
+                               sync_seconds, backend)
     # f = open(filename, 'w')
     # f.write(get_detailed_metrics_header(dataset, sensitive_dict, tag) + '\n')
     # return f
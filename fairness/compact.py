@@ -0,0 +1,21 @@
+import fire
+
+from fairness import results
+from fairness.data.objects.Data import RESULT_DIR
+
+def run(result_dir = str(RESULT_DIR), backend = results.BACKEND_DEFAULT):
+    """
+    Merges the rows appended by benchmark runs into the results stored in result_dir by the
+    given backend ('csv' or 'parquet').
+    """
+    compacted = results.compact_all_results(result_dir, backend)
+    if len(compacted) == 0:
+        print("No pending results in %s" % result_dir)
+    for filename in compacted:
+        print("Compacted: %s" % filename)
+
+def main():
+    fire.Fire(run)
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 import pathlib
-from fairness.results import local_results_path
+from fairness.results import local_results_path, read_results, BACKEND_DEFAULT
 
 BASE_DIR = local_results_path()
 PACKAGE_DIR = pathlib.Path(__file__).parents[2]
@@ -9,6 +9,7 @@ RAW_DATA_DIR = PACKAGE_DIR / 'data' / 'raw'
 PROCESSED_DATA_DIR = PACKAGE_DIR / 'data' / 'preprocessed'
 RESULT_DIR = BASE_DIR / "results"
 ANALYSIS_DIR = BASE_DIR / "analysis"
+CACHE_DIR = BASE_DIR / "cache"
 
 
 class Data():
@@ -114,6 +115,22 @@ class Data():
         PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
         return PROCESSED_DATA_DIR / (self.get_dataset_name() + "_" + tag + '.csv')
 
+    def get_cache_filename(self, tag, key):
+        """
+        Returns the binary cache file of the processed data for the given tag, where key
+        identifies the version of the processed data that was cached.
+        """
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        return CACHE_DIR / (self.get_dataset_name() + "_" + tag + '.' + key + '.pkl')
+
+    def get_cache_stamp_filename(self, tag):
+        """
+        Returns the file recording the size and modification time of the processed data for the
+        given tag, along with the key of its contents (see get_cache_filename).
+        """
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        return CACHE_DIR / (self.get_dataset_name() + "_" + tag + '.stamp')
+
     def get_results_filename(self, sensitive_attr, tag):
         RESULT_DIR.mkdir(parents=True, exist_ok=True)
         return RESULT_DIR / (self.get_dataset_name() + "_" + sensitive_attr + "_" + tag + '.csv')
@@ -157,8 +174,14 @@ class Data():
 
     ##########################################################################
 
-    def get_results_data_frame(self, sensitive_attr, tag):
-        return pd.read_csv(self.get_results_filename(sensitive_attr, tag))
+    def get_results_data_frame(self, sensitive_attr, tag, metrics=None, backend=BACKEND_DEFAULT):
+        """
+        Returns the results for the sensitive attribute and tag.  If metrics is given, only those
+        metric columns (and the key columns) are loaded.
+        """
+        return read_results(self.get_results_filename(sensitive_attr, tag), metrics, backend)
 
-    def get_param_results_data_frame(self, sensitive_attr, tag):
-        return pd.read_csv(self.get_param_results_filename(sensitive_attr, tag))
+    def get_param_results_data_frame(self, sensitive_attr, tag, metrics=None,
+                                     backend=BACKEND_DEFAULT):
+        return read_results(self.get_param_results_filename(sensitive_attr, tag), metrics,
+                            backend)
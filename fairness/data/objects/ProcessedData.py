@@ -1,5 +1,8 @@
+import hashlib
+import os
 import pandas as pd
 import numpy
+import tempfile
 import numpy.random
 
 TAGS = ["original", "numerical", "numerical-binsensitive", "categorical-binsensitive"]
@@ -8,25 +11,93 @@ TRAINING_PERCENT = 2.0 / 3.0
 class ProcessedData():
     def __init__(self, data_obj):
         self.data = data_obj
-        self.dfs = dict((k, pd.read_csv(self.data.get_filename(k)))
-                        for k in TAGS)
-        self.splits = dict((k, []) for k in TAGS)
+        # processed data frames are loaded lazily, the first time a tag is asked for
+        self.dfs = {}
+        self.splits = {}
         self.has_splits = False
 
     def get_processed_filename(self, tag):
         return self.data.get_filename(tag)
 
     def get_dataframe(self, tag):
+        if tag not in self.dfs:
+            self.dfs[tag] = self.load_dataframe(tag)
         return self.dfs[tag]
 
-    def create_train_test_splits(self, num):
+    def load_dataframe(self, tag):
+        """
+        Loads the processed data for the given tag.  Parsed data frames are cached in a binary
+        (pickle) file keyed on the hash of the processed CSV's contents, so the CSV is only parsed
+        again after it changes.  The CSV is only read and hashed when its size or modification
+        time differ from those recorded with the last key (see get_cache_key).
+        """
+        filename = self.get_processed_filename(tag)
+        key = self.get_cache_key(tag, filename)
+        cache_filename = self.data.get_cache_filename(tag, key)
+        try:
+            return pd.read_pickle(str(cache_filename))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print("Ignoring unreadable cache %s: %s" % (cache_filename, e))
+
+        df = pd.read_csv(filename)
+        # other processes may be loading the same tag, so the current key's cache is left alone
+        # and a stale cache may already have been removed
+        for stale in cache_filename.parent.glob(self.data.get_cache_filename(tag, '*').name):
+            if stale == cache_filename:
+                continue
+            try:
+                os.unlink(str(stale))
+            except FileNotFoundError:
+                pass
+        fd, tempname = tempfile.mkstemp(dir=str(cache_filename.parent))
+        os.close(fd)
+        df.to_pickle(tempname)
+        os.replace(tempname, str(cache_filename))
+        return df
+
+    def get_cache_key(self, tag, filename):
+        """
+        Returns the cache key of the given processed CSV: the SHA-1 of its contents and the pandas
+        version.  The key is recorded with the file's (size, mtime_ns) in the tag's stamp file and
+        reused while these are unchanged, so the file is only hashed again after it is written.
+        """
+        stat = os.stat(str(filename))
+        stamp = "%d %d" % (stat.st_size, stat.st_mtime_ns)
+        version = '-pandas' + pd.__version__
+        stamp_filename = self.data.get_cache_stamp_filename(tag)
+        try:
+            with open(str(stamp_filename), 'r') as f:
+                recorded_stamp, recorded_key = f.read().strip().rsplit(' ', 1)
+            if recorded_stamp == stamp and recorded_key.endswith(version):
+                return recorded_key
+        except (FileNotFoundError, ValueError):
+            pass
+
+        with open(filename, 'rb') as f:
+            key = hashlib.sha1(f.read()).hexdigest() + version
+        # written atomically, since other processes may be loading the same tag
+        fd, tempname = tempfile.mkstemp(dir=str(stamp_filename.parent))
+        with os.fdopen(fd, 'w') as f:
+            f.write("%s %s\n" % (stamp, key))
+        os.replace(tempname, str(stamp_filename))
+        return key
+
+    def create_train_test_splits(self, num, tags=TAGS):
+        """
+        Creates num random train / test splits of the data for each of the given tags and returns
+        a dictionary mapping each tag to its TrainTestSplits.  All tags are split on the same
+        shuffled indices, and only the indices are stored.
+        """
         if self.has_splits:
             return self.splits
 
+        split_indices = []
         for i in range(0, num):
             # we first shuffle a list of indices so that each subprocessed data
             # is split consistently
-            n = len(list(self.dfs.values())[0])
+            n = len(self.get_dataframe(tags[0]))
 
             a = numpy.arange(n)
             numpy.random.shuffle(a)
@@ -34,12 +105,9 @@ class ProcessedData():
             split_ix = int(n * TRAINING_PERCENT)
             train_fraction = a[:split_ix]
             test_fraction = a[split_ix:]
-            
-            for (k, v) in self.dfs.items():
-                train = self.dfs[k].iloc[train_fraction]
-                test = self.dfs[k].iloc[test_fraction]
-                self.splits[k].append((train, test))
+            split_indices.append((train_fraction, test_fraction))
 
+        self.splits = dict((k, TrainTestSplits(self, k, split_indices)) for k in tags)
         self.has_splits = True
         return self.splits
 
@@ -52,6 +120,30 @@ class ProcessedData():
         all_sens = self.data.get_sensitive_attributes_with_joint()
         sensdict = {}
         for sens in all_sens:
-             sensdict[sens] = list(set(df[sens].values.tolist()))
+             sensdict[sens] = sorted(set(df[sens].values.tolist()))
         return sensdict
 
+
+
+class TrainTestSplits():
+    """
+    The train / test splits of one tag's data, stored as arrays of row positions.  Indexing with
+    a trial number returns the (train, test) data frames for that trial; they are created on
+    demand, so only the splits currently in use are held in memory.
+    """
+    def __init__(self, processed_data, tag, split_indices):
+        self.processed_data = processed_data
+        self.tag = tag
+        self.split_indices = split_indices
+
+    def __len__(self):
+        return len(self.split_indices)
+
+    def __getitem__(self, i):
+        df = self.processed_data.get_dataframe(self.tag)
+        train_fraction, test_fraction = self.split_indices[i]
+        return df.iloc[train_fraction], df.iloc[test_fraction]
+
+    def __iter__(self):
+        for i in range(0, len(self)):
+            yield self[i]
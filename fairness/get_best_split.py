@@ -1,16 +1,17 @@
 import fire
 import math
-import pandas as pd
 
+from fairness import results
 from fairness.data.objects.Adult import Adult
 from fairness.data.objects.ProcessedData import TAGS
 
-def run(algname, data = Adult(), measure = 'accuracy'):
+def run(algname, data = Adult(), measure = 'accuracy', backend = results.BACKEND_DEFAULT):
     for filename in make_filenames(algname, measure, data):
         outfile = filename + '.correctedbest.csv'
         out = open(outfile, 'w')
         print(filename)
-        f = pd.read_csv(filename)
+        # read through the backend so that rows not yet compacted into the CSV are included
+        f = results.read_results(filename, backend=backend)
         try:
             params = f['params'][0]
         except:
@@ -25,9 +26,7 @@ def run(algname, data = Adult(), measure = 'accuracy'):
                 if params == start_param:
                     if run_id != 0:
                         print(run_id, run_id_best_val)
-                        line_str = ','.join([str(x) for x in
-                                             f.ix[run_id_best_line].values.tolist()]) + '\n'
-                        out.write(line_str)
+                        out.write(format_row(f, run_id_best_line))
                     run_id += 1
                     run_id_best_line = i
                     run_id_best_val = meas
@@ -35,12 +34,19 @@ def run(algname, data = Adult(), measure = 'accuracy'):
                     run_id_best_line = i
                     run_id_best_val = meas
             print(run_id, run_id_best_val)
-            line_str = ','.join([str(x) for x in
-                                 f.ix[run_id_best_line].values.tolist()]) + '\n'
-            out.write(line_str)
+            out.write(format_row(f, run_id_best_line))
         out.close()
         print("Corrected best per split written to:" + outfile)
 
+def format_row(f, i):
+    """
+    Returns row i of the results data frame f as a CSV line.  The parquet backend reads params as
+    dictionaries, which are written back as the "name=value;name=value" string of the CSV files.
+    """
+    values = [results.format_params(x) if isinstance(x, dict) else x
+              for x in f.loc[i].values.tolist()]
+    return ','.join([str(x) for x in values]) + '\n'
+
 def is_better_than(val1, val2, measure):
     if measure == 'accuracy':
         return val1 >= val2
@@ -1,11 +1,13 @@
 from fairness.metrics.Metric import Metric
-from sklearn.metrics import accuracy_score
+from fairness.metrics.utils import get_accuracy
 
 class Accuracy(Metric):
     def __init__(self):
         Metric.__init__(self)
         self.name = 'accuracy'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        return accuracy_score(actual, predicted)
+    def calc_in_context(self, context):
+        return get_accuracy(context.get_confusion_counts())
+
+    def get_cache_key(self):
+        return self.name
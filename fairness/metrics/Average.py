@@ -10,14 +10,10 @@ class Average(Metric):
           self.name = name
           self.metrics = metrics_list
 
-     def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-              unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-
+     def calc_in_context(self, context):
           total = 0.0
           for metric in self.metrics:
-               result = metric.calc(actual, predicted, dict_of_sensitive_lists,
-                                    single_sensitive_name, unprotected_vals, positive_pred,
-                                    dict_of_nonclass_attrs)
+               result = context.evaluate(metric)
                if result != None:
                    total += result
 
@@ -7,13 +7,11 @@ class BCR(Metric):
         Metric.__init__(self)
         self.name = 'BCR'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        tnr = TNR()
-        tnr_val = tnr.calc(actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-                           unprotected_vals, positive_pred, dict_of_nonclass_attrs)
-        tpr = TPR()
-        tpr_val = tpr.calc(actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-                           unprotected_vals, positive_pred, dict_of_nonclass_attrs)
+    def calc_in_context(self, context):
+        tnr_val = context.evaluate(TNR())
+        tpr_val = context.evaluate(TPR())
         bcr = (tpr_val + tnr_val) / 2.0
         return bcr
+
+    def get_cache_key(self):
+        return self.name
@@ -2,7 +2,7 @@ import sys
 import numpy
 import math
 
-from fairness.metrics.utils import calc_pos_protected_percents
+from fairness.metrics.utils import get_pos_protected_percents
 from fairness.metrics.Metric import Metric
 
 class CV(Metric):
@@ -10,14 +10,16 @@ class CV(Metric):
         Metric.__init__(self)
         self.name = 'CV'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        sensitive = dict_of_sensitive_lists[single_sensitive_name]
+    def calc_in_context(self, context):
+        counts = context.get_confusion_counts(context.single_sensitive_name)
         unprotected_pos_percent, protected_pos_percent = \
-            calc_pos_protected_percents(predicted, sensitive, unprotected_vals, positive_pred)
+            get_pos_protected_percents(counts, context.unprotected_vals)
         CV = unprotected_pos_percent - protected_pos_percent
         return 1.0 - CV
 
+    def get_cache_key(self):
+        return self.name
+
     def is_better_than(self, val1, val2):
         dist1 = math.fabs(1.0 - val1)
         dist2 = math.fabs(1.0 - val2)
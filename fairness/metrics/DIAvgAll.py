@@ -1,6 +1,6 @@
 import math
 
-from fairness.metrics.utils import calc_prob_class_given_sensitive
+from fairness.metrics.utils import get_prob_class_given_sensitive
 from fairness.metrics.Metric import Metric
 
 class DIAvgAll(Metric):
@@ -15,9 +15,8 @@ class DIAvgAll(Metric):
         Metric.__init__(self)
         self.name = 'DIavgall'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        sensitive = dict_of_sensitive_lists[single_sensitive_name]
+    def calc_in_context(self, context):
+        sensitive = context.dict_of_sensitive_lists[context.single_sensitive_name]
         sensitive_values = list(set(sensitive))
 
         if len(sensitive_values) <= 1:
@@ -26,13 +25,14 @@ class DIAvgAll(Metric):
              return 1.0
 
         # this list should only have one item in it
-        single_unprotected = [val for val in sensitive_values if val in unprotected_vals][0]
-        unprotected_prob = calc_prob_class_given_sensitive(predicted, sensitive, positive_pred,
-                                                           single_unprotected)
+        single_unprotected = \
+            [val for val in sensitive_values if val in context.unprotected_vals][0]
+        counts = context.get_confusion_counts(context.single_sensitive_name)
+        unprotected_prob = get_prob_class_given_sensitive(counts, single_unprotected)
         sensitive_values.remove(single_unprotected)
         total = 0.0
         for sens in sensitive_values:
-             pos_prob = calc_prob_class_given_sensitive(predicted, sensitive, positive_pred, sens)
+             pos_prob = get_prob_class_given_sensitive(counts, sens)
              DI = 0.0
              if unprotected_prob > 0:
                  DI = pos_prob / unprotected_prob
@@ -45,6 +45,9 @@ class DIAvgAll(Metric):
 
         return total / len(sensitive_values)
 
+    def get_cache_key(self):
+        return self.name
+
     def is_better_than(self, val1, val2):
         dist1 = math.fabs(1.0 - val1)
         dist2 = math.fabs(1.0 - val2)
@@ -1,6 +1,6 @@
 import math
 
-from fairness.metrics.utils import calc_pos_protected_percents
+from fairness.metrics.utils import get_pos_protected_percents
 from fairness.metrics.Metric import Metric
 
 class DIBinary(Metric):
@@ -16,11 +16,10 @@ class DIBinary(Metric):
         Metric.__init__(self)
         self.name = 'DIbinary'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        sensitive = dict_of_sensitive_lists[single_sensitive_name]
+    def calc_in_context(self, context):
+        counts = context.get_confusion_counts(context.single_sensitive_name)
         unprotected_pos_percent, protected_pos_percent = \
-            calc_pos_protected_percents(predicted, sensitive, unprotected_vals, positive_pred)
+            get_pos_protected_percents(counts, context.unprotected_vals)
         DI = 0.0
         if unprotected_pos_percent > 0:
             DI = protected_pos_percent / unprotected_pos_percent
@@ -28,6 +27,9 @@ class DIBinary(Metric):
             DI = 1.0
         return DI
 
+    def get_cache_key(self):
+        return self.name
+
     def is_better_than(self, val1, val2):
         dist1 = math.fabs(1.0 - val1)
         dist2 = math.fabs(1.0 - val2)
@@ -17,17 +17,9 @@ class DemParWelf(UtilityMetric):
         if tau is not None:
             self.name += f'_tau={tau}'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-            unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-
+    def calc_in_context(self, context):
         # Compute welfare for each sensitive class
-        prot_welf, unprot_welf = self.calc_welfare(actual,
-                                                   predicted,
-                                                   dict_of_sensitive_lists,
-                                                   single_sensitive_name,
-                                                   unprotected_vals,
-                                                   positive_pred,
-                                                   dict_of_nonclass_attrs)
+        prot_welf, unprot_welf = self.get_welfare(context)
         if self.transform_welf is not None:
             prot_welf = self.transform_welf(prot_welf)
             unprot_welf = self.transform_welf(unprot_welf)
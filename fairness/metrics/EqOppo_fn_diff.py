@@ -3,7 +3,7 @@ import math
 import sys
 import numpy as np
 
-from fairness.metrics.utils import calc_fp_fn
+from fairness.metrics.utils import get_fp_fn
 from fairness.metrics.Metric import Metric
 
 class EqOppo_fn_diff(Metric):
@@ -11,12 +11,14 @@ class EqOppo_fn_diff(Metric):
         Metric.__init__(self)
         self.name = 'EqOppo_fn_diff'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        sensitive = dict_of_sensitive_lists[single_sensitive_name]
+    def calc_in_context(self, context):
+        counts = context.get_confusion_counts(context.single_sensitive_name)
         fp_unprotected, fp_protected, fn_protected, fn_unprotected = \
-            calc_fp_fn(actual, predicted, sensitive, unprotected_vals, positive_pred)
+            get_fp_fn(counts, context.unprotected_vals)
 
         fn_diff = math.fabs(fn_protected-fn_unprotected)
 
         return fn_diff
+
+    def get_cache_key(self):
+        return self.name
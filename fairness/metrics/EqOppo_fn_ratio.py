@@ -3,7 +3,7 @@ import math
 import sys
 import numpy as np
 
-from fairness.metrics.utils import calc_fp_fn
+from fairness.metrics.utils import get_fp_fn
 from fairness.metrics.Metric import Metric
 
 class EqOppo_fn_ratio(Metric):
@@ -11,16 +11,16 @@ class EqOppo_fn_ratio(Metric):
         Metric.__init__(self)
         self.name = 'EqOppo_fn_ratio'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        sensitive = dict_of_sensitive_lists[single_sensitive_name]
+    def calc_in_context(self, context):
+        counts = context.get_confusion_counts(context.single_sensitive_name)
 
         fp_unprotected,fp_protected, fn_protected, fn_unprotected = \
-        calc_fp_fn(actual, predicted, sensitive, unprotected_vals, positive_pred)
+        get_fp_fn(counts, context.unprotected_vals)
 
         # JDB: modified to compute the ratio of the RATES, not the raw counts
-        unprotected = np.sum([s in unprotected_vals for s in sensitive])
-        protected = np.sum([s not in unprotected_vals for s in sensitive])
+        unprotected_groups = counts.unprotected_groups(context.unprotected_vals)
+        unprotected = np.sum(counts.counts[unprotected_groups])
+        protected = np.sum(counts.counts[~unprotected_groups])
 
         fn_unprotected_rate = fn_unprotected / unprotected
         fn_protected_rate = fn_protected / protected
@@ -32,3 +32,5 @@ class EqOppo_fn_ratio(Metric):
             fn_ratio = 1.0
         return fn_ratio
 
+    def get_cache_key(self):
+        return self.name
@@ -3,7 +3,7 @@ import math
 import sys
 import numpy as np
 
-from fairness.metrics.utils import calc_fp_fn
+from fairness.metrics.utils import get_fp_fn
 from fairness.metrics.Metric import Metric
 
 class EqOppo_fp_ratio(Metric):
@@ -11,15 +11,17 @@ class EqOppo_fp_ratio(Metric):
         Metric.__init__(self)
         self.name = 'EqOppo_fp_ratio'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        sensitive = dict_of_sensitive_lists[single_sensitive_name]
+    def calc_in_context(self, context):
+        counts = context.get_confusion_counts(context.single_sensitive_name)
 
         fp_unprotected,fp_protected, fn_protected, fn_unprotected = \
-        calc_fp_fn(actual, predicted, sensitive, unprotected_vals, positive_pred)
+        get_fp_fn(counts, context.unprotected_vals)
         fp_ratio=0.0
         if fp_unprotected > 0:
             fp_ratio= fp_protected/fp_unprotected
         if fp_unprotected == 0.0 and fp_protected == 0.0:
             fp_ratio=1.0
         return fp_ratio
+
+    def get_cache_key(self):
+        return self.name
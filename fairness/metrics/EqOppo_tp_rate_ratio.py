@@ -3,7 +3,7 @@ import math
 import sys
 import numpy as np
 
-from fairness.metrics.utils import calc_fp_fn, calc_tp_tn
+from fairness.metrics.utils import get_fp_fn, get_tp_tn
 from fairness.metrics.Metric import Metric
 
 class EqOppo_tp_rate_ratio(Metric):
@@ -11,15 +11,14 @@ class EqOppo_tp_rate_ratio(Metric):
         Metric.__init__(self)
         self.name = 'EqOppo_tp_rate_ratio'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        sensitive = dict_of_sensitive_lists[single_sensitive_name]
+    def calc_in_context(self, context):
+        counts = context.get_confusion_counts(context.single_sensitive_name)
 
         tp_unprotected, tp_protected, tn_protected, tn_unprotected = \
-        calc_tp_tn(actual, predicted, sensitive, unprotected_vals, positive_pred)
+        get_tp_tn(counts, context.unprotected_vals)
 
         fp_unprotected,fp_protected, fn_protected, fn_unprotected = \
-        calc_fp_fn(actual, predicted, sensitive, unprotected_vals, positive_pred)
+        get_fp_fn(counts, context.unprotected_vals)
 
         tp_unprotected_rate = tp_unprotected / (tp_unprotected + fn_unprotected)
         tp_protected_rate = tp_protected / (tp_protected + fn_protected)
@@ -31,3 +30,6 @@ class EqOppo_tp_rate_ratio(Metric):
             tp_ratio = 1.0
 
         return tp_ratio
+
+    def get_cache_key(self):
+        return self.name
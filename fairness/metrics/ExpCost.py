@@ -11,17 +11,9 @@ class ExpCost(UtilityMetric):
         UtilityMetric.__init__(self, welfare_fn, cost_fn)
         self.name = f'ExpCost_{cost_fn.__name__}'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-            unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-
+    def calc_in_context(self, context):
         # Compute cost for each sensitive class
-        prot_cost, unprot_cost = self.calc_cost(actual,
-                                                predicted,
-                                                dict_of_sensitive_lists,
-                                                single_sensitive_name,
-                                                unprotected_vals,
-                                                positive_pred,
-                                                dict_of_nonclass_attrs)
+        prot_cost, unprot_cost = self.get_cost(context)
 
         comb_cost = np.concatenate([prot_cost, unprot_cost])
         exp_cost = np.mean(comb_cost)
@@ -11,17 +11,9 @@ class ExpWelf(UtilityMetric):
         UtilityMetric.__init__(self, welfare_fn, cost_fn)
         self.name = f'ExpWelf_{welfare_fn.__name__}'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-            unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-
+    def calc_in_context(self, context):
         # Compute welfare for each sensitive class
-        prot_welf, unprot_welf = self.calc_welfare(actual,
-                                                   predicted,
-                                                   dict_of_sensitive_lists,
-                                                   single_sensitive_name,
-                                                   unprotected_vals,
-                                                   positive_pred,
-                                                   dict_of_nonclass_attrs)
+        prot_welf, unprot_welf = self.get_welfare(context)
 
         comb_welf = np.concatenate([prot_welf, unprot_welf])
         exp_welf = np.mean(comb_welf)
@@ -6,9 +6,9 @@ class FNR(Metric):
         Metric.__init__(self)
         self.name = 'FNR'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        tpr = TPR()
-        tpr_val = tpr.calc(actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-                           unprotected_vals, positive_pred, dict_of_nonclass_attrs)
+    def calc_in_context(self, context):
+        tpr_val = context.evaluate(TPR())
         return 1 - tpr_val
+
+    def get_cache_key(self):
+        return self.name
@@ -6,9 +6,9 @@ class FPR(Metric):
         Metric.__init__(self)
         self.name = 'FPR'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        tnr = TNR()
-        tnr_val = tnr.calc(actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-                           unprotected_vals, positive_pred, dict_of_nonclass_attrs)
+    def calc_in_context(self, context):
+        tnr_val = context.evaluate(TNR())
         return 1 - tnr_val
+
+    def get_cache_key(self):
+        return self.name
@@ -6,29 +6,13 @@ class FilterSensitive(Metric):
           self.metric = metric
           self.name = metric.get_name()
 
-     def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-              unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-
-          sensitive = dict_of_sensitive_lists[self.sensitive_for_metric]
-          actual_sens = \
-              [act for act, sens in zip(actual, sensitive) if sens == self.sensitive_filter]
-          predicted_sens = \
-              [pred for pred, sens in zip(predicted, sensitive) if sens == self.sensitive_filter]
-          sensitive_sens = \
-             [sens for sens in sensitive if sens == self.sensitive_filter]
-
-          filtered_dict = {}
-          for sens_val in dict_of_sensitive_lists:
-              other_sensitive = dict_of_sensitive_lists[sens_val]
-              filtered =  \
-                  [s for s, sens in zip(other_sensitive, sensitive) if sens == self.sensitive_filter]
-              filtered_dict[sens_val] = filtered
-
-          if len(actual_sens) < 1:
+     def calc_in_context(self, context):
+          # the filtered rows, and the metric's value on them, are shared through the context
+          filtered = context.get_filtered(self.sensitive_for_metric, self.sensitive_filter)
+          if filtered is None:
               return None
 
-          return self.metric.calc(actual_sens, predicted_sens, filtered_dict, single_sensitive_name,
-                                  unprotected_vals, positive_pred, dict_of_nonclass_attrs)
+          return filtered.evaluate(self.metric)
 
      def set_sensitive_to_filter(self, sensitive_name, sensitive_val):
           """
@@ -9,3 +9,6 @@ class MCC(Metric):
     def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
              unprotected_vals, positive_pred, dict_of_nonclass_attrs):
         return matthews_corrcoef(actual, predicted)
+
+    def get_cache_key(self):
+        return self.name
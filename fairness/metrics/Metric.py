@@ -1,3 +1,5 @@
+from fairness.metrics.MetricContext import MetricContext
+
 class Metric:
     def __init__(self):
         self.name = 'Name not implemented'  ## This should be replaced in implemented metrics.
@@ -33,8 +35,30 @@ class Metric:
 
         If there is an error and the metric can not be calculated (e.g., no data is passed in), the
         metric returns None.
+
+        Metrics implement either this or calc_in_context; the default calculates the metric in a
+        new MetricContext.
+        """
+        if type(self).calc_in_context is Metric.calc_in_context:
+            raise NotImplementedError("calc() in Metric is not implemented")
+        return MetricContext(actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
+                             unprotected_vals, positive_pred, dict_of_nonclass_attrs).evaluate(self)
+
+    def calc_in_context(self, context):
+        """
+        Calculates this metric on the lists of the given MetricContext.  The default calls calc.
+        Metrics that can reuse the context's cached sub-results (other metrics via
+        context.evaluate, filtered rows, confusion counts) override this instead of calc.
+        """
+        return self.calc(*context.get_args())
+
+    def get_cache_key(self):
+        """
+        Returns a hashable key identifying the value this metric calculates, so that a
+        MetricContext can reuse it for any other metric with the same key, or None (the default)
+        if the value should not be shared.
         """
-        raise NotImplementedError("calc() in Metric is not implemented")
+        return None
 
     def get_name(self):
         """
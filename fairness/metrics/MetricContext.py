@@ -0,0 +1,97 @@
+from itertools import compress
+
+import numpy
+
+from fairness.metrics.utils import calc_confusion_counts, factorize
+
+class MetricContext():
+    """
+    The lists that a set of metrics is calculated on (see Metric.calc for their meaning), together
+    with the sub-results already calculated from them.  Evaluating every metric of a run through
+    one context means that values shared between metrics -- a metric reached through several
+    Ratio, Diff and Average objects, the rows with a given sensitive value, the confusion counts --
+    are only computed once.
+    """
+    def __init__(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
+                 unprotected_vals, positive_pred, dict_of_nonclass_attrs):
+        self.actual = actual
+        self.predicted = predicted
+        self.dict_of_sensitive_lists = dict_of_sensitive_lists
+        self.single_sensitive_name = single_sensitive_name
+        self.unprotected_vals = unprotected_vals
+        self.positive_pred = positive_pred
+        self.dict_of_nonclass_attrs = dict_of_nonclass_attrs
+
+        self.results = {}
+        self.filtered = {}
+
+    def get_args(self):
+        """
+        Returns the arguments to pass to Metric.calc.
+        """
+        return (self.actual, self.predicted, self.dict_of_sensitive_lists,
+                self.single_sensitive_name, self.unprotected_vals, self.positive_pred,
+                self.dict_of_nonclass_attrs)
+
+    def evaluate(self, metric):
+        """
+        Returns the value of the given metric on this context's lists, reusing the value of any
+        earlier metric with the same cache key.
+        """
+        key = metric.get_cache_key()
+        if key is None:
+            return metric.calc_in_context(self)
+        return self.memoize(('metric', key), lambda: metric.calc_in_context(self))
+
+    def memoize(self, key, calculate):
+        """
+        Returns the sub-result stored under the given key, calling calculate() to compute it the
+        first time.  Cached values are shared, so callers must not modify them.
+        """
+        if key not in self.results:
+            self.results[key] = calculate()
+        return self.results[key]
+
+    def get_confusion_counts(self, sensitive_name=None):
+        """
+        Returns the ConfusionCounts (see metrics.utils) of the actual and predicted values, split
+        by the given sensitive attribute or over all rows if None.
+        """
+        def calculate():
+            sensitive = None
+            if sensitive_name is not None:
+                sensitive = self.dict_of_sensitive_lists[sensitive_name]
+            return calc_confusion_counts(self.actual, self.predicted, sensitive,
+                                         self.positive_pred)
+        return self.memoize(('confusion', sensitive_name), calculate)
+
+    def get_filtered(self, sensitive_name, sensitive_val):
+        """
+        Returns the context restricted to the rows whose sensitive_name attribute equals
+        sensitive_val, or None if there are no such rows.  The nonclass attributes are passed on
+        unfiltered.
+        """
+        key = (sensitive_name, sensitive_val)
+        if key not in self.filtered:
+            mask = get_filter_mask(self.dict_of_sensitive_lists[sensitive_name], sensitive_val)
+            if not any(mask):
+                self.filtered[key] = None
+            else:
+                filtered_dict = {}
+                for sens_name, sens_list in self.dict_of_sensitive_lists.items():
+                    filtered_dict[sens_name] = list(compress(sens_list, mask))
+                self.filtered[key] = MetricContext(list(compress(self.actual, mask)),
+                                                   list(compress(self.predicted, mask)),
+                                                   filtered_dict, self.single_sensitive_name,
+                                                   self.unprotected_vals, self.positive_pred,
+                                                   self.dict_of_nonclass_attrs)
+        return self.filtered[key]
+
+
+def get_filter_mask(sensitive, sensitive_val):
+    """
+    Returns a list of booleans that are True where the sensitive value equals sensitive_val.
+    """
+    codes, values = factorize(sensitive)
+    matches = numpy.array([bool(val == sensitive_val) for val in values], dtype=bool)
+    return matches[codes].tolist()
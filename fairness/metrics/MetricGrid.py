@@ -0,0 +1,104 @@
+from itertools import compress
+
+import numpy
+
+from fairness.metrics.MetricContext import MetricContext, get_filter_mask
+from fairness.metrics.utils import calc_grid_confusion_counts, get_prediction_matrix
+
+class MetricGrid():
+    """
+    Evaluates metrics for many predicted lists on the same test set at once, e.g., the predictions
+    of every point of a ParamGridSearch.  There is one MetricContext per predicted list, but the
+    work that does not depend on the predictions (expanding the metrics, filtering by sensitive
+    value) is done once for the whole grid, and the confusion counts of all predicted lists are
+    computed together in one vectorized pass.
+
+    predictions is a (number of predicted lists x test set size) matrix, or a list of the
+    predicted lists; the other arguments are as in Metric.calc.
+    """
+    def __init__(self, actual, predictions, dict_of_sensitive_lists, single_sensitive_name,
+                 unprotected_vals, positive_pred, dict_of_nonclass_attrs):
+        self.actual = actual
+        self.predictions = get_prediction_matrix(predictions)
+        self.dict_of_sensitive_lists = dict_of_sensitive_lists
+        self.single_sensitive_name = single_sensitive_name
+        self.unprotected_vals = unprotected_vals
+        self.positive_pred = positive_pred
+        self.dict_of_nonclass_attrs = dict_of_nonclass_attrs
+
+        self.contexts = [GridContext(self, i) for i in range(len(self.predictions))]
+        self.confusion_counts = {}
+        self.filtered = {}
+
+    def evaluate(self, metric):
+        """
+        Returns the list of the metric's values, one per predicted list.
+        """
+        return [context.evaluate(metric) for context in self.contexts]
+
+    def evaluate_all(self, metrics):
+        """
+        Returns, for each predicted list, the list of the values of all of the given metrics.
+        """
+        return [[context.evaluate(metric) for metric in metrics] for context in self.contexts]
+
+    def get_confusion_counts(self, sensitive_name):
+        """
+        Returns the list of the ConfusionCounts of every predicted list (see
+        MetricContext.get_confusion_counts).
+        """
+        if sensitive_name not in self.confusion_counts:
+            sensitive = None
+            if sensitive_name is not None:
+                sensitive = self.dict_of_sensitive_lists[sensitive_name]
+            self.confusion_counts[sensitive_name] = \
+                calc_grid_confusion_counts(self.actual, self.predictions, sensitive,
+                                           self.positive_pred)
+        return self.confusion_counts[sensitive_name]
+
+    def get_filtered(self, sensitive_name, sensitive_val):
+        """
+        Returns the grid restricted to the rows whose sensitive_name attribute equals
+        sensitive_val, or None if there are no such rows (see MetricContext.get_filtered).
+        """
+        key = (sensitive_name, sensitive_val)
+        if key not in self.filtered:
+            mask = get_filter_mask(self.dict_of_sensitive_lists[sensitive_name], sensitive_val)
+            if not any(mask):
+                self.filtered[key] = None
+            else:
+                filtered_dict = {}
+                for sens_name, sens_list in self.dict_of_sensitive_lists.items():
+                    filtered_dict[sens_name] = list(compress(sens_list, mask))
+                self.filtered[key] = MetricGrid(list(compress(self.actual, mask)),
+                                                self.predictions[:, numpy.array(mask, dtype=bool)],
+                                                filtered_dict, self.single_sensitive_name,
+                                                self.unprotected_vals, self.positive_pred,
+                                                self.dict_of_nonclass_attrs)
+        return self.filtered[key]
+
+
+class GridContext(MetricContext):
+    """
+    The MetricContext of one predicted list of a MetricGrid.  Confusion counts and filtered rows
+    come from the grid, where they are computed for all predicted lists at once.
+    """
+    def __init__(self, grid, index):
+        predicted = grid.predictions[index]
+        if predicted.dtype == object:
+            predicted = predicted.tolist()
+        MetricContext.__init__(self, grid.actual, predicted,
+                               grid.dict_of_sensitive_lists, grid.single_sensitive_name,
+                               grid.unprotected_vals, grid.positive_pred,
+                               grid.dict_of_nonclass_attrs)
+        self.grid = grid
+        self.index = index
+
+    def get_confusion_counts(self, sensitive_name=None):
+        return self.grid.get_confusion_counts(sensitive_name)[self.index]
+
+    def get_filtered(self, sensitive_name, sensitive_val):
+        filtered = self.grid.get_filtered(sensitive_name, sensitive_val)
+        if filtered is None:
+            return None
+        return filtered.contexts[self.index]
@@ -7,12 +7,9 @@ class Ratio(Metric):
           self.denominator = metric_denominator
           self.name = self.numerator.get_name() + '_over_' + self.denominator.get_name()
 
-     def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-              unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-          num = self.numerator.calc(actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-                                    unprotected_vals, positive_pred, dict_of_nonclass_attrs)
-          den = self.denominator.calc(actual, predicted, dict_of_sensitive_lists,
-                                      single_sensitive_name, unprotected_vals, positive_pred, dict_of_nonclass_attrs)
+     def calc_in_context(self, context):
+          num = context.evaluate(self.numerator)
+          den = context.evaluate(self.denominator)
 
           if num is None or den is None:
                return None
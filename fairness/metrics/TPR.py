@@ -1,5 +1,5 @@
 from fairness.metrics.Metric import Metric
-from sklearn.metrics import recall_score
+from fairness.metrics.utils import get_tpr
 
 class TPR(Metric):
     """
@@ -10,7 +10,9 @@ class TPR(Metric):
         Metric.__init__(self)
         self.name = 'TPR'
 
-    def calc(self, actual, predicted, dict_of_sensitive_lists, single_sensitive_name,
-             unprotected_vals, positive_pred, dict_of_nonclass_attrs):
-        return recall_score(actual, predicted, pos_label=positive_pred, average='binary')
+    def calc_in_context(self, context):
+        return get_tpr(context.get_confusion_counts())
+
+    def get_cache_key(self):
+        return self.name
 
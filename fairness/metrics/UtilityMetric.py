@@ -68,6 +68,21 @@ class UtilityMetric(Metric):
 
         return prot_cost, unprot_cost
 
+    def get_welfare(self, context):
+        """
+        Returns calc_welfare on the lists of the given MetricContext.  The result is shared with
+        every utility metric in the context that uses the same function for welfare or cost.
+        """
+        return context.memoize(('utility', self.welfare_fn),
+                               lambda: self.calc_welfare(*context.get_args()))
+
+    def get_cost(self, context):
+        """
+        Returns calc_cost on the lists of the given MetricContext, shared like get_welfare.
+        """
+        return context.memoize(('utility', self.cost_fn),
+                               lambda: self.calc_cost(*context.get_args()))
+
 
 """
 The following are frequently used welfare and cost functions.
@@ -1,3 +1,145 @@
+import numpy
+import pandas
+
+# Bits of the per-row cell index used by calc_confusion_counts.  The *_STR bits compare values by
+# their str(), as the protected / unprotected counting functions below always have; the other bits
+# compare values with ==, as the sklearn-based and calibration metrics do.
+PRED_POS_STR = 1      # str(predicted) == str(positive_pred)
+CORRECT_STR = 2       # str(actual) == str(predicted)
+ACTUAL_POS = 4        # actual == positive_pred
+PRED_POS = 8          # predicted == positive_pred
+CORRECT = 16          # actual == predicted
+PRED_IN_ACTUAL = 32   # predicted equals one of the actual values
+NUM_CELLS = 64
+
+
+def factorize(values):
+    """
+    Encodes a list or array of values as integer codes and returns (codes, distinct values).
+    Values that are equal but of different types (e.g., 1 and 1.0) get different codes so that
+    both their str() and their == comparisons stay exact.
+    """
+    if isinstance(values, (numpy.ndarray, pandas.Series)):
+        array = numpy.asarray(values)
+    else:
+        array = numpy.empty(len(values), dtype=object)
+        array[:] = values
+    if array.dtype != object or len(set(map(type, array))) <= 1:
+        codes, uniques = pandas.factorize(array)
+        # missing values have no code; they are handled exactly by the fallback below
+        if not (codes < 0).any():
+            return codes, list(uniques)
+
+    mapping = {}
+    codes = numpy.array([mapping.setdefault((type(x), x), len(mapping)) for x in array],
+                        dtype=numpy.int64)
+    return codes, [x for (t, x) in mapping]
+
+
+class ConfusionCounts():
+    """
+    The number of rows of each sensitive value in each cell of calc_confusion_counts.  The
+    sensitive values are the distinct values seen, and counts[g, c] is the number of rows with
+    sensitive value g whose cell index is c.
+    """
+    def __init__(self, sensitive_values, counts):
+        self.sensitive_values = sensitive_values
+        self.counts = counts
+
+    def total(self, groups=None, require=0, exclude=0):
+        """
+        Returns the number of rows in the selected groups (a boolean mask over the sensitive
+        values, or all groups if None) whose cell has all of the `require` bits set and none of
+        the `exclude` bits.
+        """
+        cells = numpy.arange(NUM_CELLS)
+        mask = ((cells & require) == require) & ((cells & exclude) == 0)
+        counts = self.counts if groups is None else self.counts[groups]
+        return float(counts[:, mask].sum())
+
+    def unprotected_groups(self, unprotected_vals):
+        return numpy.array([val in unprotected_vals for val in self.sensitive_values], dtype=bool)
+
+    def groups_matching(self, sensitive_goal):
+        return numpy.array([str(val) == str(sensitive_goal) for val in self.sensitive_values],
+                           dtype=bool)
+
+
+def calc_confusion_counts(actual, predicted, sensitive, positive_pred):
+    """
+    Encodes the actual, predicted and sensitive values once as integer codes and counts the rows
+    of every sensitive value in each confusion cell (see the bits above) with a single bincount.
+    actual may be None if only the predictions are needed, and sensitive may be None to treat all
+    rows as one group.  Returns a ConfusionCounts.
+    """
+    return calc_grid_confusion_counts(actual, [predicted], sensitive, positive_pred)[0]
+
+
+def calc_grid_confusion_counts(actual, predictions, sensitive, positive_pred):
+    """
+    Same as calc_confusion_counts, for several predicted lists on the same rows at once (e.g., the
+    predictions of every point of a parameter grid).  predictions is anything accepted by
+    get_prediction_matrix; all of its values are encoded together and counted with a single
+    bincount.  Returns a list with one ConfusionCounts per predicted list.
+    """
+    matrix = get_prediction_matrix(predictions)
+    num_predictions, n = matrix.shape
+    pred_codes, pred_values = factorize(matrix.ravel())
+    pred_codes = pred_codes.reshape(num_predictions, n)
+    if actual is None:
+        actual_codes, actual_values = numpy.zeros(n, dtype=numpy.int64), [None]
+    else:
+        actual_codes, actual_values = factorize(actual)
+
+    def lookup(values, fn):
+        return numpy.array([bool(fn(val)) for val in values], dtype=bool)
+
+    def pairwise(fn):
+        table = [fn(a, p) for a in actual_values for p in pred_values]
+        return numpy.array(table, dtype=bool).reshape(len(actual_values), len(pred_values))
+
+    positive_str = str(positive_pred)
+    cells = PRED_POS_STR * lookup(pred_values, lambda p: str(p) == positive_str)[pred_codes] + \
+            PRED_POS * lookup(pred_values, lambda p: p == positive_pred)[pred_codes]
+    if actual is not None:
+        str_equal = pairwise(lambda a, p: str(a) == str(p))
+        equal = pairwise(lambda a, p: bool(a == p))
+        cells = cells + \
+            ACTUAL_POS * lookup(actual_values, lambda a: a == positive_pred)[actual_codes] + \
+            CORRECT_STR * str_equal[actual_codes, pred_codes] + \
+            CORRECT * equal[actual_codes, pred_codes] + \
+            PRED_IN_ACTUAL * equal.any(axis=0)[pred_codes]
+
+    if sensitive is None:
+        group_codes, sensitive_values = numpy.zeros(n, dtype=numpy.int64), [None]
+    else:
+        group_codes, sensitive_values = factorize(sensitive)
+    num_groups = len(sensitive_values)
+    offsets = numpy.arange(num_predictions).reshape(-1, 1) * num_groups + group_codes
+    counts = numpy.bincount((offsets * NUM_CELLS + cells).ravel(),
+                            minlength=num_predictions * num_groups * NUM_CELLS)
+    counts = counts.reshape(num_predictions, num_groups, NUM_CELLS)
+    return [ConfusionCounts(sensitive_values, grid_counts) for grid_counts in counts]
+
+
+def get_prediction_matrix(predictions):
+    """
+    Returns the given predicted lists (a list of lists or arrays of the same length, or a 2-D
+    array) as a 2-D array with one row per predicted list.  Arrays of the same dtype are stacked
+    as they are; anything else is stored as Python objects so that the values keep their types.
+    """
+    if isinstance(predictions, numpy.ndarray) and predictions.ndim == 2:
+        return predictions
+    rows = [numpy.asarray(predicted) if isinstance(predicted, (numpy.ndarray, pandas.Series))
+            else None for predicted in predictions]
+    if len(rows) > 0 and all(row is not None and row.dtype == rows[0].dtype for row in rows):
+        return numpy.vstack(rows)
+    matrix = numpy.empty((len(predictions), len(predictions[0]) if len(rows) > 0 else 0),
+                         dtype=object)
+    for i, predicted in enumerate(predictions):
+        matrix[i, :] = predicted
+    return matrix
+
 
 def calc_pos_protected_percents(predicted, sensitive, unprotected_vals, positive_pred):
     """
@@ -5,23 +147,19 @@ def calc_pos_protected_percents(predicted, sensitive, unprotected_vals, positive
     C is the predicited classification and where all not privileged values are considered
     equivalent.  Assumes that predicted and sensitive have the same lengths.
     """
-    unprotected_positive = 0.0
-    unprotected_negative = 0.0
-    protected_positive = 0.0
-    protected_negative = 0.0
-    for i in range(0, len(predicted)):
-        protected_val = sensitive[i]
-        predicted_val = predicted[i]
-        if protected_val in unprotected_vals:
-            if str(predicted_val) == str(positive_pred):
-                unprotected_positive += 1
-            else:
-                unprotected_negative += 1
-        else:
-            if str(predicted_val) == str(positive_pred):
-                protected_positive += 1
-            else:
-                protected_negative += 1
+    counts = calc_confusion_counts(None, predicted, sensitive, positive_pred)
+    return get_pos_protected_percents(counts, unprotected_vals)
+
+
+def get_pos_protected_percents(counts, unprotected_vals):
+    """
+    Same as calc_pos_protected_percents, but from precomputed ConfusionCounts.
+    """
+    unprotected = counts.unprotected_groups(unprotected_vals)
+    unprotected_positive = counts.total(unprotected, require=PRED_POS_STR)
+    unprotected_negative = counts.total(unprotected, exclude=PRED_POS_STR)
+    protected_positive = counts.total(~unprotected, require=PRED_POS_STR)
+    protected_negative = counts.total(~unprotected, exclude=PRED_POS_STR)
 
     protected_pos_percent = 0.0
     if protected_positive + protected_negative > 0:
@@ -40,13 +178,18 @@ def calc_prob_class_given_sensitive(predicted, sensitive, predicted_goal, sensit
     and sensitive have the same length.  If there are no attributes matching the given
     sensitive_goal, this will error.
     """
-    match_count = 0.0
-    total = 0.0
-    for sens, pred in zip(sensitive, predicted):
-        if str(sens) == str(sensitive_goal):
-            total += 1
-            if str(pred) == str(predicted_goal):
-                match_count += 1
+    counts = calc_confusion_counts(None, predicted, sensitive, predicted_goal)
+    return get_prob_class_given_sensitive(counts, sensitive_goal)
+
+
+def get_prob_class_given_sensitive(counts, sensitive_goal):
+    """
+    Same as calc_prob_class_given_sensitive, but from ConfusionCounts precomputed with
+    positive_pred=predicted_goal.
+    """
+    matching = counts.groups_matching(sensitive_goal)
+    match_count = counts.total(matching, require=PRED_POS_STR)
+    total = counts.total(matching)
 
     return match_count / total
 
@@ -54,28 +197,20 @@ def calc_fp_fn(actual, predicted, sensitive, unprotected_vals, positive_pred):
     """
     Returns False positive and false negative for protected and unprotected group.
     """
-    unprotected_negative = 0.0
-    protected_positive = 0.0
-    protected_negative = 0.0
-    fp_protected = 0.0
-    fp_unprotected = 0.0
-    fn_protected=0.0
-    fn_unprotected=0.0
-    fp_diff =0.0
-    for i in range(0, len(predicted)):
-        protected_val = sensitive[i]
-        predicted_val = predicted[i]
-        actual_val= actual[i]
-        if protected_val in unprotected_vals:
-            if (str(predicted_val)==str(positive_pred))&(str(actual_val)!=str(predicted_val)):
-                fp_unprotected+=1
-            elif(str(predicted_val)!=str(positive_pred))&(str(actual_val)==str(predicted_val)):
-                fn_unprotected+=1
-        else:
-            if (str(predicted_val)==str(positive_pred))&(str(actual_val)!=str(predicted_val)):
-                    fp_protected+=1
-            elif(str(predicted_val)!=str(positive_pred))&(str(actual_val)==str(predicted_val)):
-                    fn_protected+=1
+    counts = calc_confusion_counts(actual, predicted, sensitive, positive_pred)
+    return get_fp_fn(counts, unprotected_vals)
+
+
+def get_fp_fn(counts, unprotected_vals):
+    """
+    Same as calc_fp_fn, but from precomputed ConfusionCounts.  Note that, as it always has, the
+    "false negative" count is the number of negative predictions that match the actual value.
+    """
+    unprotected = counts.unprotected_groups(unprotected_vals)
+    fp_unprotected = counts.total(unprotected, require=PRED_POS_STR, exclude=CORRECT_STR)
+    fp_protected = counts.total(~unprotected, require=PRED_POS_STR, exclude=CORRECT_STR)
+    fn_unprotected = counts.total(unprotected, require=CORRECT_STR, exclude=PRED_POS_STR)
+    fn_protected = counts.total(~unprotected, require=CORRECT_STR, exclude=PRED_POS_STR)
     return fp_unprotected,fp_protected, fn_protected, fn_unprotected
 
 
@@ -83,23 +218,67 @@ def calc_tp_tn(actual, predicted, sensitive, unprotected_vals, positive_pred):
     """
     Returns true positive and true negative for protected and unprotected group.
     """
-    tp_protected = 0.0
-    tp_unprotected = 0.0
-    tn_protected=0.0
-    tn_unprotected=0.0
-    for i in range(0, len(predicted)):
-        protected_val = sensitive[i]
-        predicted_val = predicted[i]
-        actual_val= actual[i]
-        if protected_val in unprotected_vals:
-            if (str(predicted_val)==str(positive_pred))&(str(actual_val)==str(predicted_val)):
-                tp_unprotected+=1
-            elif(str(predicted_val)!=str(positive_pred))&(str(actual_val)==str(predicted_val)):
-                tn_unprotected+=1
-        else:
-            if (str(predicted_val)==str(positive_pred))&(str(actual_val)==str(predicted_val)):
-                    tp_protected+=1
-            elif(str(predicted_val)!=str(positive_pred))&(str(actual_val)==str(predicted_val)):
-                    tn_protected+=1
+    counts = calc_confusion_counts(actual, predicted, sensitive, positive_pred)
+    return get_tp_tn(counts, unprotected_vals)
+
+
+def get_tp_tn(counts, unprotected_vals):
+    """
+    Same as calc_tp_tn, but from precomputed ConfusionCounts.
+    """
+    unprotected = counts.unprotected_groups(unprotected_vals)
+    tp_unprotected = counts.total(unprotected, require=PRED_POS_STR | CORRECT_STR)
+    tp_protected = counts.total(~unprotected, require=PRED_POS_STR | CORRECT_STR)
+    tn_unprotected = counts.total(unprotected, require=CORRECT_STR, exclude=PRED_POS_STR)
+    tn_protected = counts.total(~unprotected, require=CORRECT_STR, exclude=PRED_POS_STR)
     return tp_unprotected,tp_protected, tn_protected, tn_unprotected
 
+
+def get_tpr(counts):
+    """
+    Returns the true positive rate (recall) over all rows of the ConfusionCounts, or 0.0 if there
+    are no actual positives.
+    """
+    positives = counts.total(require=ACTUAL_POS)
+    if positives == 0.0:
+        return 0.0
+    return counts.total(require=ACTUAL_POS | PRED_POS) / positives
+
+
+def get_tnr(counts):
+    """
+    Returns the true negative rate over all rows of the ConfusionCounts.  Like a confusion matrix
+    over the actual classes, rows predicted as a class that never actually occurs are ignored.
+    Returns 1.0 if there are no such actual negatives.
+    """
+    negatives = counts.total(require=PRED_IN_ACTUAL, exclude=ACTUAL_POS)
+    if negatives == 0.0:
+        return 1.0
+    return counts.total(require=PRED_IN_ACTUAL | CORRECT, exclude=ACTUAL_POS) / negatives
+
+
+def get_calibration(counts, predicted_positive):
+    """
+    Returns P(actual = positive | predicted is positive), or given predicted_positive=False,
+    P(actual = positive | predicted is not positive).  Returns 1.0 if nothing was predicted that
+    way.
+    """
+    if predicted_positive:
+        total_pred = counts.total(require=PRED_POS)
+        act_correct = counts.total(require=PRED_POS | ACTUAL_POS)
+    else:
+        total_pred = counts.total(exclude=PRED_POS)
+        act_correct = counts.total(require=ACTUAL_POS, exclude=PRED_POS)
+    if act_correct == 0.0 and total_pred == 0.0:
+        return 1.0
+    if total_pred == 0.0:
+        return 0.0
+    return act_correct / total_pred
+
+
+def get_accuracy(counts):
+    """
+    Returns the fraction of all rows of the ConfusionCounts whose prediction equals the actual
+    value.
+    """
+    return counts.total(require=CORRECT) / counts.total()
@@ -1,7 +1,9 @@
 import pathlib
 import os
+import pandas as pd
 import tempfile
 import shutil
+import time
 
 from fairness.metrics.list import get_metrics
 
@@ -23,76 +25,571 @@ def ensure_dir(path):
 def get_metrics_list(dataset, sensitive_dict, tag):
     return [metric.get_name() for metric in get_metrics(dataset, sensitive_dict, tag)]
 
+KEY_COLUMNS = ['algorithm', 'params', 'run-id']
+
 def get_detailed_metrics_header(dataset, sensitive_dict, tag):
-    return ','.join(['algorithm', 'params', 'run-id'] + get_metrics_list(dataset, sensitive_dict, tag))
+    return ','.join(KEY_COLUMNS + get_metrics_list(dataset, sensitive_dict, tag))
+
+def format_params(params):
+    """
+    Returns the "name=value;name=value" params string written in result rows for a dictionary.
+    """
+    return ";".join("%s=%s" % (k, v) for (k, v) in params.items())
+
+def get_result_key(alg_name, params, run_id):
+    """
+    Returns the key identifying a result row within a results file (whose name already encodes
+    the dataset, sensitive attribute and tag).  params may be a params string or a dictionary;
+    its parameters are sorted, since backends may store them in a different order.
+    """
+    if isinstance(params, dict):
+        params = format_params(params)
+    return (alg_name, tuple(sorted(parse_params(params))), str(run_id))
+
+def get_checkpoint_filename(filename):
+    """
+    Returns the checkpoint file kept for the given results file while a benchmark is running.
+    Results filenames already encode the dataset, sensitive attribute and tag, and each checkpoint
+    row starts with the algorithm, params and run-id, so together these identify a finished unit.
+    There is a single checkpoint per results file: a run only takes over an existing one when it
+    resumes (see ResultsFile).
+    """
+    path = pathlib.Path(filename)
+    checkpoint_dir = path.parent / 'checkpoints'
+    ensure_dir(checkpoint_dir)
+    return checkpoint_dir / path.name
+
+BACKEND_DEFAULT = 'csv'
+
+# By default a batch of result rows is fsynced every SYNC_ROWS_DEFAULT rows or SYNC_SECONDS_DEFAULT
+# seconds, whichever comes first.  Use sync_rows=1 to fsync every row.
+SYNC_ROWS_DEFAULT = 100
+SYNC_SECONDS_DEFAULT = 10.0
+
+class BatchedWriter(object):
+    """
+    Wraps an open text file so that rows are flushed and fsynced in batches rather than one at a
+    time.  A batch is synced once it holds sync_rows rows or once sync_seconds have passed since
+    the last sync (checked when a row is written); either limit can be disabled with None.
+    Calling sync() commits the current batch immediately, e.g., at the end of a trial.
+    """
+
+    def __init__(self, handle, sync_rows=SYNC_ROWS_DEFAULT, sync_seconds=SYNC_SECONDS_DEFAULT):
+        self.handle = handle
+        self.sync_rows = sync_rows
+        self.sync_seconds = sync_seconds
+        self.unsynced_rows = 0
+        self.last_sync = time.monotonic()
+
+    def write(self, *args):
+        self.handle.write(*args)
+        self.unsynced_rows += 1
+        if self.sync_rows is not None and self.unsynced_rows >= self.sync_rows:
+            self.sync()
+        elif self.sync_seconds is not None and \
+             time.monotonic() - self.last_sync >= self.sync_seconds:
+            self.sync()
+
+    def sync(self):
+        if self.unsynced_rows > 0:
+            self.handle.flush()
+            os.fsync(self.handle.fileno())
+            self.unsynced_rows = 0
+        self.last_sync = time.monotonic()
+
+    def get_rows_at_risk(self):
+        """
+        Returns the number of written rows that have not been fsynced yet and would be lost if the
+        process died now.
+        """
+        return self.unsynced_rows
+
+    def close(self):
+        self.sync()
+        self.handle.close()
 
 class ResultsFile(object):
 
-    def __init__(self, filename, dataset, sensitive_dict, tag):
+    def __init__(self, filename, dataset, sensitive_dict, tag, resume=False,
+                 sync_rows=SYNC_ROWS_DEFAULT, sync_seconds=SYNC_SECONDS_DEFAULT,
+                 backend=BACKEND_DEFAULT):
         self.filename = filename
+        self.backend = get_backend(backend)
         self.dataset = dataset
         self.sensitive_dict = sensitive_dict
         self.tag = tag
-        handle, name = self.create_new_file()
-        self.fresh_file = handle
-        self.tempname = name
+        self.header = get_detailed_metrics_header(self.dataset, self.sensitive_dict, self.tag)
+        self.tempname = get_checkpoint_filename(filename)
+        self.completed = set()
+        handle = None
+        if resume:
+            self.completed.update(self.backend.read_keys(self.filename))
+            handle = self.resume_checkpoint()
+        self.resumed = handle is not None
+        if handle is None:
+            handle = self.create_new_file()
+        self.fresh_file = BatchedWriter(handle, sync_rows, sync_seconds)
 
     def create_new_file(self):
-        fd, name = tempfile.mkstemp()
-        os.close(fd)
-        f = open(name, "w")
-        f.write(get_detailed_metrics_header(
-            self.dataset, self.sensitive_dict, self.tag) + '\n')
-        return f, name
+        """
+        Creates the checkpoint of a run that does not resume.  A checkpoint that already exists
+        belongs to an interrupted run or to another run on the same results file, so it is never
+        overwritten.
+        """
+        try:
+            f = open(self.tempname, "x")
+        except FileExistsError:
+            raise Exception("Cannot write %s: its checkpoint %s already exists.  It was left by "
+                            "an interrupted run, which can be continued with resume, or belongs "
+                            "to a benchmark still running on the same dataset; otherwise delete "
+                            "it to start over." % (self.filename, self.tempname))
+        f.write(self.header + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+        return f
+
+    def resume_checkpoint(self):
+        """
+        Reopens the checkpoint left behind by an interrupted run so that new rows are appended to
+        it.  Returns None if there is no checkpoint or it was written with a different header.
+        """
+        try:
+            old_file = open(self.tempname, "r")
+        except FileNotFoundError:
+            return None
+        with old_file:
+            columns = old_file.readline().strip()
+            rows = old_file.readlines()
+        if columns != self.header:
+            print("Ignoring checkpoint written with different metrics: %s" % self.tempname)
+            return None
+
+        # A row without its newline was cut off by the interruption and is dropped.
+        rows = [row for row in rows if row.endswith('\n')]
+        for row in rows:
+            self.completed.add(get_result_key(*row.split(',')[:3]))
+        print("Resuming from %d checkpointed results in %s" % (len(rows), self.tempname))
+
+        f = open(self.tempname, "w")
+        f.write(self.header + '\n')
+        f.writelines(rows)
+        f.flush()
+        os.fsync(f.fileno())
+        return f
+
+    def has_results_for(self, alg_name, params, run_id):
+        """
+        Returns True if, when this file was resumed, the results backend or the checkpoint left by
+        an interrupted run already held a result row for the given algorithm, params (a
+        dictionary) and run-id.
+        """
+        return get_result_key(alg_name, params, run_id) in self.completed
 
     def write(self, *args):
         self.fresh_file.write(*args)
-        self.fresh_file.flush()
-        os.fsync(self.fresh_file.fileno())
 
-    # FIXME close() is terribly inefficient, but :shrug:
+    def sync(self):
+        """
+        Makes all rows written so far durable in the checkpoint.
+        """
+        self.fresh_file.sync()
+
+    def get_rows_at_risk(self):
+        return self.fresh_file.get_rows_at_risk()
+
+    def discard(self):
+        """
+        Closes this file without storing its rows, for a run that stops before writing any rows.
+        A checkpoint created by this run is removed; a resumed one is kept for the next resume.
+        """
+        self.fresh_file.close()
+        if not self.resumed:
+            os.unlink(self.tempname)
+
     def close(self):
+        """
+        Hands the rows of this run to the results backend and removes the checkpoint.  This only
+        touches the new rows; see the backends below for how they are merged.
+        """
         self.fresh_file.close()
 
-        new_file = open(self.tempname, "r")
-        new_columns = new_file.readline().strip().split(',')
-        new_rows = new_file.readlines()
+        with open(self.tempname, "r") as new_file:
+            new_columns = new_file.readline().strip().split(',')
+            new_rows = new_file.readlines()
 
-        try:
-            old_file = open(self.filename, "r")
+        self.backend.append(self.filename, new_columns, new_rows)
+        os.unlink(self.tempname)
+
+##############################################################################
+# Results files are append-oriented: closing a ResultsFile appends its rows to a pending log next
+# to the results CSV, tagged with the id of their header in a schema log.  compact_results later
+# folds the pending rows into the CSV in one pass, exactly as merging each run on close would.
+
+def get_pending_filenames(filename):
+    """
+    Returns the pending rows log and the schema log kept for the given results file.
+    """
+    path = pathlib.Path(filename)
+    pending_dir = path.parent / 'pending'
+    ensure_dir(pending_dir)
+    return pending_dir / (path.name + '.rows'), pending_dir / (path.name + '.schemas')
+
+def read_schema_log(schema_name):
+    try:
+        with open(schema_name, "r") as schema_file:
+            return [line.strip() for line in schema_file if line.endswith('\n')]
+    except FileNotFoundError:
+        return []
+
+def append_results(filename, columns, rows):
+    """
+    Appends the given result rows (written with the given columns) to the pending log of the
+    results file.  The cost depends only on the number of new rows and distinct headers.
+    """
+    rows_name, schema_name = get_pending_filenames(filename)
+    header = ','.join(columns)
+    schemas = read_schema_log(schema_name)
+    if header in schemas:
+        schema_id = schemas.index(header)
+    else:
+        schema_id = len(schemas)
+        with open(schema_name, "a") as schema_file:
+            schema_file.write(header + '\n')
+            schema_file.flush()
+            os.fsync(schema_file.fileno())
+
+    with open(rows_name, "a") as rows_file:
+        for row in rows:
+            if not row.endswith('\n'):
+                row += '\n'
+            rows_file.write('%d,%s' % (schema_id, row))
+        rows_file.flush()
+        os.fsync(rows_file.fileno())
+
+def has_pending_results(filename):
+    rows_name, schema_name = get_pending_filenames(filename)
+    return schema_name.exists()
+
+def compact_results(filename):
+    """
+    Merges the pending rows of the given results file into its CSV.  Rows are keyed by
+    (algorithm, params, run-id); a later row overwrites the columns it has, the final columns are
+    the union of all columns seen, and the rows keep the order in which their keys first appeared.
+    Does nothing if there are no pending rows.
+    """
+    if not has_pending_results(filename):
+        return
+    rows_name, schema_name = get_pending_filenames(filename)
+    schemas = [header.split(',') for header in read_schema_log(schema_name)]
+
+    try:
+        old_file = open(filename, "r")
+    except FileNotFoundError:
+        old_columns = list(KEY_COLUMNS)
+        old_rows = []
+    else:
+        with old_file:
             old_columns = old_file.readline().strip().split(',')
             old_rows = old_file.readlines()
-        except FileNotFoundError:
-            old_columns = new_columns[:3] # copy the key columns
-            old_rows = []
-
-        final_columns = set(old_columns).union(set(new_columns))
-
-        # FIXME: here we cross our fingers that parameters don't have "," in them.
-        def indexed_rows(rows, column_names):
-            result = {}
-            for row in rows:
-                entries = row.strip().split(',')
-                result[tuple(entries[:3])] = dict(
-                    (entry_name, entry)
-                    for (entry_name, entry) in
-                    zip(column_names, entries))
-            return result
-
-        old_indexed_rows = indexed_rows(old_rows, old_columns)
-        # now we merge the rows onto the old file.
-        for (key, value_dict) in indexed_rows(new_rows, new_columns).items():
-            for (value_name, value) in value_dict.items():
-                old_indexed_rows.setdefault(key, {})[value_name] = value
-
-        fd, final_tempname = tempfile.mkstemp()
-        os.close(fd)
-        final_file = open(final_tempname, "w")
-        final_columns_list = ["algorithm", "params", "run-id"] + \
-            sorted(list(final_columns.difference(set(["algorithm", "params", "run-id"]))))
-        final_file.write(",".join(final_columns_list) + "\n")
-        for row_dict in old_indexed_rows.values():
-            row = ",".join(list(row_dict.get(l, "") for l in final_columns_list))
-            final_file.write(row + "\n")
-        final_file.close()
-        shutil.move(final_tempname, self.filename)
+
+    final_columns = set(old_columns)
+    for columns in schemas:
+        final_columns.update(columns)
+
+    # FIXME: here we cross our fingers that parameters don't have "," in them.
+    def index_row(row, column_names):
+        entries = row.strip().split(',')
+        return tuple(entries[:3]), dict(zip(column_names, entries))
+
+    indexed_rows = dict(index_row(row, old_columns) for row in old_rows)
+    try:
+        rows_file = open(rows_name, "r")
+    except FileNotFoundError:
+        pass
+    else:
+        with rows_file:
+            for line in rows_file:
+                # A line without its newline was cut off while being appended.
+                if not line.endswith('\n'):
+                    continue
+                schema_id, row = line.split(',', 1)
+                key, value_dict = index_row(row, schemas[int(schema_id)])
+                indexed_rows.setdefault(key, {}).update(value_dict)
+
+    fd, final_tempname = tempfile.mkstemp()
+    os.close(fd)
+    final_file = open(final_tempname, "w")
+    final_columns_list = KEY_COLUMNS + sorted(list(final_columns.difference(set(KEY_COLUMNS))))
+    final_file.write(",".join(final_columns_list) + "\n")
+    for row_dict in indexed_rows.values():
+        row = ",".join(list(row_dict.get(l, "") for l in final_columns_list))
+        final_file.write(row + "\n")
+    final_file.close()
+    shutil.move(final_tempname, filename)
+    if rows_name.exists():
+        os.unlink(rows_name)
+    os.unlink(schema_name)
+
+def read_result_keys(filename):
+    """
+    Returns the keys (see get_result_key) of the rows in the results CSV and its pending log.
+    """
+    keys = set()
+    try:
+        old_file = open(filename, "r")
+    except FileNotFoundError:
+        pass
+    else:
+        with old_file:
+            old_file.readline()
+            for row in old_file:
+                if row.endswith('\n'):
+                    keys.add(get_result_key(*row.split(',')[:3]))
+
+    rows_name, schema_name = get_pending_filenames(filename)
+    try:
+        rows_file = open(rows_name, "r")
+    except FileNotFoundError:
+        pass
+    else:
+        with rows_file:
+            for line in rows_file:
+                if line.endswith('\n'):
+                    keys.add(get_result_key(*line.split(',')[1:4]))
+    return keys
+
+def compact_all_results(result_dir, backend=BACKEND_DEFAULT):
+    """
+    Compacts every results file under result_dir that the backend holds data for and returns
+    their names.
+    """
+    backend = get_backend(backend)
+    compacted = []
+    for filename in backend.find_results(result_dir):
+        backend.compact(filename)
+        compacted.append(filename)
+    return compacted
+
+##############################################################################
+# Results backends decide how closed rows are stored and read back.  Both are keyed on the path
+# of the results CSV given by Data.get_results_filename.
+
+class ResultsBackend(object):
+
+    def append(self, filename, columns, rows):
+        """
+        Stores the given CSV result rows, written with the given columns, for the results file.
+        """
+        raise NotImplementedError("append() in ResultsBackend is not implemented")
+
+    def read(self, filename, metrics=None):
+        """
+        Returns a data frame of the merged results with the key columns and the given metric
+        columns (all metrics if None).
+        """
+        raise NotImplementedError("read() in ResultsBackend is not implemented")
+
+    def read_keys(self, filename):
+        """
+        Returns the set of keys (see get_result_key) of the rows stored for the results file.
+        """
+        raise NotImplementedError("read_keys() in ResultsBackend is not implemented")
+
+    def compact(self, filename):
+        """
+        Merges everything stored for the results file so that reading it is cheap again.
+        """
+        pass
+
+    def find_results(self, result_dir):
+        """
+        Returns the results CSV paths in result_dir that this backend has stored rows for.
+        """
+        return []
+
+class CSVBackend(ResultsBackend):
+    """
+    The results CSV plus its pending log; see append_results and compact_results.
+    """
+
+    def append(self, filename, columns, rows):
+        append_results(filename, columns, rows)
+
+    def read(self, filename, metrics=None):
+        compact_results(filename)
+        if metrics is None:
+            return pd.read_csv(filename)
+        wanted = set(KEY_COLUMNS + list(metrics))
+        return pd.read_csv(filename, usecols=lambda column: column in wanted)
+
+    def read_keys(self, filename):
+        return read_result_keys(filename)
+
+    def compact(self, filename):
+        compact_results(filename)
+
+    def find_results(self, result_dir):
+        pending = sorted((pathlib.Path(result_dir) / 'pending').glob('*.schemas'))
+        return [pathlib.Path(result_dir) / name.name[:-len('.schemas')] for name in pending]
+
+class ParquetBackend(ResultsBackend):
+    """
+    Stores each closed run as a Parquet part in a <results>.parquet directory with a typed
+    schema: algorithm is a string, params a map from parameter name to value, run-id an int64,
+    and every metric a float64 (missing results are null).  Reading only loads the requested
+    metric columns from each part.  Rows are merged on read by (algorithm, params, run-id),
+    keeping the last non-null value of each metric.
+
+    Requires pyarrow.
+    """
+
+    def get_directory(self, filename):
+        return pathlib.Path(filename).with_suffix('.parquet')
+
+    def get_parts(self, filename):
+        return sorted(self.get_directory(filename).glob('part-*.parquet'))
+
+    def write_part(self, filename, algorithms, params, run_ids, metric_values):
+        """
+        Writes a new part holding the given key columns and the dictionary mapping metric names
+        to their (float or None) values, and returns its path.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        directory = self.get_directory(filename)
+        ensure_dir(directory)
+        params_type = pa.map_(pa.string(), pa.string())
+        fields = [pa.field('algorithm', pa.string()),
+                  pa.field('params', params_type),
+                  pa.field('run-id', pa.int64())]
+        arrays = [pa.array(algorithms, type=pa.string()),
+                  pa.array(params, type=params_type),
+                  pa.array(run_ids, type=pa.int64())]
+        for metric, values in metric_values.items():
+            fields.append(pa.field(metric, pa.float64()))
+            arrays.append(pa.array(values, type=pa.float64(), from_pandas=True))
+        table = pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+        parts = self.get_parts(filename)
+        number = int(parts[-1].stem.split('-')[1]) + 1 if len(parts) > 0 else 0
+        part = directory / ('part-%06d.parquet' % number)
+        tempname = directory / ('.' + part.name)
+        pq.write_table(table, str(tempname))
+        os.replace(str(tempname), str(part))
+        return part
+
+    def append(self, filename, columns, rows):
+        entries = [row.strip().split(',') for row in rows]
+        metric_values = dict((column, [parse_metric(e[i]) if i < len(e) else None
+                                       for e in entries])
+                             for i, column in enumerate(columns) if i >= len(KEY_COLUMNS))
+        self.write_part(filename,
+                        [e[0] for e in entries],
+                        [parse_params(e[1]) for e in entries],
+                        [int(e[2]) for e in entries],
+                        metric_values)
+
+    def read(self, filename, metrics=None):
+        import pyarrow.parquet as pq
+
+        if not self.get_directory(filename).exists():
+            raise FileNotFoundError(str(self.get_directory(filename)))
+
+        frames = []
+        for part in self.get_parts(filename):
+            parquet_file = pq.ParquetFile(str(part))
+            names = parquet_file.schema_arrow.names
+            if metrics is None:
+                wanted = names
+            else:
+                wanted = KEY_COLUMNS + [m for m in metrics if m in names]
+            frames.append(parquet_file.read(columns=wanted).to_pandas())
+        if len(frames) == 0:
+            return pd.DataFrame(columns=KEY_COLUMNS + list(metrics or []))
+
+        df = pd.concat(frames, ignore_index=True)
+        if metrics is None:
+            metric_columns = sorted(set(df.columns).difference(KEY_COLUMNS))
+        else:
+            metric_columns = list(metrics)
+            for metric in metric_columns:
+                if metric not in df.columns:
+                    df[metric] = float('nan')
+
+        # The params maps come back as lists of pairs, which are made hashable for grouping.
+        df['params'] = [tuple(sorted(p)) for p in df['params']]
+        merged = df.groupby(KEY_COLUMNS, sort=False)[metric_columns].last().reset_index()
+        merged['params'] = [dict(p) for p in merged['params']]
+        return merged[KEY_COLUMNS + metric_columns]
+
+    def read_keys(self, filename):
+        import pyarrow.parquet as pq
+
+        keys = set()
+        for part in self.get_parts(filename):
+            table = pq.ParquetFile(str(part)).read(columns=KEY_COLUMNS).to_pydict()
+            for alg_name, params, run_id in zip(*(table[column] for column in KEY_COLUMNS)):
+                keys.add((alg_name, tuple(sorted(params)), str(run_id)))
+        return keys
+
+    def compact(self, filename):
+        """
+        Rewrites all parts as a single part holding the merged rows.
+        """
+        parts = self.get_parts(filename)
+        if len(parts) <= 1:
+            return
+        df = self.read(filename)
+        metrics = [column for column in df.columns if column not in KEY_COLUMNS]
+        self.write_part(filename,
+                        df['algorithm'].tolist(),
+                        [sorted(p.items()) for p in df['params']],
+                        df['run-id'].tolist(),
+                        dict((m, df[m].tolist()) for m in metrics))
+        for part in parts:
+            os.unlink(str(part))
+
+    def find_results(self, result_dir):
+        directories = sorted(pathlib.Path(result_dir).glob('*.parquet'))
+        return [directory.with_suffix('.csv') for directory in directories]
+
+def parse_params(params):
+    """
+    Turns the "name=value;name=value" params string of a result row into a list of pairs.
+    """
+    if params == '':
+        return []
+    return [tuple(param.split('=', 1)) for param in params.split(';')]
+
+def parse_metric(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+BACKENDS = {
+    'csv': CSVBackend(),
+    'parquet': ParquetBackend(),
+}
+
+def get_backend(backend):
+    """
+    Returns the backend with the given name, or the given backend object itself.
+    """
+    if isinstance(backend, ResultsBackend):
+        return backend
+    if backend not in BACKENDS:
+        raise Exception("Unknown results backend '%s', expected one of: %s" %
+                        (backend, ', '.join(sorted(BACKENDS))))
+    return BACKENDS[backend]
+
+def add_backend(name, backend):
+    BACKENDS[name] = backend
+
+def read_results(filename, metrics=None, backend=BACKEND_DEFAULT):
+    """
+    Reads the merged results stored for the given results CSV path, loading only the key columns
+    and the given metric columns if metrics is not None.
+    """
+    return get_backend(backend).read(filename, metrics)
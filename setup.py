@@ -44,7 +44,8 @@ ENTRY_POINTS = {
   'console_scripts': [
       'fairness-benchmark = fairness.benchmark:main',
       'fairness-preprocess = fairness.preprocess:main',
-      'fairness-analysis = fairness.analysis:main'
+      'fairness-analysis = fairness.analysis:main',
+      'fairness-compact-results = fairness.compact:main'
   ],
 }
 